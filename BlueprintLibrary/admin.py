@@ -1,14 +1,146 @@
 # Django
-from django.contrib import admin
+from django.contrib import admin, messages
 
-from .models import Blueprint, BlueprintOwner, BlueprintRequest, IndustryJob
+from . import tokens
+from .models import (
+    Blueprint,
+    BlueprintOwner,
+    BlueprintRequest,
+    IndustryJob,
+    OwnerSyncStatus,
+)
+
+
+class OwnerSyncStatusInline(admin.TabularInline):
+    model = OwnerSyncStatus
+    fields = (
+        "section",
+        "status",
+        "last_sync_at",
+        "duration",
+        "fetch_duration",
+        "parse_duration",
+        "apply_duration",
+        "rows_received",
+        "rows_written",
+        "rows_deleted",
+        "http_status",
+        "pages",
+        "message",
+        "last_error",
+        "last_error_at",
+        "run_id",
+        "running_since",
+        "overlapping_runs",
+        "abandoned_runs",
+    )
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(BlueprintOwner)
 class BlueprintOwnerAdmin(admin.ModelAdmin):
-    list_display = ("__str__", "is_corporation", "character", "corporation_id")
+    list_display = (
+        "__str__",
+        "is_corporation",
+        "character",
+        "corporation_id",
+        "_last_sync_at",
+        "_last_sync_duration",
+        "_last_sync_status",
+        "_token_status",
+    )
     list_filter = ("is_corporation",)
     search_fields = ("character__character_name", "character__corporation_name")
+    inlines = (OwnerSyncStatusInline,)
+    actions = ("refresh_owners", "retry_tokens")
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related("sync_statuses")
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        changelist = (getattr(response, "context_data", None) or {}).get("cl")
+        if changelist is not None:
+            # État des jetons de toute la page en une lecture du cache
+            owners = list(changelist.result_list)
+            missing = tokens.missing_reasons([owner.pk for owner in owners])
+            for owner in owners:
+                owner._token_missing = missing.get(owner.pk)
+        return response
+
+    @staticmethod
+    def _latest_status(obj):
+        # Utilise le prefetch: pas de requête supplémentaire par ligne
+        statuses = list(obj.sync_statuses.all())
+        if not statuses:
+            return None
+        return max(statuses, key=lambda status: status.last_sync_at)
+
+    @admin.display(description="Dernière synchro")
+    def _last_sync_at(self, obj):
+        status = self._latest_status(obj)
+        return status.last_sync_at if status else None
+
+    @admin.display(description="Durée (s)")
+    def _last_sync_duration(self, obj):
+        # Durée cumulée de la dernière synchro de chaque section
+        statuses = obj.sync_statuses.all()
+        if not statuses:
+            return None
+        return round(sum(status.duration for status in statuses), 2)
+
+    @admin.display(description="État")
+    def _last_sync_status(self, obj):
+        statuses = obj.sync_statuses.all()
+        if not statuses:
+            return None
+        return ", ".join(
+            f"{status.get_section_display()}: {status.get_status_display()}"
+            for status in sorted(statuses, key=lambda status: status.section)
+        )
+
+    @admin.display(description="Jeton ESI")
+    def _token_status(self, obj):
+        if hasattr(obj, "_token_missing"):
+            missing = obj._token_missing  # lu pour toute la page (changelist_view)
+        else:
+            missing = tokens.missing_reasons([obj.pk]).get(obj.pk)
+        if missing is None:
+            return "OK"
+        reason, until = missing
+        return f"Indisponible jusqu'à {until:%H:%M}: {reason}"
+
+    @admin.action(description="Rafraîchir maintenant les propriétaires sélectionnés")
+    def refresh_owners(self, request, queryset):
+        # Import à l'usage: l'admin est chargé au démarrage de chaque processus web,
+        # les tâches (requests, celery, ESI) n'y sont utiles que pour cette action
+        from .tasks import queue_owner_refresh
+
+        owner_pks = list(queryset.values_list("pk", flat=True))
+        for owner_pk in owner_pks:
+            queue_owner_refresh(owner_pk)
+        self.message_user(
+            request,
+            f"Rafraîchissement planifié pour {len(owner_pks)} propriétaire(s).",
+            messages.SUCCESS,
+        )
+
+    @admin.action(description="Retenter les jetons ESI des propriétaires sélectionnés")
+    def retry_tokens(self, request, queryset):
+        owner_pks = list(queryset.values_list("pk", flat=True))
+        for owner_pk in owner_pks:
+            tokens.forget_missing(owner_pk)
+        self.message_user(
+            request,
+            f"Jetons retentés à la prochaine synchronisation de {len(owner_pks)} "
+            "propriétaire(s).",
+            messages.SUCCESS,
+        )
 
 
 @admin.register(Blueprint)
@@ -54,3 +186,26 @@ class IndustryJobAdmin(admin.ModelAdmin):
         "owner__character__character_name",
         "owner__character__corporation_name",
     )
+
+
+@admin.register(OwnerSyncStatus)
+class OwnerSyncStatusAdmin(admin.ModelAdmin):
+    list_display = (
+        "owner",
+        "section",
+        "status",
+        "last_sync_at",
+        "duration",
+        "fetch_duration",
+        "parse_duration",
+        "apply_duration",
+        "rows_received",
+        "pages",
+        "http_status",
+    )
+    list_filter = ("section", "status", "http_status")
+    search_fields = (
+        "owner__character__character_name",
+        "owner__character__corporation_name",
+    )
+    ordering = ("-duration",)
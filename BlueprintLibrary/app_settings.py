@@ -7,3 +7,110 @@ from django.conf import settings
 
 
 EXAMPLE_SETTING_ONE = getattr(settings, "EXAMPLE_SETTING_ONE", None)
+
+# Priorité Celery (0 = la plus haute, 9 = la plus basse) des rafraîchissements
+# déclenchés à la main depuis l'admin, cf. broker_transport_options dans celery.py
+BLUEPRINTS_REFRESH_PRIORITY = getattr(settings, "BLUEPRINTS_REFRESH_PRIORITY", 1)
+
+# Durée maximale (secondes) d'une synchronisation d'un propriétaire: au-delà, son
+# verrou expire et une nouvelle synchronisation peut démarrer (cf. locks.py)
+BLUEPRINTS_SYNC_LOCK_TIMEOUT = getattr(settings, "BLUEPRINTS_SYNC_LOCK_TIMEOUT", 1800)
+
+# Voies Celery des tâches (cf. lanes.py): synchronisations planifiées ("bulk"),
+# rafraîchissements demandés par un utilisateur ("interactive", priorité
+# BLUEPRINTS_REFRESH_PRIORITY) et résolution des noms ("background").
+# File None: file par défaut d'Auth; une file dédiée doit être consommée par un
+# worker (cf. commande blueprints_queues)
+BLUEPRINTS_BULK_QUEUE = getattr(settings, "BLUEPRINTS_BULK_QUEUE", None)
+BLUEPRINTS_INTERACTIVE_QUEUE = getattr(settings, "BLUEPRINTS_INTERACTIVE_QUEUE", None)
+BLUEPRINTS_BACKGROUND_QUEUE = getattr(settings, "BLUEPRINTS_BACKGROUND_QUEUE", None)
+# Priorités (Auth utilise 5 par défaut): les synchronisations passent après les
+# tâches d'Auth, la résolution des noms en dernier
+BLUEPRINTS_BULK_PRIORITY = getattr(settings, "BLUEPRINTS_BULK_PRIORITY", 6)
+BLUEPRINTS_BACKGROUND_PRIORITY = getattr(settings, "BLUEPRINTS_BACKGROUND_PRIORITY", 8)
+# Concurrence conseillée des workers de chaque file dédiée
+BLUEPRINTS_BULK_CONCURRENCY = getattr(settings, "BLUEPRINTS_BULK_CONCURRENCY", 2)
+BLUEPRINTS_INTERACTIVE_CONCURRENCY = getattr(
+    settings, "BLUEPRINTS_INTERACTIVE_CONCURRENCY", 4
+)
+BLUEPRINTS_BACKGROUND_CONCURRENCY = getattr(
+    settings, "BLUEPRINTS_BACKGROUND_CONCURRENCY", 1
+)
+
+# Jeton "Bearer" autorisant un collecteur Prometheus à lire /blueprints/metrics/
+# sans session (sinon l'accès est réservé aux comptes staff)
+BLUEPRINTS_METRICS_TOKEN = getattr(settings, "BLUEPRINTS_METRICS_TOKEN", None)
+
+# Profilage des vues "chaudes" (requêtes SQL, temps DB, cache, latence).
+# Désactivé: les vues ne sont pas instrumentées du tout.
+BLUEPRINTS_PROFILING_ENABLED = getattr(settings, "BLUEPRINTS_PROFILING_ENABLED", False)
+# Une même requête SQL répétée plus de N fois dans une requête HTTP signale un N+1
+BLUEPRINTS_PROFILING_NPLUSONE_THRESHOLD = getattr(
+    settings, "BLUEPRINTS_PROFILING_NPLUSONE_THRESHOLD", 10
+)
+# Latence (ms) au-delà de laquelle une requête est conservée dans le tampon
+BLUEPRINTS_PROFILING_SLOW_MS = getattr(settings, "BLUEPRINTS_PROFILING_SLOW_MS", 500)
+# Nombre d'échantillons conservés (tampon circulaire, par processus)
+BLUEPRINTS_PROFILING_BUFFER_SIZE = getattr(
+    settings, "BLUEPRINTS_PROFILING_BUFFER_SIZE", 100
+)
+
+# URL racine de l'API ESI (surchargée par la suite de benchmarks pour un faux ESI local)
+BLUEPRINTS_ESI_BASE_URL = getattr(
+    settings, "BLUEPRINTS_ESI_BASE_URL", "https://esi.evetech.net/latest"
+)
+# Nombre de nouvelles tentatives sur erreur transitoire ESI (420, 502, 503, 504)
+BLUEPRINTS_ESI_MAX_RETRIES = getattr(settings, "BLUEPRINTS_ESI_MAX_RETRIES", 3)
+# Téléchargement groupé des pages ESI (refresh_all_owners): "requests" (un thread
+# par endpoint) ou "httpx" (asyncio, toutes les pages en parallèle; extra "async")
+BLUEPRINTS_ESI_BACKEND = getattr(settings, "BLUEPRINTS_ESI_BACKEND", "requests")
+# Nombre maximal de requêtes ESI simultanées d'un worker
+BLUEPRINTS_ESI_CONCURRENCY = getattr(settings, "BLUEPRINTS_ESI_CONCURRENCY", 50)
+# Nombre de propriétaires dont les pages sont téléchargées ensemble. Toutes les
+# lignes d'un lot restent en mémoire (enregistrements compacts, quelques centaines
+# d'octets par blueprint; les corps des réponses sont libérés dès leur décodage)
+# jusqu'à leur écriture: un lot plus grand gagne en parallélisme ce qu'il coûte en
+# mémoire du worker
+BLUEPRINTS_ESI_OWNER_BATCH = getattr(settings, "BLUEPRINTS_ESI_OWNER_BATCH", 20)
+# Nombre de blueprints (connus avant la synchronisation) au-delà duquel un lot est
+# fermé avant d'atteindre BLUEPRINTS_ESI_OWNER_BATCH: borne la mémoire d'un lot de
+# grosses corporations. Un propriétaire plus gros forme un lot à lui seul
+BLUEPRINTS_ESI_BATCH_ROWS = getattr(settings, "BLUEPRINTS_ESI_BATCH_ROWS", 200_000)
+# Durée de conservation des ETag ESI (secondes)
+BLUEPRINTS_ESI_ETAG_TIMEOUT = getattr(settings, "BLUEPRINTS_ESI_ETAG_TIMEOUT", 86400)
+
+# Exports CSV du SDE (données industrielles des blueprints), format Fuzzwork
+BLUEPRINTS_SDE_BASE_URL = getattr(
+    settings, "BLUEPRINTS_SDE_BASE_URL", "https://www.fuzzwork.co.uk/dump/latest"
+)
+
+# Délais (secondes) entre deux synchronisations des jobs d'un propriétaire: la
+# suivante est planifiée à la fin de job la plus proche, dans ces bornes
+# (ESI met en cache les jobs 5 minutes)
+BLUEPRINTS_JOBS_MIN_REFRESH = getattr(settings, "BLUEPRINTS_JOBS_MIN_REFRESH", 300)
+BLUEPRINTS_JOBS_MAX_REFRESH = getattr(settings, "BLUEPRINTS_JOBS_MAX_REFRESH", 3600)
+
+# Durée de vie (secondes) des fragments de gabarits en cache. Ils sont invalidés
+# dès que les données changent (versions de synchronisation): c'est un plafond.
+BLUEPRINTS_FRAGMENT_CACHE_TIMEOUT = getattr(
+    settings, "BLUEPRINTS_FRAGMENT_CACHE_TIMEOUT", 86400
+)
+
+# Durée de vie (secondes) des réponses DataTables en cache. Elles sont invalidées
+# dès que les données du périmètre changent (versions de synchronisation).
+BLUEPRINTS_RESPONSE_CACHE_TIMEOUT = getattr(
+    settings, "BLUEPRINTS_RESPONSE_CACHE_TIMEOUT", 3600
+)
+
+# Jetons ESI: rafraîchis s'ils expirent dans moins de N secondes, par lots de
+# BLUEPRINTS_TOKEN_REFRESH_WORKERS en parallèle
+BLUEPRINTS_TOKEN_REFRESH_MARGIN = getattr(
+    settings, "BLUEPRINTS_TOKEN_REFRESH_MARGIN", 120
+)
+BLUEPRINTS_TOKEN_REFRESH_WORKERS = getattr(
+    settings, "BLUEPRINTS_TOKEN_REFRESH_WORKERS", 8
+)
+# Durée (secondes) pendant laquelle un propriétaire sans jeton utilisable est ignoré
+BLUEPRINTS_TOKEN_MISSING_TIMEOUT = getattr(
+    settings, "BLUEPRINTS_TOKEN_MISSING_TIMEOUT", 3600
+)
@@ -1,8 +1,3 @@
-# Third Party
-# Importation des urls du module
-# Third Party
-import blueprints.urls
-
 # Alliance Auth
 from allianceauth import hooks
 from allianceauth.menu import hooks as menu_hooks
@@ -12,8 +7,12 @@ from allianceauth.services.hooks import UrlHook
 @hooks.register("url_hook")
 def register_blueprints_urls():
     """Enregistre les URLs de l'app Blueprints dans Alliance Auth."""
+    # Import à l'appel du hook (construction des URLs d'Auth): charger les hooks
+    # au démarrage n'importe ni les vues ni DataTables
+    from . import urls
+
     # Inclut les URLs du module sous le préfixe 'blueprints/'
-    return UrlHook(blueprints.urls, "blueprints", r"^blueprints/")
+    return UrlHook(urls, "blueprints", r"^blueprints/")
 
 
 @hooks.register("menu_hook")
@@ -0,0 +1 @@
+"""Benchmarks reproductibles de la synchronisation et des vues"""
@@ -0,0 +1,137 @@
+"""Faux serveur ESI local: pages, X-Pages et ETag comme l'API réelle."""
+
+# Standard Library
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+_ROUTES = (
+    (re.compile(r"^/(corporations|characters)/(\d+)/blueprints/$"), "blueprints"),
+    (re.compile(r"^/(corporations|characters)/(\d+)/industry/jobs/$"), "jobs"),
+    (re.compile(r"^/universe/structures/(\d+)/$"), "structure"),
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # noqa: A002 - signature imposée
+        pass  # pas de journal par requête pendant les mesures
+
+    def _send_json(self, payload, pages=None, status=200):
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        etag = f'"{hashlib.md5(body, usedforsecurity=False).hexdigest()}"'
+        not_modified = self.headers.get("If-None-Match") == etag
+        self.send_response(304 if not_modified else status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("ETag", etag)
+        if pages is not None:
+            self.send_header("X-Pages", str(pages))
+        self.send_header("Content-Length", "0" if not_modified else str(len(body)))
+        self.end_headers()
+        if not not_modified:
+            self.wfile.write(body)
+        self.server.stats["requests"] += 1
+        self.server.stats["not_modified"] += not_modified
+
+    def _send_error(self, status, message):
+        body = json.dumps({"error": message}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.stats["requests"] += 1
+
+    def do_GET(self):  # noqa: N802 - nom imposé par BaseHTTPRequestHandler
+        time.sleep(self.server.latency)
+        dataset = self.server.dataset
+        url = urlparse(self.path)
+        page = int(parse_qs(url.query).get("page", ["1"])[0])
+        for pattern, route in _ROUTES:
+            match = pattern.match(url.path)
+            if not match:
+                continue
+            if route == "structure":
+                structure_id = int(match.group(1))
+                return self._send_json(
+                    {
+                        "name": f"Structure {structure_id}",
+                        "owner_id": 98_000_000,
+                        "solar_system_id": 30_000_142,
+                        "type_id": 35_832,
+                    }
+                )
+            try:
+                owner_index = dataset.owner_index(int(match.group(2)))
+            except KeyError:
+                return self._send_error(403, "Character does not have required role(s)")
+            if route == "blueprints":
+                total = dataset.page_count(dataset.blueprint_count(owner_index))
+                rows = dataset.blueprint_page(owner_index, page)
+            else:
+                total = dataset.page_count(dataset.job_count(owner_index))
+                rows = dataset.job_page(owner_index, page)
+            if page > total:
+                return self._send_error(404, "Requested page does not exist!")
+            return self._send_json(rows, pages=total)
+        return self._send_error(404, "Not found")
+
+    def do_POST(self):  # noqa: N802 - nom imposé par BaseHTTPRequestHandler
+        time.sleep(self.server.latency)
+        if urlparse(self.path).path != "/universe/names/":
+            return self._send_error(404, "Not found")
+        ids = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        stations = set(self.server.dataset.station_ids)
+        # Comme ESI: un seul ID inconnu fait échouer toute la requête
+        if any(entity_id not in stations for entity_id in ids):
+            return self._send_error(404, "Ensure all IDs are valid before resolving")
+        return self._send_json(
+            [
+                {"id": entity_id, "name": f"Station {entity_id}", "category": "station"}
+                for entity_id in ids
+            ]
+        )
+
+
+class _Server(ThreadingHTTPServer):
+    # Nombreuses connexions simultanées avec le backend asynchrone
+    request_queue_size = 256
+
+
+class FakeEsiServer:
+    """Serveur ESI local servant un `SyntheticAlliance`, à utiliser en contexte.
+
+    `latency` (secondes) est ajoutée à chaque réponse pour simuler le réseau.
+    """
+
+    def __init__(self, dataset, latency=0.0, host="127.0.0.1", port=0):
+        self._server = _Server((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.dataset = dataset
+        self._server.latency = latency
+        self._server.stats = {"requests": 0, "not_modified": 0}
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def stats(self):
+        return self._server.stats
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
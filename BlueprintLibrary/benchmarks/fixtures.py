@@ -0,0 +1,175 @@
+"""Générateur déterministe d'une alliance synthétique (propriétaires, blueprints, jobs)."""
+
+# Standard Library
+import datetime as dt
+import random
+
+# Alliance Auth
+from allianceauth.eveonline.models import EveCharacter
+
+from ..models import BlueprintOwner
+
+# Plages d'identifiants proches de celles d'EVE, pour rester réalistes
+CHARACTER_ID_BASE = 90_000_000
+CORPORATION_ID_BASE = 98_000_000
+ITEM_ID_BASE = 1_000_000_000_000
+JOB_ID_BASE = 500_000_000
+BLUEPRINT_TYPE_ID_BASE = 20_000
+STATION_ID_BASE = 60_000_000
+STRUCTURE_ID_BASE = 1_030_000_000_000
+
+ACTIVITY_IDS = (1, 3, 4, 5, 8)  # fabrication, TE, ME, copie, invention
+LOCATION_FLAGS = ("CorpSAG1", "CorpSAG2", "CorpSAG3", "Hangar")
+
+
+class SyntheticAlliance:
+    """Jeu de données synthétique, reproductible à partir d'une graine.
+
+    Les pages ESI sont générées à la demande (jamais toutes en mémoire), ce qui
+    permet de simuler des corporations de plusieurs centaines de milliers de
+    blueprints. Incrémenter `version` modifie une partie des blueprints, comme
+    le ferait une vraie corporation entre deux synchronisations.
+    """
+
+    def __init__(
+        self,
+        seed=42,
+        owners=10,
+        blueprints=10_000,
+        jobs=1_000,
+        locations=200,
+        unresolved_ratio=0.5,
+        blueprint_types=2_000,
+        page_size=1_000,
+        now=None,
+    ):
+        self.seed = seed
+        self.owners = owners
+        self.blueprints = blueprints
+        self.jobs = jobs
+        self.page_size = page_size
+        self.blueprint_types = blueprint_types
+        self.version = 0
+        self.now = (now or dt.datetime.now(dt.timezone.utc)).replace(
+            minute=0, second=0, microsecond=0
+        )
+        rng = random.Random(seed)
+        unresolved = int(locations * unresolved_ratio)
+        self.station_ids = [STATION_ID_BASE + n for n in range(locations - unresolved)]
+        self.structure_ids = [STRUCTURE_ID_BASE + n for n in range(unresolved)]
+        self.location_ids = self.station_ids + self.structure_ids
+        rng.shuffle(self.location_ids)
+
+    # --- Répartition ---
+
+    def _share(self, total, owner_index):
+        base, remainder = divmod(total, self.owners)
+        return base + (1 if owner_index < remainder else 0)
+
+    def blueprint_count(self, owner_index):
+        return self._share(self.blueprints, owner_index)
+
+    def job_count(self, owner_index):
+        return self._share(self.jobs, owner_index)
+
+    def page_count(self, total):
+        return max(1, -(-total // self.page_size))
+
+    def owner_index(self, entity_id):
+        """Index du propriétaire à partir d'un ID de personnage ou de corporation."""
+        for base in (CORPORATION_ID_BASE, CHARACTER_ID_BASE):
+            if base <= entity_id < base + self.owners:
+                return entity_id - base
+        raise KeyError(entity_id)
+
+    def _rng(self, *parts):
+        # Graine textuelle: hachage stable d'un processus à l'autre (contrairement à hash())
+        return random.Random(":".join(map(str, (self.seed, *parts))))
+
+    # --- Pages ESI ---
+
+    def blueprint_page(self, owner_index, page):
+        """Page `page` (à partir de 1) de /corporations/{id}/blueprints/."""
+        count = self.blueprint_count(owner_index)
+        start = (page - 1) * self.page_size
+        rng = self._rng("bp", owner_index, page)
+        # Les modifications d'une version ne touchent qu'une ligne sur 50
+        changes = self._rng("bp-version", owner_index, page, self.version)
+        rows = []
+        for n in range(start, min(start + self.page_size, count)):
+            is_original = rng.random() < 0.3
+            material_efficiency = rng.randint(0, 10)
+            if self.version and changes.random() < 0.02:
+                material_efficiency = changes.randint(0, 10)
+            rows.append(
+                {
+                    "item_id": ITEM_ID_BASE + owner_index * 10_000_000 + n,
+                    "type_id": BLUEPRINT_TYPE_ID_BASE
+                    + rng.randrange(self.blueprint_types),
+                    "location_id": rng.choice(self.location_ids),
+                    "location_flag": rng.choice(LOCATION_FLAGS),
+                    "quantity": -1 if is_original else -2,
+                    "runs": -1 if is_original else rng.randint(1, 300),
+                    "material_efficiency": material_efficiency,
+                    "time_efficiency": rng.randrange(0, 21, 2),
+                }
+            )
+        return rows
+
+    def job_page(self, owner_index, page):
+        """Page `page` de /corporations/{id}/industry/jobs/."""
+        count = self.job_count(owner_index)
+        blueprint_count = max(1, self.blueprint_count(owner_index))
+        start = (page - 1) * self.page_size
+        rng = self._rng("job", owner_index, page)
+        rows = []
+        for n in range(start, min(start + self.page_size, count)):
+            start_date = self.now - dt.timedelta(minutes=rng.randint(0, 7 * 24 * 60))
+            end_date = self.now + dt.timedelta(minutes=rng.randint(-60, 14 * 24 * 60))
+            rows.append(
+                {
+                    "job_id": JOB_ID_BASE + owner_index * 10_000_000 + n,
+                    "blueprint_id": ITEM_ID_BASE
+                    + owner_index * 10_000_000
+                    + rng.randrange(blueprint_count),
+                    "blueprint_type_id": BLUEPRINT_TYPE_ID_BASE
+                    + rng.randrange(self.blueprint_types),
+                    "activity_id": rng.choice(ACTIVITY_IDS),
+                    "status": "active",
+                    "runs": rng.randint(1, 20),
+                    "start_date": start_date.isoformat().replace("+00:00", "Z"),
+                    "end_date": end_date.isoformat().replace("+00:00", "Z"),
+                }
+            )
+        return rows
+
+    # --- Base de données ---
+
+    def create_owners(self):
+        """Crée les personnages et propriétaires (corporations) du jeu de données."""
+        EveCharacter.objects.bulk_create(
+            [
+                EveCharacter(
+                    character_id=CHARACTER_ID_BASE + n,
+                    character_name=f"Benchmark Director {n}",
+                    corporation_id=CORPORATION_ID_BASE + n,
+                    corporation_name=f"Benchmark Corp {n}",
+                    corporation_ticker=f"BC{n % 1000}",
+                )
+                for n in range(self.owners)
+            ]
+        )
+        # Relu depuis la base: bulk_create ne renvoie pas les clés sur tous les SGBD
+        characters = EveCharacter.objects.filter(
+            character_id__range=(CHARACTER_ID_BASE, CHARACTER_ID_BASE + self.owners - 1)
+        )
+        return BlueprintOwner.objects.bulk_create(
+            [
+                BlueprintOwner(
+                    character=character,
+                    is_corporation=True,
+                    corporation_id=character.corporation_id,
+                )
+                for character in characters
+            ]
+        )
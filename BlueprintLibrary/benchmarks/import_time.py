@@ -0,0 +1,82 @@
+"""Temps d'import des modules de l'application (`python -X importtime`).
+
+Chaque mesure tourne dans un interpréteur neuf, avec les réglages Django du
+processus courant: `django.setup()` puis l'import du module mesuré.
+"""
+
+# Standard Library
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Package de l'application (ex: "blueprints")
+PACKAGE = __package__.rpartition(".")[0]
+
+# Modules suivis: chargés au démarrage (models, admin, auth_hooks), par un worker
+# (tasks) ou à la première requête (views)
+MODULES = ("models", "admin", "auth_hooks", "tasks", "views")
+
+SCRIPT = """
+import json, sys
+import django
+django.setup()
+before = set(sys.modules)
+import {module}
+print(json.dumps(sorted(set(sys.modules) - before)))
+"""
+
+
+def _python(module, *options):
+    """Lance l'import de `module` après `django.setup()`; retourne (stdout, stderr)."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, sys.path)))
+    completed = subprocess.run(
+        [sys.executable, *options, "-c", SCRIPT.format(module=module)],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=env,
+    )
+    return completed.stdout, completed.stderr
+
+
+def parse_importtime(output):
+    """Lignes de `-X importtime`: {module: (propre µs, cumulé µs)}, total propre µs.
+
+    Pour un module importé plusieurs fois (sous-interpréteur), la première ligne
+    est gardée.
+    """
+    modules = {}
+    total = 0
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        try:
+            own, cumulative = int(fields[0]), int(fields[1])
+        except (IndexError, ValueError):
+            continue  # ligne d'en-tête
+        modules.setdefault(fields[2].strip(), (own, cumulative))
+        total += own
+    return modules, total
+
+
+def imported_modules(module):
+    """Modules chargés par l'import de `module`, une fois Django initialisé."""
+    stdout, _ = _python(module)
+    return set(json.loads(stdout.splitlines()[-1]))
+
+
+def measure(module, repeat=5):
+    """Temps d'import médian de `module` (cumulé) et du processus complet, en ms."""
+    own_ms, process_ms = [], []
+    for _ in range(repeat):
+        _, stderr = _python(module, "-X", "importtime")
+        modules, total = parse_importtime(stderr)
+        own_ms.append(modules.get(module, (0, 0))[1] / 1000)
+        process_ms.append(total / 1000)
+    return {
+        "import_ms": round(statistics.median(own_ms), 2),
+        "process_import_ms": round(statistics.median(process_ms), 2),
+    }
@@ -0,0 +1,333 @@
+"""Exécution des scénarios de benchmark et comparaison des résultats."""
+
+# Standard Library
+import json
+import multiprocessing
+import platform
+import resource
+import statistics
+import subprocess
+import time
+from contextlib import contextmanager
+from unittest import mock
+
+# Third Party
+import requests
+
+# Django
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+# Alliance Auth
+from allianceauth.eveonline.models import EveCharacter
+
+from .. import esi, tasks
+from ..metrics import SyncStats
+from ..models import Blueprint, BlueprintLocation, IndustryJob
+from ..records import BlueprintRecord
+from . import import_time
+from .fake_esi import FakeEsiServer
+from .fixtures import CORPORATION_ID_BASE, SyntheticAlliance
+
+
+class _QueryCounter:
+    """Compte les requêtes SQL sans les conserver (utilisable sur 1M de lignes)."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def _measure(results, scenario, size, **extra):
+    counter = _QueryCounter()
+    started = time.perf_counter()
+    with connection.execute_wrapper(counter):
+        yield extra
+    results.append(
+        {
+            "scenario": scenario,
+            "size": size,
+            "seconds": round(time.perf_counter() - started, 4),
+            "queries": counter.count,
+            **extra,
+        }
+    )
+
+
+def _benchmark_headers(owner):
+    # Pas de vrai token SSO: le faux ESI n'en vérifie pas
+    return {"Authorization": "Bearer benchmark"}
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _datatables_params(**extra):
+    params = {
+        "draw": "1",
+        "start": "0",
+        "length": "25",
+        "order[0][column]": "0",
+        "order[0][dir]": "asc",
+        "search[value]": "",
+    }
+    params.update(extra)
+    return params
+
+
+def _time_requests(client, url, params, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url, params)
+        timings.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.status_code
+    timings.sort()
+    return {
+        "median_ms": round(statistics.median(timings) * 1000, 2),
+        "p95_ms": round(timings[int(len(timings) * 0.95) - 1] * 1000, 2),
+    }
+
+
+def run_size(
+    size,
+    owners,
+    seed,
+    results,
+    latency=0.0,
+    repeat=20,
+    stdout=None,
+    esi_backend="requests",
+):
+    """Exécute tous les scénarios pour une bibliothèque de `size` blueprints.
+
+    Doit tourner sur une base de test vide: les tables de l'application sont
+    remplies par les tâches elles-mêmes, via le faux ESI.
+    """
+    dataset = SyntheticAlliance(
+        seed=seed, owners=owners, blueprints=size, jobs=max(1, size // 10)
+    )
+    dataset.create_owners()
+    cache.clear()
+
+    with (
+        FakeEsiServer(dataset, latency=latency) as server,
+        mock.patch.object(esi, "ESI_BASE_URL", server.url),
+        mock.patch.object(esi, "ESI_BACKEND", esi_backend),
+        mock.patch.object(tasks, "_owner_headers", _benchmark_headers),
+        # Pas de worker Celery: les types provisoires restent non résolus
+        mock.patch.object(tasks.resolve_eve_types, "delay"),
+        mock.patch.object(tasks.resolve_location_ids, "delay"),
+    ):
+        with _measure(results, "update_all_blueprints", size, run="cold"):
+            tasks.update_all_blueprints()
+        with _measure(results, "update_all_blueprints", size, run="unchanged"):
+            tasks.update_all_blueprints()
+        dataset.version += 1
+        with _measure(results, "update_all_blueprints", size, run="changed"):
+            tasks.update_all_blueprints()
+        with _measure(results, "update_all_industry_jobs", size, run="cold"):
+            tasks.update_all_industry_jobs()
+        with _measure(results, "update_all_locations", size, run="cold"):
+            tasks.update_all_locations()
+        dataset.version += 1
+        requests_before = server.stats["requests"]
+        with _measure(results, "refresh_all_owners", size, run="changed") as extra:
+            tasks.refresh_all_owners()
+            extra["esi_requests"] = server.stats["requests"] - requests_before
+        esi_stats = dict(server.stats)
+
+    user = User.objects.create_superuser(f"benchmark-{size}", password=None)
+    client = Client()
+    client.force_login(user)
+    url = reverse("blueprints:data")
+    for scenario, params in (
+        ("datatables_first_page", _datatables_params()),
+        ("datatables_search", _datatables_params(**{"search[value]": "Type 2001"})),
+        ("datatables_deep_page", _datatables_params(start=str(size // 2))),
+    ):
+        with _measure(results, scenario, size) as extra:
+            extra.update(_time_requests(client, url, params, repeat))
+
+    results.append(
+        {
+            "scenario": "dataset",
+            "size": size,
+            "blueprints": Blueprint.objects.count(),
+            "industry_jobs": IndustryJob.objects.count(),
+            "locations": BlueprintLocation.objects.count(),
+            "esi_requests": esi_stats["requests"],
+            "esi_not_modified": esi_stats["not_modified"],
+        }
+    )
+    if stdout:
+        for row in results:
+            if row["size"] == size:
+                stdout.write(json.dumps(row))
+
+
+def _rss_kb(field):
+    """Valeur (Ko) d'un champ de /proc/self/status (VmRSS, VmHWM), ou ru_maxrss."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as file:
+            for line in file:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _fetch_memory_child(url, mode, queue):
+    # Processus dédié: le pic de RSS ne mesure que la récupération d'un propriétaire
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as file:
+            file.write("5")  # remet VmHWM au niveau courant (Linux)
+    except OSError:
+        pass
+    cache.clear()  # pas d'ETag hérité du processus parent
+    baseline = _rss_kb("VmRSS")
+    headers = {"Authorization": "Bearer benchmark"}
+    rows = 0
+    if mode == "stream":
+        for _ in esi.fetch_pages(url, headers, SyncStats(), BlueprintRecord):
+            rows += 1
+    else:
+        # Ancien comportement: toutes les pages décodées en dictionnaires
+        pages = []
+        page = 1
+        total_pages = 1
+        while page <= total_pages:
+            response = requests.get(url, headers=headers, params={"page": page})
+            total_pages = int(response.headers["X-Pages"])
+            pages.append(response.json())
+            page += 1
+        rows = sum(len(data) for data in pages)
+    queue.put(
+        {"rows": rows, "peak_rss_mb": round((_rss_kb("VmHWM") - baseline) / 1024, 1)}
+    )
+
+
+def run_fetch_memory(size, seed, results, stdout=None):
+    """Pic de RSS pour récupérer une corporation de `size` blueprints.
+
+    Compare le décodage au fil de l'eau ("stream") au chargement complet des
+    pages en dictionnaires ("json"), chacun dans un processus fils.
+    """
+    dataset = SyntheticAlliance(seed=seed, owners=1, blueprints=size, jobs=0)
+    context = multiprocessing.get_context("fork")
+    with FakeEsiServer(dataset) as server:
+        url = f"{server.url}/corporations/{CORPORATION_ID_BASE}/blueprints/"
+        for mode in ("stream", "json"):
+            queue = context.Queue()
+            started = time.perf_counter()
+            process = context.Process(
+                target=_fetch_memory_child, args=(url, mode, queue)
+            )
+            process.start()
+            row = queue.get()
+            process.join()
+            row.update(
+                scenario="fetch_memory",
+                size=size,
+                run=mode,
+                seconds=round(time.perf_counter() - started, 4),
+            )
+            results.append(row)
+            if stdout:
+                stdout.write(json.dumps(row))
+
+
+def run_import_time(results, repeat=5, stdout=None):
+    """Temps d'import des modules de l'application, chacun dans un interpréteur neuf."""
+    for name in import_time.MODULES:
+        row = {
+            "scenario": "import_time",
+            "size": 0,
+            "run": name,
+            **import_time.measure(f"{import_time.PACKAGE}.{name}", repeat),
+        }
+        results.append(row)
+        if stdout:
+            stdout.write(json.dumps(row))
+
+
+def run(
+    sizes,
+    owners=10,
+    seed=42,
+    latency=0.0,
+    repeat=20,
+    memory_size=100_000,
+    stdout=None,
+    esi_backend="requests",
+    import_repeat=5,
+):
+    """Exécute la suite pour chaque taille et retourne un document JSON sérialisable."""
+    results = []
+    if import_repeat:
+        run_import_time(results, import_repeat, stdout)
+    if memory_size:
+        run_fetch_memory(memory_size, seed, results, stdout)
+    for size in sizes:
+        run_size(size, owners, seed, results, latency, repeat, stdout, esi_backend)
+        # Base vidée entre deux tailles pour des mesures indépendantes
+        # (supprimer les personnages supprime en cascade owners, blueprints et jobs)
+        EveCharacter.objects.filter(character_name__startswith="Benchmark ").delete()
+        BlueprintLocation.objects.all().delete()
+        User.objects.filter(username__startswith="benchmark-").delete()
+    return {
+        "meta": {
+            "revision": _git_revision(),
+            "date": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "database": connection.vendor,
+            "seed": seed,
+            "owners": owners,
+            "latency": latency,
+            "esi_backend": esi_backend,
+        },
+        "results": results,
+    }
+
+
+# Métrique comparée d'une ligne de résultats, par ordre de préférence
+METRICS = ("median_ms", "peak_rss_mb", "import_ms", "seconds")
+
+
+def _key(row):
+    return (row["scenario"], row["size"], row.get("run", ""))
+
+
+def compare(previous, current):
+    """Lignes "scénario, taille, avant, après, ratio" entre deux documents de résultats."""
+    before = {_key(row): row for row in previous["results"]}
+    lines = []
+    for row in current["results"]:
+        old = before.get(_key(row))
+        metric = next((name for name in METRICS if name in row), None)
+        if not old or metric is None or metric not in old:
+            continue
+        ratio = row[metric] / old[metric] if old[metric] else float("inf")
+        lines.append(
+            f"{row['scenario']:<28} {row['size']:>9} {row.get('run', ''):<10} "
+            f"{old[metric]:>10} -> {row[metric]:>10} {metric:<9} x{ratio:.2f}"
+        )
+    return lines
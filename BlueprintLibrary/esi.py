@@ -0,0 +1,365 @@
+"""Accès bas niveau à l'API ESI utilisé par les tâches de synchronisation."""
+
+# Standard Library
+import codecs
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Third Party
+import requests
+
+# Django
+from django.core.cache import cache
+from django.db import transaction
+
+# Alliance Auth
+from allianceauth.services.hooks import get_extension_logger
+
+from .app_settings import (
+    BLUEPRINTS_ESI_BACKEND,
+    BLUEPRINTS_ESI_BASE_URL,
+    BLUEPRINTS_ESI_CONCURRENCY,
+    BLUEPRINTS_ESI_ETAG_TIMEOUT,
+    BLUEPRINTS_ESI_MAX_RETRIES,
+)
+
+# Lu à chaque appel (via esi_url) pour pouvoir pointer vers un faux ESI local
+ESI_BASE_URL = BLUEPRINTS_ESI_BASE_URL
+# Backend de `prefetch_all`: "requests" (threads) ou "httpx" (asyncio)
+ESI_BACKEND = BLUEPRINTS_ESI_BACKEND
+
+logger = get_extension_logger(__name__)
+
+# Codes HTTP transitoires pour lesquels une nouvelle tentative a du sens
+RETRY_STATUS_CODES = {420, 502, 503, 504}
+
+
+class EsiError(Exception):
+    """Réponse ESI inattendue (code HTTP différent de 200)."""
+
+    def __init__(self, status_code, url):
+        super().__init__(f"ESI a répondu {status_code} pour {url}")
+        self.status_code = status_code
+        self.url = url
+
+
+def esi_url(path):
+    """URL complète d'un chemin ESI (ex: "/universe/names/")."""
+    return f"{ESI_BASE_URL}{path}"
+
+
+def _etag_key(url, page):
+    return f"blueprints:esi:etag:{url}:{page}"
+
+
+def _retry_delay(response, attempt):
+    if response.status_code == 420:
+        # Limite d'erreurs ESI atteinte: on attend la réinitialisation de la fenêtre
+        return int(response.headers.get("X-Esi-Error-Limit-Reset", 60))
+    return min(2**attempt, 30)
+
+
+def get_page(url, headers, stats, params=None, etag=None, stream=False):
+    """GET ESI avec nouvelles tentatives sur erreur transitoire.
+
+    Envoie `If-None-Match` si `etag` est fourni; une réponse 304 est alors renvoyée
+    telle quelle à l'appelant. Avec `stream`, le corps n'est pas encore téléchargé.
+    """
+    headers = dict(headers)
+    if etag:
+        headers["If-None-Match"] = etag
+    attempt = 0
+    while True:
+        with stats.phase("fetch"):
+            response = requests.get(
+                url, headers=headers, params=params, timeout=30, stream=stream
+            )
+        stats.http_status = response.status_code
+        if (
+            response.status_code not in RETRY_STATUS_CODES
+            or attempt >= BLUEPRINTS_ESI_MAX_RETRIES
+        ):
+            return response
+        response.close()
+        time.sleep(_retry_delay(response, attempt))
+        attempt += 1
+
+
+def iter_json_array(chunks):
+    """Décode un tableau JSON au fil de l'eau et produit ses éléments un par un.
+
+    `chunks` est un itérable de morceaux d'octets (ex: `response.iter_content()`):
+    seul l'élément en cours de réception est gardé en mémoire, jamais la page entière.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    started = False
+    finished = False
+
+    def skip_whitespace():
+        nonlocal pos
+        while pos < len(buffer) and buffer[pos] in " \t\n\r":
+            pos += 1
+
+    for final, chunk in _with_last(chunks):
+        buffer = buffer[pos:] + text_decoder.decode(chunk, final=final)
+        pos = 0
+        while not finished:
+            skip_whitespace()
+            if pos >= len(buffer):
+                break
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError("Réponse ESI: tableau JSON attendu")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                finished = True
+                pos += 1
+                break
+            if buffer[pos] == ",":
+                pos += 1
+                continue
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                break  # élément incomplet: on attend le morceau suivant
+            if end == len(buffer) and not final and buffer[end - 1] not in '}]"':
+                break  # un nombre en fin de morceau peut encore se prolonger
+            pos = end
+            yield item
+    skip_whitespace()
+    if not finished or pos < len(buffer):
+        raise ValueError("Réponse ESI: tableau JSON incomplet ou invalide")
+
+
+def _with_last(iterable):
+    """Produit (est_le_dernier, élément) pour chaque élément de `iterable`."""
+    iterator = iter(iterable)
+    try:
+        previous = next(iterator)
+    except StopIteration:
+        yield True, b""
+        return
+    for item in iterator:
+        yield False, previous
+        previous = item
+    yield True, previous
+
+
+def _compact(items, record_class):
+    """Convertit chaque dictionnaire ESI en enregistrement `record_class` (cf. records)."""
+    for item in items:
+        yield record_class.from_esi(item)
+
+
+class EsiRows:
+    """Lignes d'un endpoint ESI paginé, téléchargées et décodées à la demande.
+
+    S'itère une seule fois et produit des enregistrements `record_class` (cf.
+    records), au fil du téléchargement ou depuis la mémoire après `prefetch`.
+    Après itération, `not_modified` vaut True si toutes les pages ont répondu 304
+    (aucune ligne n'est alors produite). Une erreur survenue pendant un
+    téléchargement groupé (`prefetch_all`) est levée à l'itération.
+
+    Les ETag des pages reçues ne sont enregistrés que par `commit_etags`, une fois
+    les lignes écrites: si l'écriture échoue ou n'a pas lieu, la synchronisation
+    suivante retélécharge les pages au lieu de recevoir des 304.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, url, headers, stats, record_class, params=None):
+        self.url = url
+        self.headers = headers
+        self.stats = stats
+        self.record_class = record_class
+        self.params = params or {}
+        self.not_modified = False
+        self._rows = None
+        self.error = None
+        # ETag reçus {clé de cache: ETag}, en attente de `commit_etags`
+        self.etags = {}
+
+    def prefetch(self):
+        """Télécharge et décode toutes les pages maintenant (ex: dans un thread).
+
+        Les lignes sont alors gardées en mémoire pour l'itération qui suit.
+        """
+        self._rows = list(self._iter_pages())
+        return self
+
+    def parse(self, body):
+        """Enregistrements d'une page téléchargée d'un bloc (backend asynchrone).
+
+        Appelée dès la réception de la page: seuls les enregistrements compacts
+        sont gardés jusqu'à l'écriture, le corps brut peut être libéré aussitôt.
+        """
+        with self.stats.phase("parse"):
+            items = json.loads(body)
+            if not isinstance(items, list):
+                raise ValueError("Réponse ESI: tableau JSON attendu")
+            records = list(_compact(items, self.record_class))
+        self.stats.rows_received += len(records)
+        return records
+
+    def load(self, pages):
+        """Garde en mémoire des pages déjà décodées (backend asynchrone).
+
+        `pages` est une liste de (page, ETag, enregistrements) (cf. `parse`), ou
+        None si aucune page n'a changé depuis les ETag en cache.
+        """
+        if pages is None:
+            self.not_modified = True
+            self._rows = []
+            return self
+        rows = []
+        for page, etag, records in pages:
+            rows.extend(records)
+            if etag:
+                self.etags[_etag_key(self.url, page)] = etag
+        self._rows = rows
+        return self
+
+    def commit_etags(self):
+        """Enregistre les ETag des pages reçues quand la transaction en cours est
+        validée (immédiatement hors transaction).
+
+        À appeler une fois les lignes écrites en base.
+        """
+        etags, self.etags = self.etags, {}
+        if etags:
+            transaction.on_commit(
+                lambda: cache.set_many(etags, BLUEPRINTS_ESI_ETAG_TIMEOUT)
+            )
+
+    def _stream(self, response, page):
+        stats = self.stats
+        chunks = response.iter_content(chunk_size=self.CHUNK_SIZE)
+        items = _compact(iter_json_array(_timed(chunks, stats)), self.record_class)
+        while True:
+            with stats.phase("parse"):
+                row = next(items, None)
+            if row is None:
+                break
+            stats.rows_received += 1
+            yield row
+        if "ETag" in response.headers:
+            self.etags[_etag_key(self.url, page)] = response.headers["ETag"]
+
+    def _get(self, page, etag=None):
+        response = get_page(
+            self.url,
+            self.headers,
+            self.stats,
+            {**self.params, "page": page},
+            etag=etag,
+            stream=True,
+        )
+        if response.status_code not in (200, 304):
+            response.close()
+            raise EsiError(response.status_code, self.url)
+        self.stats.pages += 1
+        return response
+
+    def __iter__(self):
+        if self.error is not None:
+            raise self.error
+        if self._rows is not None:
+            rows, self._rows = self._rows, None
+            return iter(rows)
+        return self._iter_pages()
+
+    def _iter_pages(self):
+        # Pages répondant 304 avant la première page modifiée: à redemander
+        # sans ETag dès qu'on sait que les données ont changé
+        pending = []
+        changed = False
+        page = 1
+        total_pages = 1
+        while page <= total_pages:
+            etag = cache.get(_etag_key(self.url, page))
+            response = self._get(page, etag=etag)
+            total_pages = int(response.headers.get("X-Pages", total_pages))
+            if response.status_code == 304:
+                response.close()
+                if changed:
+                    response = self._get(page)
+                else:
+                    pending.append(page)
+                    page += 1
+                    continue
+            changed = True
+            with response:
+                yield from self._stream(response, page)
+            for pending_page in pending:
+                with self._get(pending_page) as pending_response:
+                    yield from self._stream(pending_response, pending_page)
+            pending = []
+            page += 1
+        self.not_modified = not changed
+
+
+def _timed(chunks, stats):
+    """Chronomètre la réception de chaque morceau dans la phase "fetch"."""
+    iterator = iter(chunks)
+    while True:
+        with stats.phase("fetch"):
+            chunk = next(iterator, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def fetch_pages(url, headers, stats, record_class, params=None):
+    """Enregistrements (`record_class`) de toutes les pages d'un endpoint ESI paginé.
+
+    Les pages sont téléchargées et décodées au fil de l'itération: la mémoire
+    utilisée dépend de la taille d'une page, pas du nombre total de lignes. Les
+    ETag de chaque page sont conservés en cache (cf. `EsiRows.commit_etags`) et
+    une page inchangée (304) n'est redemandée que si une autre page a changé; si
+    aucune n'a changé, rien n'est produit et `not_modified` est vrai une fois
+    l'itération terminée.
+
+    Le téléchargement et le décodage JSON sont chronométrés séparément dans
+    `stats` (phases "fetch" et "parse"), qui compte aussi les pages reçues.
+    """
+    return EsiRows(url, headers, stats, record_class, params)
+
+
+def _prefetch(rows):
+    try:
+        rows.prefetch()
+    except Exception as exc:
+        rows.error = exc
+
+
+def prefetch_all(rows_list):
+    """Télécharge ensemble toutes les pages de plusieurs `EsiRows`.
+
+    Avec le backend "httpx", toutes les pages partent en parallèle depuis une
+    boucle asyncio (cf. esi_async); sinon chaque endpoint est téléchargé dans son
+    propre thread. Les erreurs sont gardées sur chaque `EsiRows` et levées à son
+    itération: l'échec d'un propriétaire n'empêche pas d'écrire les autres.
+    """
+    rows_list = list(rows_list)
+    if not rows_list:
+        return rows_list
+    if ESI_BACKEND == "httpx":
+        # Import à la demande: httpx est une dépendance optionnelle
+        from . import esi_async
+
+        if esi_async.is_available():
+            return esi_async.prefetch_all(rows_list)
+        logger.warning("BLUEPRINTS_ESI_BACKEND=httpx mais httpx n'est pas installé")
+    with ThreadPoolExecutor(
+        max_workers=min(len(rows_list), BLUEPRINTS_ESI_CONCURRENCY)
+    ) as pool:
+        list(pool.map(_prefetch, rows_list))
+    return rows_list
@@ -0,0 +1,136 @@
+"""Téléchargement asynchrone (asyncio + httpx) des pages ESI de plusieurs endpoints.
+
+Toutes les pages de tous les `EsiRows` demandés partent en parallèle depuis un seul
+processus, dans la limite de `BLUEPRINTS_ESI_CONCURRENCY` requêtes simultanées:
+le temps d'un cycle dépend alors de la latence d'ESI, pas du nombre de pages.
+Mêmes règles que le backend synchrone (cf. esi): nouvelles tentatives sur erreur
+transitoire, ETag par page, pages inchangées redemandées si une autre a changé.
+
+httpx est une dépendance optionnelle (extra "async").
+"""
+
+# Standard Library
+import asyncio
+
+# Django
+from django.core.cache import cache
+
+from .app_settings import BLUEPRINTS_ESI_CONCURRENCY, BLUEPRINTS_ESI_MAX_RETRIES
+from .esi import RETRY_STATUS_CODES, EsiError, _etag_key, _retry_delay
+
+try:
+    # Third Party
+    import httpx
+except ImportError:  # pragma: no cover - extra "async" non installé
+    httpx = None
+
+
+def is_available():
+    return httpx is not None
+
+
+async def _get(client, semaphore, rows, page, etag=None):
+    headers = dict(rows.headers)
+    if etag:
+        headers["If-None-Match"] = etag
+    params = {**rows.params, "page": page}
+    attempt = 0
+    while True:
+        async with semaphore:
+            response = await client.get(rows.url, headers=headers, params=params)
+        rows.stats.http_status = response.status_code
+        if (
+            response.status_code not in RETRY_STATUS_CODES
+            or attempt >= BLUEPRINTS_ESI_MAX_RETRIES
+        ):
+            break
+        await asyncio.sleep(_retry_delay(response, attempt))
+        attempt += 1
+    if response.status_code not in (200, 304):
+        raise EsiError(response.status_code, rows.url)
+    rows.stats.pages += 1
+    return response
+
+
+async def _page(client, semaphore, rows, page, etag=None):
+    """Page `page` de `rows` décodée dès réception: (ETag, enregistrements), ou
+    None si elle n'a pas changé (304). La réponse, et son corps, sont libérés."""
+    response = await _get(client, semaphore, rows, page, etag)
+    return _decoded(rows, response)
+
+
+def _decoded(rows, response):
+    if response.status_code == 304:
+        return None
+    return response.headers.get("ETag"), rows.parse(response.content)
+
+
+async def _fetch(client, semaphore, rows):
+    """Pages de `rows`: [(page, ETag, enregistrements)], ou None si aucune n'a
+    changé.
+
+    La première page donne le nombre de pages (X-Pages), les suivantes partent
+    ensemble. Chaque page est décodée dès sa réception: seuls les enregistrements
+    restent en mémoire, pas les corps des réponses.
+    """
+    first = await _get(client, semaphore, rows, 1, cache.get(_etag_key(rows.url, 1)))
+    total_pages = int(first.headers.get("X-Pages", 1))
+    pages = [_decoded(rows, first)]
+    # Le corps de la première page n'attend pas le téléchargement des suivantes
+    del first
+    etags = cache.get_many(
+        [_etag_key(rows.url, page) for page in range(2, total_pages + 1)]
+    )
+    pages += await asyncio.gather(
+        *(
+            _page(client, semaphore, rows, page, etags.get(_etag_key(rows.url, page)))
+            for page in range(2, total_pages + 1)
+        )
+    )
+    unchanged = [page for page, decoded in enumerate(pages, start=1) if decoded is None]
+    if len(unchanged) == len(pages):
+        return None
+    # Données modifiées: les pages inchangées sont redemandées sans ETag
+    for page, decoded in zip(
+        unchanged,
+        await asyncio.gather(
+            *(_page(client, semaphore, rows, page) for page in unchanged)
+        ),
+    ):
+        pages[page - 1] = decoded
+    return [(page, *decoded) for page, decoded in enumerate(pages, start=1)]
+
+
+async def _timed_fetch(client, semaphore, rows):
+    with rows.stats.phase("fetch"):
+        return await _fetch(client, semaphore, rows)
+
+
+async def _fetch_all(rows_list, transport=None):
+    # Le sémaphore borne les requêtes en vol: les autres attendent leur tour sans
+    # consommer le délai d'attente d'une connexion du pool httpx
+    semaphore = asyncio.Semaphore(BLUEPRINTS_ESI_CONCURRENCY)
+    async with httpx.AsyncClient(
+        timeout=30,
+        limits=httpx.Limits(max_connections=BLUEPRINTS_ESI_CONCURRENCY),
+        transport=transport,
+    ) as client:
+        return await asyncio.gather(
+            *(_timed_fetch(client, semaphore, rows) for rows in rows_list),
+            return_exceptions=True,
+        )
+
+
+def prefetch_all(rows_list, transport=None):
+    """Télécharge toutes les pages de `rows_list` (cf. esi.prefetch_all)."""
+    results = asyncio.run(_fetch_all(rows_list, transport))
+    for rows, result in zip(rows_list, results):
+        if isinstance(result, Exception):
+            rows.error = result
+            continue
+        try:
+            rows.load(result)
+        except Exception as exc:
+            # Page mal formée: seul ce propriétaire échoue, comme avec les threads
+            rows.error = exc
+    return rows_list
@@ -0,0 +1,201 @@
+"""Filtres de la bibliothèque (original/copie, ME, TE, propriétaire, emplacement,
+groupe, en job) et leurs compteurs.
+
+Les compteurs sont précalculés par propriétaire (`FacetCount`) à chaque
+synchronisation qui modifie ses données: afficher les compteurs d'un périmètre ne
+somme que quelques centaines de lignes, au lieu de regrouper tous les blueprints
+visibles à chaque frappe. Les compteurs portent sur tout le périmètre, sans tenir
+compte des filtres déjà appliqués.
+"""
+
+# Django
+from django.db import transaction
+from django.db.models import Case, Count, Exists, F, OuterRef, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+# Alliance Auth (External Libs)
+from eveuniverse.models import EveEntity, EveGroup
+
+from .models import (
+    Blueprint,
+    BlueprintLocation,
+    BlueprintOwner,
+    FacetCount,
+    IndustryJob,
+)
+from .versions import visible_owners_q
+
+Facet = FacetCount.Facet
+
+# Valeurs du filtre "kind" (cf. Blueprint.is_original)
+KIND_COPY = 0
+KIND_ORIGINAL = 1
+
+
+def _is_original():
+    return Q(runs=-1) | Q(quantity=-1)
+
+
+def _is_busy():
+    return Exists(
+        IndustryJob.objects.filter(
+            blueprint=OuterRef("pk"), status__in=IndustryJob.BUSY_STATUSES
+        )
+    )
+
+
+def _expressions():
+    """Expression de la valeur de chaque filtre (hors propriétaire), par blueprint."""
+    return {
+        Facet.KIND: Case(
+            When(_is_original(), then=Value(KIND_ORIGINAL)), default=Value(KIND_COPY)
+        ),
+        Facet.ME: F("material_efficiency"),
+        Facet.TE: F("time_efficiency"),
+        Facet.LOCATION: Coalesce("root_location_id", "location_id"),
+        Facet.GROUP: F("eve_type__eve_group_id"),
+        Facet.BUSY: Case(When(_is_busy(), then=Value(1)), default=Value(0)),
+    }
+
+
+def rebuild_owner_facets(owner, facets=None):
+    """Recalcule les compteurs `facets` (tous par défaut) d'un propriétaire.
+
+    À appeler dans la transaction qui écrit ses données, comme pour la frise des jobs.
+    """
+    blueprints = Blueprint.objects.filter(owner=owner)
+    facets = set(facets or Facet.values)
+    counts = []
+    for facet, expression in _expressions().items():
+        if facet not in facets:
+            continue
+        rows = (
+            blueprints.annotate(value=expression)
+            .values("value")
+            .annotate(count=Count("pk"))
+            .order_by()
+        )
+        counts += [
+            FacetCount(owner=owner, facet=facet, value=row["value"], count=row["count"])
+            for row in rows
+        ]
+    if Facet.OWNER in facets:
+        total = blueprints.count()
+        if total:
+            counts.append(
+                FacetCount(owner=owner, facet=Facet.OWNER, value=owner.pk, count=total)
+            )
+    with transaction.atomic():
+        FacetCount.objects.filter(owner=owner, facet__in=facets).delete()
+        FacetCount.objects.bulk_create(counts)
+
+
+def rebuild_type_facets(type_ids):
+    """Recalcule le filtre "groupe" des propriétaires ayant des blueprints `type_ids`
+    (groupe connu seulement une fois le type résolu)."""
+    owner_ids = (
+        Blueprint.objects.filter(eve_type_id__in=type_ids)
+        .values_list("owner_id", flat=True)
+        .distinct()
+    )
+    for owner in BlueprintOwner.objects.filter(pk__in=owner_ids):
+        rebuild_owner_facets(owner, [Facet.GROUP])
+
+
+def scope_counts(user):
+    """Compteurs {filtre: {valeur: nombre}} des propriétaires visibles par `user`."""
+    counts = FacetCount.objects.all()
+    visible = visible_owners_q(user, prefix="owner__")
+    if visible is not None:
+        counts = counts.filter(visible)
+    result = {facet: {} for facet in Facet.values}
+    for row in (
+        counts.values("facet", "value")
+        .annotate(total=Sum("count"))
+        .order_by("facet", "value")
+    ):
+        result[row["facet"]][row["value"]] = row["total"]
+    return result
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _int_list(values):
+    return [value for value in map(_int, values) if value is not None]
+
+
+def apply_filters(queryset, params):
+    """Applique à `queryset` les filtres présents dans `params` (QueryDict).
+
+    `kind` (original/copy), `me_min`, `me_max`, `te_min`, `te_max`, `owner`,
+    `location` et `group` (répétables), `busy` (1 ou 0). Une valeur invalide est
+    ignorée.
+    """
+    kind = params.get("kind")
+    if kind == "original":
+        queryset = queryset.filter(_is_original())
+    elif kind == "copy":
+        queryset = queryset.exclude(_is_original())
+    for field, name in (
+        ("material_efficiency", "me"),
+        ("time_efficiency", "te"),
+    ):
+        low, high = _int(params.get(f"{name}_min")), _int(params.get(f"{name}_max"))
+        if low is not None:
+            queryset = queryset.filter(**{f"{field}__gte": low})
+        if high is not None:
+            queryset = queryset.filter(**{f"{field}__lte": high})
+    owners = _int_list(params.getlist("owner"))
+    if owners:
+        queryset = queryset.filter(owner_id__in=owners)
+    locations = _int_list(params.getlist("location"))
+    if locations:
+        # Même valeur que le compteur: racine, sinon emplacement brut
+        queryset = queryset.filter(
+            Q(root_location_id__in=locations)
+            | Q(root_location_id__isnull=True, location_id__in=locations)
+        )
+    groups = _int_list(params.getlist("group"))
+    if groups:
+        queryset = queryset.filter(eve_type__eve_group_id__in=groups)
+    busy = params.get("busy")
+    if busy in ("0", "1"):
+        queryset = queryset.filter(_is_busy() if busy == "1" else ~_is_busy())
+    return queryset
+
+
+def labels(counts):
+    """Libellés {filtre: {valeur: libellé}} des valeurs présentes dans `counts`."""
+    result = {
+        Facet.KIND: {KIND_COPY: "Copie", KIND_ORIGINAL: "Original"},
+        Facet.BUSY: {0: "Libre", 1: "En cours de job"},
+        Facet.ME: {value: f"{value}%" for value in counts[Facet.ME]},
+        Facet.TE: {value: f"{value}%" for value in counts[Facet.TE]},
+    }
+    result[Facet.OWNER] = {
+        owner.pk: str(owner)
+        for owner in BlueprintOwner.objects.select_related("character").filter(
+            pk__in=counts[Facet.OWNER]
+        )
+    }
+    result[Facet.GROUP] = dict(
+        EveGroup.objects.filter(id__in=counts[Facet.GROUP]).values_list("id", "name")
+    )
+    # Stations (EveEntity), sinon structures résolues
+    locations = dict(
+        BlueprintLocation.objects.filter(id__in=counts[Facet.LOCATION])
+        .exclude(name="")
+        .values_list("id", "name")
+    )
+    locations.update(
+        EveEntity.objects.filter(id__in=counts[Facet.LOCATION]).values_list(
+            "id", "name"
+        )
+    )
+    result[Facet.LOCATION] = locations
+    return result
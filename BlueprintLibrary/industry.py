@@ -0,0 +1,226 @@
+"""Données industrielles des blueprints (SDE) et calcul des matériaux/temps ME/TE."""
+
+# Standard Library
+import bz2
+import csv
+import math
+from collections import defaultdict
+
+# Third Party
+import requests
+
+# Django
+from django.core.cache import cache
+from django.db import transaction
+
+# Alliance Auth
+from allianceauth.services.hooks import get_extension_logger
+
+from .app_settings import BLUEPRINTS_SDE_BASE_URL
+from .models import Blueprint, BlueprintActivity, BlueprintRequest
+
+logger = get_extension_logger(__name__)
+
+# Version des données chargées, partagée entre processus (invalide les calculs en cache)
+DATA_VERSION_KEY = "blueprints:industry:version"
+
+# Activités dont on calcule la facture de matériaux
+BUILD_ACTIVITIES = (
+    BlueprintActivity.Activity.MANUFACTURING,
+    BlueprintActivity.Activity.REACTION,
+)
+
+
+def _sde_rows(name, type_ids):
+    """Lignes d'un export CSV du SDE (Fuzzwork), limitées aux types `type_ids`.
+
+    Le fichier compressé est décodé au fil du téléchargement.
+    """
+    url = f"{BLUEPRINTS_SDE_BASE_URL}/{name}.csv.bz2"
+    with requests.get(url, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        with bz2.open(response.raw, "rt", encoding="utf-8", newline="") as file:
+            for row in csv.DictReader(file):
+                if int(row["typeID"]) in type_ids:
+                    yield row
+
+
+def library_type_ids():
+    """Types de blueprint présents dans la bibliothèque ou demandés."""
+    type_ids = set(Blueprint.objects.values_list("eve_type_id", flat=True).distinct())
+    type_ids.update(
+        BlueprintRequest.objects.values_list("blueprint_type_id", flat=True).distinct()
+    )
+    return type_ids
+
+
+def load_activities(type_ids):
+    """Recharge les activités des types `type_ids` depuis le SDE.
+
+    Retourne le nombre de lignes `BlueprintActivity` écrites.
+    """
+    activities = {}
+    for row in _sde_rows("industryActivity", type_ids):
+        key = (int(row["typeID"]), int(row["activityID"]))
+        activities[key] = BlueprintActivity(
+            blueprint_type_id=key[0], activity=key[1], time=int(row["time"])
+        )
+    for row in _sde_rows("industryActivityProducts", type_ids):
+        activity = activities.get((int(row["typeID"]), int(row["activityID"])))
+        # Un seul produit par activité (l'invention en liste plusieurs: on garde le 1er)
+        if activity is not None and activity.product_type_id is None:
+            activity.product_type_id = int(row["productTypeID"])
+            activity.product_quantity = int(row["quantity"])
+    materials = defaultdict(list)
+    for row in _sde_rows("industryActivityMaterials", type_ids):
+        key = (int(row["typeID"]), int(row["activityID"]))
+        materials[key].append((int(row["materialTypeID"]), int(row["quantity"])))
+    for key, activity in activities.items():
+        pairs = sorted(materials.get(key, ()))
+        activity.material_type_ids = [type_id for type_id, _ in pairs]
+        activity.material_quantities = [quantity for _, quantity in pairs]
+
+    with transaction.atomic():
+        BlueprintActivity.objects.filter(blueprint_type_id__in=type_ids).delete()
+        BlueprintActivity.objects.bulk_create(activities.values(), batch_size=1000)
+    # Nouvelle version: les calculateurs de tous les processus repartent de zéro
+    cache.set(DATA_VERSION_KEY, cache.get(DATA_VERSION_KEY, 0) + 1, None)
+    logger.info(
+        "%d activités industrielles chargées pour %d types",
+        len(activities),
+        len(type_ids),
+    )
+    return len(activities)
+
+
+def material_quantities(factors, runs):
+    """Quantités de matériaux pour `runs` runs (formule d'EVE).
+
+    `factors` sont les quantités de base par run, ME déjà appliqué:
+    max(runs, ceil(round(runs * base * (1 - ME/100), 2))), soit jamais moins d'une
+    unité par run.
+    """
+    return [max(runs, math.ceil(round(factor * runs, 2))) for factor in factors]
+
+
+class BuildCost:
+    """Facture de matériaux et durée d'un blueprint pour un nombre de runs."""
+
+    __slots__ = (
+        "blueprint_type_id",
+        "runs",
+        "time",
+        "product_type_id",
+        "product_quantity",
+        "materials",
+    )
+
+    def __init__(
+        self,
+        blueprint_type_id,
+        runs,
+        time,
+        product_type_id,
+        product_quantity,
+        materials,
+    ):
+        self.blueprint_type_id = blueprint_type_id
+        self.runs = runs
+        # Durée totale en secondes (TE appliqué, sans compétences ni structure)
+        self.time = time
+        self.product_type_id = product_type_id
+        self.product_quantity = product_quantity
+        # Liste [(type de matériau, quantité)]
+        self.materials = materials
+
+
+class _Profile:
+    """Données d'une activité pour un (type, ME, TE): calculées une seule fois."""
+
+    __slots__ = ("activity", "material_factors", "time_per_run")
+
+    def __init__(self, activity, material_efficiency, time_efficiency):
+        self.activity = activity
+        self.material_factors = [
+            quantity * (1 - material_efficiency / 100)
+            for quantity in activity.material_quantities
+        ]
+        self.time_per_run = activity.time * (1 - time_efficiency / 100)
+
+    def build(self, runs):
+        activity = self.activity
+        return BuildCost(
+            activity.blueprint_type_id,
+            runs,
+            round(self.time_per_run * runs),
+            activity.product_type_id,
+            activity.product_quantity * runs,
+            list(
+                zip(
+                    activity.material_type_ids,
+                    material_quantities(self.material_factors, runs),
+                )
+            ),
+        )
+
+
+class IndustryCalculator:
+    """Calcule matériaux et durées pour de nombreux blueprints en un appel.
+
+    Les activités sont lues en une requête pour tous les types inconnus d'un appel,
+    puis conservées par processus avec les profils (type, ME, TE); le tout est vidé
+    dès que `load_activities` publie une nouvelle version des données.
+    """
+
+    def __init__(self):
+        self._version = None
+        self._activities = {}
+        self._profiles = {}
+
+    def _check_version(self):
+        version = cache.get(DATA_VERSION_KEY, 0)
+        if version != self._version:
+            self._version = version
+            self._activities = {}
+            self._profiles = {}
+
+    def _load(self, type_ids):
+        missing = set(type_ids) - self._activities.keys()
+        if not missing:
+            return
+        found = {}
+        for activity in BlueprintActivity.objects.filter(
+            blueprint_type_id__in=missing, activity__in=BUILD_ACTIVITIES
+        ):
+            # Un blueprint fabrique ou réagit, jamais les deux
+            found[activity.blueprint_type_id] = activity
+        for type_id in missing:
+            self._activities[type_id] = found.get(type_id)
+
+    def compute(self, jobs):
+        """Coûts pour `jobs`, itérable de (type de blueprint, ME, TE, runs).
+
+        Retourne une liste alignée sur `jobs`: `BuildCost`, ou None si le type n'a
+        pas d'activité de fabrication connue.
+        """
+        jobs = list(jobs)
+        self._check_version()
+        self._load(type_id for type_id, _, _, _ in jobs)
+        results = []
+        for type_id, material_efficiency, time_efficiency, runs in jobs:
+            key = (type_id, material_efficiency, time_efficiency)
+            profile = self._profiles.get(key)
+            if profile is None:
+                activity = self._activities[type_id]
+                if activity is None:
+                    results.append(None)
+                    continue
+                profile = self._profiles[key] = _Profile(
+                    activity, material_efficiency, time_efficiency
+                )
+            results.append(profile.build(runs))
+        return results
+
+
+calculator = IndustryCalculator()
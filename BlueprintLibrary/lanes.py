@@ -0,0 +1,71 @@
+"""Voies Celery des tâches: file et priorité de chaque famille de tâches.
+
+- "bulk": synchronisations planifiées de tous les propriétaires (beat);
+- "interactive": rafraîchissements demandés par un utilisateur (admin), traités
+  avant le reste;
+- "background": résolution des noms (emplacements, types), sans urgence.
+
+Sans file dédiée (réglage None), les tâches vont dans la file par défaut d'Auth et
+seule leur priorité les départage (cf. broker_transport_options dans celery.py).
+"""
+
+# Standard Library
+from collections import defaultdict
+
+from .app_settings import (
+    BLUEPRINTS_BACKGROUND_CONCURRENCY,
+    BLUEPRINTS_BACKGROUND_PRIORITY,
+    BLUEPRINTS_BACKGROUND_QUEUE,
+    BLUEPRINTS_BULK_CONCURRENCY,
+    BLUEPRINTS_BULK_PRIORITY,
+    BLUEPRINTS_BULK_QUEUE,
+    BLUEPRINTS_INTERACTIVE_CONCURRENCY,
+    BLUEPRINTS_INTERACTIVE_QUEUE,
+    BLUEPRINTS_REFRESH_PRIORITY,
+)
+
+BULK = "bulk"
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+# {voie: {"queue", "priority", "concurrency"}}
+LANES = {
+    BULK: {
+        "queue": BLUEPRINTS_BULK_QUEUE,
+        "priority": BLUEPRINTS_BULK_PRIORITY,
+        "concurrency": BLUEPRINTS_BULK_CONCURRENCY,
+    },
+    INTERACTIVE: {
+        "queue": BLUEPRINTS_INTERACTIVE_QUEUE,
+        "priority": BLUEPRINTS_REFRESH_PRIORITY,
+        "concurrency": BLUEPRINTS_INTERACTIVE_CONCURRENCY,
+    },
+    BACKGROUND: {
+        "queue": BLUEPRINTS_BACKGROUND_QUEUE,
+        "priority": BLUEPRINTS_BACKGROUND_PRIORITY,
+        "concurrency": BLUEPRINTS_BACKGROUND_CONCURRENCY,
+    },
+}
+
+
+def task_options(lane):
+    """Options de `shared_task` (ou de `Signature.set`) pour une tâche de `lane`."""
+    options = {"priority": LANES[lane]["priority"]}
+    if LANES[lane]["queue"]:
+        options["queue"] = LANES[lane]["queue"]
+    return options
+
+
+def worker_commands(app="myauth"):
+    """Commandes de worker conseillées, une par file dédiée.
+
+    Une file partagée par plusieurs voies reçoit la somme de leurs concurrences.
+    """
+    concurrency = defaultdict(int)
+    for lane in LANES.values():
+        if lane["queue"]:
+            concurrency[lane["queue"]] += lane["concurrency"]
+    return [
+        f"celery -A {app} worker -Q {queue} -c {total} -n {queue}@%h"
+        for queue, total in concurrency.items()
+    ]
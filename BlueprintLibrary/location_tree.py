@@ -0,0 +1,141 @@
+"""Hiérarchie des emplacements: conteneurs et bureaux remontés jusqu'à leur station.
+
+Un blueprint rangé dans un conteneur (ou dans un hangar de bureau de corporation) a
+pour `location_id` l'item_id de ce conteneur, qu'aucune API de noms ne résout. Les
+assets ESI du propriétaire donnent l'emplacement de chaque conteneur: seuls les
+liens menant des emplacements de blueprints à leur station ou structure sont gardés
+(`LocationParent`), et la racine de chaque blueprint est recopiée dans
+`Blueprint.root_location_id` pour trier et filtrer sans remonter la hiérarchie à
+la lecture.
+"""
+
+# Standard Library
+from collections import defaultdict
+
+# Django
+from django.db import transaction
+
+from .facets import rebuild_owner_facets
+from .models import Blueprint, BlueprintLocation, FacetCount, LocationParent
+from .versions import bump_owners
+
+# Profondeur maximale d'une hiérarchie (protège d'un cycle dans les données ESI)
+MAX_DEPTH = 10
+
+
+def build_links(assets, location_ids):
+    """Liens {item_id: (parent_id, flag)} menant de `location_ids` à leur racine.
+
+    `assets` est un itérable d'`AssetRecord`, parcouru une seule fois; seule la
+    position de chaque asset est gardée en mémoire.
+    """
+    positions = {
+        asset.item_id: (asset.location_id, asset.location_flag) for asset in assets
+    }
+    links = {}
+    for location_id in location_ids:
+        current = location_id
+        for _ in range(MAX_DEPTH):
+            if current in links or current not in positions:
+                break
+            links[current] = positions[current]
+            current = positions[current][0]
+    return links
+
+
+def root_of(parents, location_id):
+    """Emplacement racine de `location_id` d'après `parents` ({item_id: parent_id})."""
+    current = location_id
+    for _ in range(MAX_DEPTH):
+        parent = parents.get(current)
+        if parent is None:
+            break
+        current = parent
+    return current
+
+
+def _owner_parents(owner):
+    return dict(
+        LocationParent.objects.filter(owner=owner).values_list("item_id", "parent_id")
+    )
+
+
+def owner_roots(owner):
+    """Racine {item_id: station ou structure} des conteneurs connus du propriétaire."""
+    parents = _owner_parents(owner)
+    return {item_id: root_of(parents, item_id) for item_id in parents}
+
+
+def apply_tree(owner, assets, stats):
+    """Enregistre la hiérarchie des emplacements des blueprints d'un propriétaire.
+
+    Si les assets n'ont pas changé (ETag), les liens déjà enregistrés servent à
+    recalculer les racines des blueprints déplacés depuis. Retourne les racines
+    (stations et structures) des blueprints.
+    """
+    location_ids = set(
+        Blueprint.objects.filter(owner=owner)
+        .values_list("location_id", flat=True)
+        .distinct()
+    )
+    links = build_links(assets, location_ids)
+    changes = 0
+    with transaction.atomic():
+        if assets.not_modified:
+            parents = _owner_parents(owner)
+        else:
+            parents = {item_id: parent_id for item_id, (parent_id, _) in links.items()}
+            changes = _write_links(owner, links, stats)
+        by_root = defaultdict(list)
+        for location_id in location_ids:
+            by_root[root_of(parents, location_id)].append(location_id)
+        updated = 0
+        for root, ids in by_root.items():
+            updated += (
+                Blueprint.objects.filter(owner=owner, location_id__in=ids)
+                .exclude(root_location_id=root)
+                .update(root_location_id=root)
+            )
+        if updated:
+            rebuild_owner_facets(owner, [FacetCount.Facet.LOCATION])
+        # ETag gardés seulement si l'écriture est validée
+        assets.commit_etags()
+    stats.rows_written += updated
+    if updated or changes:
+        bump_owners([owner.pk], "locations")
+    return set(by_root)
+
+
+def _write_links(owner, links, stats):
+    """Remplace les liens enregistrés du propriétaire; retourne le nombre de changements.
+
+    À appeler dans une transaction (cf. `apply_tree`).
+    """
+    existing = {
+        item_id: (parent_id, flag)
+        for item_id, parent_id, flag in LocationParent.objects.filter(
+            owner=owner
+        ).values_list("item_id", "parent_id", "location_flag")
+    }
+    deleted, _ = LocationParent.objects.filter(
+        owner=owner, item_id__in=existing.keys() - links.keys()
+    ).delete()
+    changed = [
+        LocationParent(
+            item_id=item_id, owner=owner, parent_id=parent_id, location_flag=flag
+        )
+        for item_id, (parent_id, flag) in links.items()
+        if existing.get(item_id) != (parent_id, flag)
+    ]
+    # Un conteneur peut changer de propriétaire (item_id unique dans EVE): les
+    # lignes modifiées sont remplacées, quel que soit leur propriétaire actuel
+    # (pas d'upsert: MySQL ne le permet pas sur une colonne cible)
+    LocationParent.objects.filter(
+        item_id__in=[link.item_id for link in changed]
+    ).delete()
+    LocationParent.objects.bulk_create(changed)
+    stats.rows_written += len(changed)
+    stats.rows_deleted += deleted
+    # Conteneurs enregistrés à tort comme structures à résoudre
+    BlueprintLocation.objects.filter(id__in=links.keys(), name__exact="").delete()
+    return len(changed) + deleted
@@ -0,0 +1,72 @@
+"""Verrous de synchronisation par propriétaire et identifiants d'exécution.
+
+Deux synchronisations d'un même propriétaire (beat qui déborde sur l'exécution
+suivante, rafraîchissement manuel pendant une passe planifiée) écriraient et
+supprimeraient les mêmes lignes: la seconde est ignorée tant que la première
+tient le verrou (`cache.add`, partagé entre workers). Le verrou expire après
+BLUEPRINTS_SYNC_LOCK_TIMEOUT, si un worker s'arrête sans le rendre.
+"""
+
+# Standard Library
+import time
+import uuid
+from contextlib import contextmanager
+
+# Third Party
+from celery import current_task
+
+# Django
+from django.core.cache import cache
+
+from .app_settings import BLUEPRINTS_SYNC_LOCK_TIMEOUT
+
+# Marge (secondes) avant l'expiration du verrou au-delà de laquelle il n'est plus
+# rendu: il a pu passer à une autre exécution entre la lecture et la suppression
+RELEASE_MARGIN = 5
+
+
+class OwnerLocked(Exception):
+    """Une autre synchronisation du propriétaire est en cours."""
+
+    def __init__(self, owner_pk, run_id):
+        super().__init__(f"Synchronisation {run_id} en cours")
+        self.owner_pk = owner_pk
+        self.run_id = run_id
+
+
+def _lock_key(owner_pk):
+    return f"blueprints:sync-lock:{owner_pk}"
+
+
+def current_run_id():
+    """Identifiant de l'exécution courante: id de la tâche Celery, sinon aléatoire."""
+    request = getattr(current_task, "request", None)
+    return getattr(request, "id", None) or uuid.uuid4().hex
+
+
+def holder(owner_pk):
+    """Identifiant de l'exécution qui tient le verrou du propriétaire, ou None."""
+    return cache.get(_lock_key(owner_pk))
+
+
+@contextmanager
+def owner_lock(owner_pk, run_id, timeout=BLUEPRINTS_SYNC_LOCK_TIMEOUT):
+    """Tient le verrou de synchronisation du propriétaire pendant le bloc.
+
+    Lève `OwnerLocked` si une autre exécution le tient déjà.
+    """
+    key = _lock_key(owner_pk)
+    if not cache.add(key, run_id, timeout):
+        raise OwnerLocked(owner_pk, cache.get(key))
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        # Avant l'expiration, le verrou ne peut être qu'à nous (la lecture ne sert
+        # qu'en cas d'éviction); après, on le laisse expirer plutôt que de risquer
+        # de supprimer celui d'une autre exécution
+        if (
+            time.monotonic() - started < timeout - RELEASE_MARGIN
+            and cache.get(key) == run_id
+        ):
+            cache.delete(key)
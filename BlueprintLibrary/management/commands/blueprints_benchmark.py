@@ -0,0 +1,116 @@
+# Standard Library
+import json
+
+# Django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+from ...benchmarks import runner
+
+# Cache isolé: le benchmark vide le cache et ne doit pas toucher celui de l'instance
+BENCHMARK_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure les tâches de synchronisation et la vue DataTables sur une alliance "
+        "synthétique servie par un faux ESI local, dans une base de test dédiée."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="10000,100000,1000000",
+            help="Tailles de bibliothèque (nombre de blueprints), séparées par des virgules",
+        )
+        parser.add_argument("--owners", type=int, default=10)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.0,
+            help="Latence ajoutée à chaque réponse du faux ESI (secondes)",
+        )
+        parser.add_argument(
+            "--esi-backend",
+            choices=("requests", "httpx"),
+            default="requests",
+            help="Backend du téléchargement groupé des pages ESI (refresh_all_owners)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Nombre d'appels par scénario DataTables",
+        )
+        parser.add_argument(
+            "--memory-size",
+            type=int,
+            default=100_000,
+            help="Taille de la corporation pour la mesure du pic de RSS (0 pour ignorer)",
+        )
+        parser.add_argument(
+            "--import-repeat",
+            type=int,
+            default=5,
+            help="Mesures (python -X importtime) par module de l'application (0 pour ignorer)",
+        )
+        parser.add_argument("--output", help="Fichier JSON où écrire les résultats")
+        parser.add_argument(
+            "--compare", help="Fichier JSON d'un précédent run à comparer"
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Conserve la base de test entre deux exécutions",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options["sizes"].split(",")]
+        except ValueError as exc:
+            raise CommandError(f"--sizes invalide: {exc}") from exc
+        previous = None
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as file:
+                previous = json.load(file)
+
+        # Jamais sur la base de production: base de test créée puis détruite
+        setup_test_environment()
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options["keepdb"]
+        )
+        try:
+            with override_settings(CACHES=BENCHMARK_CACHES):
+                document = runner.run(
+                    sizes,
+                    owners=options["owners"],
+                    seed=options["seed"],
+                    latency=options["latency"],
+                    repeat=options["repeat"],
+                    memory_size=options["memory_size"],
+                    esi_backend=options["esi_backend"],
+                    import_repeat=options["import_repeat"],
+                    stdout=self.stdout,
+                )
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options["keepdb"]
+            )
+            teardown_test_environment()
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(document, file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Résultats: {options['output']}"))
+        if previous:
+            for line in runner.compare(previous, document):
+                self.stdout.write(line)
@@ -0,0 +1,29 @@
+# Django
+from django.core.management.base import BaseCommand
+
+from ...lanes import LANES, worker_commands
+
+
+class Command(BaseCommand):
+    help = (
+        "Affiche la file, la priorité et la concurrence conseillée de chaque voie "
+        "Celery des tâches, puis les commandes de worker des files dédiées."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--app", default="myauth", help="Nom de l'application Celery d'Auth"
+        )
+
+    def handle(self, *args, **options):
+        for name, lane in LANES.items():
+            queue = lane["queue"] or "(file par défaut)"
+            self.stdout.write(
+                f"{name:<12} {queue:<24} priorité {lane['priority']} "
+                f"concurrence {lane['concurrency']}"
+            )
+        commands = worker_commands(options["app"])
+        if not commands:
+            self.stdout.write("Aucune file dédiée: les workers d'Auth suffisent.")
+        for command in commands:
+            self.stdout.write(command)
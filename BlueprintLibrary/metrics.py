@@ -0,0 +1,177 @@
+"""Mesures des synchronisations et export au format texte Prometheus."""
+
+# Standard Library
+import time
+from contextlib import contextmanager
+
+from . import response_cache
+from .models import OwnerSyncStatus
+
+
+class SyncStats:
+    """Mesures collectées pendant la synchronisation d'un propriétaire."""
+
+    PHASES = ("fetch", "parse", "apply")
+
+    def __init__(self):
+        self.durations = dict.fromkeys(self.PHASES, 0.0)
+        # Temps des phases imbriquées, à retrancher de la phase englobante
+        self._nested = []
+        self.http_status = None
+        self.pages = 0
+        self.rows_received = 0
+        self.rows_written = 0
+        self.rows_deleted = 0
+
+    @contextmanager
+    def phase(self, name):
+        """Chronomètre un bloc et l'ajoute à la durée de la phase `name`.
+
+        Les phases peuvent s'imbriquer (ex: l'écriture en base consomme un
+        générateur qui télécharge et décode): chaque durée est exclusive.
+        """
+        started = time.perf_counter()
+        self._nested.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.durations[name] += elapsed - self._nested.pop()
+            if self._nested:
+                self._nested[-1] += elapsed
+
+    def as_fields(self):
+        """Valeurs à enregistrer sur `OwnerSyncStatus`."""
+        return {
+            "fetch_duration": self.durations["fetch"],
+            "parse_duration": self.durations["parse"],
+            "apply_duration": self.durations["apply"],
+            "rows_received": self.rows_received,
+            "rows_written": self.rows_written,
+            "rows_deleted": self.rows_deleted,
+            "http_status": self.http_status,
+            "pages": self.pages,
+        }
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+
+
+# (nom, type, aide, fonction retournant la liste [(labels supplémentaires, valeur)])
+_STATUS_METRICS = (
+    (
+        "blueprints_sync_duration_seconds",
+        "gauge",
+        "Durée de la dernière synchronisation, par phase",
+        lambda s: [
+            ({"phase": "total"}, s.duration),
+            ({"phase": "fetch"}, s.fetch_duration),
+            ({"phase": "parse"}, s.parse_duration),
+            ({"phase": "apply"}, s.apply_duration),
+        ],
+    ),
+    (
+        "blueprints_sync_last_timestamp_seconds",
+        "gauge",
+        "Date (epoch) de la dernière synchronisation",
+        lambda s: [({}, s.last_sync_at.timestamp())],
+    ),
+    (
+        "blueprints_sync_rows",
+        "gauge",
+        "Lignes traitées lors de la dernière synchronisation",
+        lambda s: [
+            ({"kind": "received"}, s.rows_received),
+            ({"kind": "written"}, s.rows_written),
+            ({"kind": "deleted"}, s.rows_deleted),
+        ],
+    ),
+    (
+        "blueprints_sync_pages",
+        "gauge",
+        "Pages ESI récupérées lors de la dernière synchronisation",
+        lambda s: [({}, s.pages)],
+    ),
+    (
+        "blueprints_sync_http_status",
+        "gauge",
+        "Dernier code HTTP renvoyé par ESI",
+        lambda s: [({}, s.http_status or 0)],
+    ),
+    (
+        "blueprints_sync_status",
+        "gauge",
+        "État de la dernière synchronisation (1 pour l'état courant)",
+        lambda s: [
+            ({"status": status}, int(s.status == status))
+            for status in OwnerSyncStatus.Status.values
+        ],
+    ),
+    (
+        "blueprints_sync_last_error_timestamp_seconds",
+        "gauge",
+        "Date (epoch) de la dernière erreur, 0 si aucune",
+        lambda s: [({}, s.last_error_at.timestamp() if s.last_error_at else 0)],
+    ),
+    (
+        "blueprints_sync_run_info",
+        "gauge",
+        "Identifiant d'exécution de la dernière synchronisation (toujours 1)",
+        lambda s: [({"run_id": s.run_id}, 1)],
+    ),
+    (
+        "blueprints_sync_running_since_timestamp_seconds",
+        "gauge",
+        "Début (epoch) de la synchronisation en cours, 0 si aucune",
+        lambda s: [
+            (
+                {"run_id": s.running_run_id},
+                s.running_since.timestamp() if s.running_since else 0,
+            )
+        ],
+    ),
+    (
+        "blueprints_sync_overlapping_runs_total",
+        "counter",
+        "Synchronisations ignorées car une autre était en cours",
+        lambda s: [({}, s.overlapping_runs)],
+    ),
+    (
+        "blueprints_sync_abandoned_runs_total",
+        "counter",
+        "Synchronisations commencées mais jamais terminées",
+        lambda s: [({}, s.abandoned_runs)],
+    ),
+)
+
+
+def render_prometheus():
+    """Retourne les métriques de synchronisation au format d'exposition Prometheus."""
+    statuses = list(
+        OwnerSyncStatus.objects.select_related("owner__character").order_by(
+            "owner_id", "section"
+        )
+    )
+    lines = []
+    for name, metric_type, help_text, samples in _STATUS_METRICS:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for status in statuses:
+            base = {
+                "owner_id": status.owner_id,
+                "owner": status.owner,
+                "section": status.section,
+            }
+            for extra, value in samples(status):
+                lines.append(f"{name}{{{_labels(**base, **extra)}}} {value}")
+    name = "blueprints_response_cache_requests_total"
+    lines.append(f"# HELP {name} Lectures du cache des réponses DataTables, par issue")
+    lines.append(f"# TYPE {name} counter")
+    for result, value in response_cache.counts().items():
+        lines.append(f"{name}{{{_labels(result=result)}}} {value}")
+    return "\n".join(lines) + "\n"
@@ -1,14 +1,14 @@
 # Django
+from django.apps import apps
 from django.contrib.auth.models import User
 from django.db import models
+from django.utils import timezone
 
 # Alliance Auth
 from allianceauth.eveonline.models import EveCharacter
 
-# Alliance Auth (External Libs)
-from eveuniverse.models import (
-    EveType,  # EveUniverse: types d'objets EVE (blueprint types)
-)
+# Modèles EveUniverse référencés par leur nom ("eveuniverse.EveType") et résolus
+# par le registre des apps: ce module n'importe pas eveuniverse.models
 
 
 class BlueprintOwner(models.Model):
@@ -25,6 +25,15 @@ class BlueprintOwner(models.Model):
     is_corporation = models.BooleanField(
         default=False, help_text="True si ce propriétaire est une corporation"
     )
+    # Versions incrémentées à chaque synchronisation qui écrit (cf. versions.py)
+    blueprints_version = models.PositiveBigIntegerField(default=0)
+    jobs_version = models.PositiveBigIntegerField(default=0)
+    locations_version = models.PositiveBigIntegerField(default=0)
+    jobs_refresh_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Prochaine synchronisation des jobs (fin de job la plus proche)",
+    )
 
     def __str__(self):
         if self.is_corporation:
@@ -64,7 +73,9 @@ class Blueprint(models.Model):
         help_text="Identifiant unique de l'item blueprint dans EVE"
     )
     eve_type = models.ForeignKey(
-        EveType, on_delete=models.CASCADE, help_text="Type EVE du blueprint"
+        "eveuniverse.EveType",
+        on_delete=models.CASCADE,
+        help_text="Type EVE du blueprint",
     )
     quantity = models.IntegerField(
         help_text="Quantité (ESI: -1 original, -2 copie, >0 pile d'originaux)"
@@ -84,6 +95,12 @@ class Blueprint(models.Model):
     location_flag = models.CharField(
         max_length=50, help_text="Flag d'emplacement (ex: CorpSAG1, PersonalHangar)"
     )
+    root_location_id = models.BigIntegerField(
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text="Station ou structure contenant le blueprint (conteneurs et bureaux remontés)",
+    )
 
     def __str__(self):
         return f"{self.eve_type.name} ({'BPO' if self.is_original else 'BPC'})"
@@ -96,23 +113,23 @@ class Blueprint(models.Model):
     @property
     def location_name(self):
         """Nom de l'emplacement du blueprint (si connu)."""
+        # Un conteneur ou un bureau n'a pas de nom: on affiche la station qui le contient
+        location_id = self.root_location_id or self.location_id
         # On tente de résoudre via EveUniverse (stations) ou table interne des structures
         name = None
         # EveUniverse peut connaître certaines stations par type d'entité:
-        # Alliance Auth (External Libs)
-        from eveuniverse.models import EveEntity
-
+        EveEntity = apps.get_model("eveuniverse", "EveEntity")
         try:
-            entity = EveEntity.objects.get(id=self.location_id)
+            entity = EveEntity.objects.get(id=location_id)
             name = entity.name
         except EveEntity.DoesNotExist:
             # Pas trouvé dans EveUniverse (peut être une structure joueur)
             try:
-                loc = BlueprintLocation.objects.get(id=self.location_id)
+                loc = BlueprintLocation.objects.get(id=location_id)
                 name = loc.name
             except Exception:
-                name = str(self.location_id)
-        return name or str(self.location_id)
+                name = str(location_id)
+        return name or str(location_id)
 
     class Meta:
         unique_together = [
@@ -129,7 +146,9 @@ class BlueprintRequest(models.Model):
         User, on_delete=models.CASCADE, related_name="blueprint_requests"
     )
     blueprint_type = models.ForeignKey(
-        EveType, on_delete=models.CASCADE, help_text="Type de blueprint demandé"
+        "eveuniverse.EveType",
+        on_delete=models.CASCADE,
+        help_text="Type de blueprint demandé",
     )
     requested_at = models.DateTimeField(auto_now_add=True)
     STATUS_CHOICES = [
@@ -163,6 +182,9 @@ class IndustryJob(models.Model):
     status = models.CharField(
         max_length=50, help_text="Statut du job (active, paused, finished, etc.)"
     )
+    # Statuts d'un job qui occupe encore son blueprint (non livré), tels
+    # qu'affichés par les vues des jobs (cf. current_status)
+    BUSY_STATUSES = ("active", "paused", "ready")
     blueprint = models.ForeignKey(
         Blueprint,
         null=True,
@@ -177,11 +199,52 @@ class IndustryJob(models.Model):
     def __str__(self):
         return f"Job {self.job_id} ({self.activity}) - {self.status}"
 
+    @property
+    def current_status(self):
+        """Statut à l'instant présent: un job actif dont la fin est passée est prêt.
+
+        ESI ne l'indique qu'à la synchronisation suivante; on le déduit de `end_date`.
+        """
+        if (
+            self.status == "active"
+            and self.end_date
+            and self.end_date <= timezone.now()
+        ):
+            return "ready"
+        return self.status
+
     class Meta:
         verbose_name = "Job Industriel"
         verbose_name_plural = "Jobs Industriels"
 
 
+class IndustryJobHistory(models.Model):
+    """Job d'industrie terminé (livré ou annulé), archivé à sa disparition d'ESI."""
+
+    class Status(models.TextChoices):
+        DELIVERED = "delivered", "Livré"
+        CANCELLED = "cancelled", "Annulé"
+
+    owner = models.ForeignKey(
+        BlueprintOwner, on_delete=models.CASCADE, related_name="job_history"
+    )
+    job_id = models.BigIntegerField(unique=True)
+    activity = models.CharField(max_length=50)
+    status = models.CharField(max_length=10, choices=Status.choices)
+    # ID EVE brut: le blueprint a pu quitter la bibliothèque depuis
+    blueprint_type_id = models.PositiveIntegerField(null=True, blank=True)
+    start_date = models.DateTimeField(null=True, blank=True)
+    end_date = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Job {self.job_id} ({self.activity}) - {self.status}"
+
+    class Meta:
+        verbose_name = "Job Industriel (historique)"
+        verbose_name_plural = "Jobs Industriels (historique)"
+
+
 # Modèle auxiliaire pour stocker les noms des emplacements (structures)
 class BlueprintLocation(models.Model):
     """Emplacement connu d'un blueprint (station NPC ou structure joueur)"""
@@ -194,3 +257,310 @@ class BlueprintLocation(models.Model):
 
     def __str__(self):
         return f"[{self.category}] {self.name}"
+
+
+class FacetCount(models.Model):
+    """Nombre de blueprints d'un propriétaire par valeur de filtre de la bibliothèque.
+
+    Tenu à jour par la synchronisation (cf. facets): les compteurs d'un périmètre
+    sont la somme de ceux de ses propriétaires, sans regrouper les blueprints.
+    """
+
+    class Facet(models.TextChoices):
+        KIND = "kind", "Original / copie"
+        ME = "me", "ME"
+        TE = "te", "TE"
+        OWNER = "owner", "Propriétaire"
+        LOCATION = "location", "Emplacement"
+        GROUP = "group", "Groupe"
+        BUSY = "busy", "En cours de job"
+
+    owner = models.ForeignKey(
+        BlueprintOwner, on_delete=models.CASCADE, related_name="facet_counts"
+    )
+    facet = models.CharField(max_length=10, choices=Facet.choices)
+    value = models.BigIntegerField(null=True)
+    count = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.owner} - {self.facet}={self.value}: {self.count}"
+
+    class Meta:
+        unique_together = [("owner", "facet", "value")]
+        verbose_name = "Compteur de filtre"
+        verbose_name_plural = "Compteurs de filtres"
+
+
+class LocationParent(models.Model):
+    """Emplacement parent d'un conteneur ou d'un bureau (asset ESI du propriétaire).
+
+    Les blueprints rangés dans un conteneur ont pour `location_id` l'item_id du
+    conteneur: on remonte ces liens jusqu'à la station ou la structure, dont l'ID
+    est recopié dans `Blueprint.root_location_id` (cf. location_tree).
+    """
+
+    item_id = models.BigIntegerField(
+        primary_key=True, help_text="item_id du conteneur ou du bureau"
+    )
+    owner = models.ForeignKey(
+        BlueprintOwner, on_delete=models.CASCADE, related_name="location_parents"
+    )
+    parent_id = models.BigIntegerField(
+        help_text="Emplacement du conteneur (station, structure ou autre conteneur)"
+    )
+    location_flag = models.CharField(max_length=50)
+
+    def __str__(self):
+        return f"{self.item_id} -> {self.parent_id}"
+
+    class Meta:
+        verbose_name = "Emplacement parent"
+        verbose_name_plural = "Emplacements parents"
+
+
+class OwnerSyncStatus(models.Model):
+    """État de la dernière synchronisation d'un propriétaire pour une section donnée."""
+
+    class Section(models.TextChoices):
+        BLUEPRINTS = "blueprints", "Blueprints"
+        INDUSTRY_JOBS = "industry_jobs", "Jobs industriels"
+        LOCATIONS = "locations", "Emplacements"
+        LOCATION_TREE = "location_tree", "Conteneurs"
+
+    class Status(models.TextChoices):
+        OK = "ok", "OK"
+        ERROR = "error", "Erreur"
+        SKIPPED = "skipped", "Ignoré"
+
+    owner = models.ForeignKey(
+        BlueprintOwner, on_delete=models.CASCADE, related_name="sync_statuses"
+    )
+    section = models.CharField(max_length=20, choices=Section.choices)
+    status = models.CharField(max_length=10, choices=Status.choices)
+    last_sync_at = models.DateTimeField(
+        help_text="Date de fin de la dernière synchronisation"
+    )
+    duration = models.FloatField(
+        default=0, help_text="Durée de la dernière synchronisation (secondes)"
+    )
+    fetch_duration = models.FloatField(
+        default=0, help_text="Temps passé à télécharger les pages ESI (secondes)"
+    )
+    parse_duration = models.FloatField(
+        default=0, help_text="Temps passé à décoder les réponses ESI (secondes)"
+    )
+    apply_duration = models.FloatField(
+        default=0, help_text="Temps passé à écrire en base (secondes)"
+    )
+    rows_received = models.PositiveIntegerField(
+        default=0, help_text="Nombre de lignes reçues d'ESI"
+    )
+    rows_written = models.PositiveIntegerField(
+        default=0, help_text="Nombre de lignes créées ou mises à jour"
+    )
+    rows_deleted = models.PositiveIntegerField(
+        default=0, help_text="Nombre de lignes supprimées"
+    )
+    http_status = models.PositiveSmallIntegerField(
+        null=True, blank=True, help_text="Dernier code HTTP renvoyé par ESI"
+    )
+    pages = models.PositiveSmallIntegerField(
+        default=0, help_text="Nombre de pages ESI récupérées"
+    )
+    message = models.TextField(
+        blank=True, default="", help_text="Détail en cas d'erreur ou d'omission"
+    )
+    last_error = models.TextField(
+        blank=True, default="", help_text="Dernière erreur rencontrée (conservée)"
+    )
+    last_error_at = models.DateTimeField(null=True, blank=True)
+    # Identifiants d'exécution (id de tâche Celery, cf. locks.py)
+    run_id = models.CharField(
+        max_length=36,
+        blank=True,
+        default="",
+        help_text="Identifiant de l'exécution de la dernière synchronisation",
+    )
+    running_run_id = models.CharField(
+        max_length=36,
+        blank=True,
+        default="",
+        help_text="Identifiant de la synchronisation en cours",
+    )
+    running_since = models.DateTimeField(null=True, blank=True)
+    overlapping_runs = models.PositiveIntegerField(
+        default=0,
+        help_text="Synchronisations ignorées car une autre était en cours",
+    )
+    abandoned_runs = models.PositiveIntegerField(
+        default=0,
+        help_text="Synchronisations commencées mais jamais terminées",
+    )
+
+    def __str__(self):
+        return f"{self.owner} - {self.section}: {self.status}"
+
+    @classmethod
+    def start(cls, owner, sections, run_id):
+        """Marque le début de l'exécution `run_id` pour les `sections` du propriétaire.
+
+        Une exécution précédente encore marquée en cours ne s'est jamais terminée
+        (worker arrêté): elle est comptée comme abandonnée.
+        """
+        cls.objects.filter(owner=owner, section__in=sections).update(
+            abandoned_runs=models.F("abandoned_runs")
+            + models.Case(
+                models.When(running_run_id="", then=models.Value(0)),
+                default=models.Value(1),
+            ),
+            running_run_id=run_id,
+            running_since=timezone.now(),
+        )
+
+    @classmethod
+    def note_overlap(cls, owner, sections):
+        """Compte une exécution ignorée car une autre tenait le verrou du propriétaire."""
+        cls.objects.filter(owner=owner, section__in=sections).update(
+            overlapping_runs=models.F("overlapping_runs") + 1
+        )
+
+    @classmethod
+    def record(
+        cls, owner, section, status, duration=0, message="", stats=None, run_id=""
+    ):
+        """Enregistre le résultat d'une synchronisation (une ligne par owner/section).
+
+        `stats` est un `metrics.SyncStats` optionnel portant le détail des mesures.
+        """
+        now = timezone.now()
+        defaults = {
+            "status": status,
+            "last_sync_at": now,
+            "duration": duration,
+            "message": message,
+            "run_id": run_id,
+            "running_run_id": "",
+            "running_since": None,
+        }
+        if stats is not None:
+            defaults.update(stats.as_fields())
+        if status == cls.Status.ERROR:
+            # La dernière erreur survit aux synchronisations réussies suivantes
+            defaults.update(last_error=message, last_error_at=now)
+        obj, _ = cls.objects.update_or_create(
+            owner=owner, section=section, defaults=defaults
+        )
+        return obj
+
+    class Meta:
+        unique_together = [("owner", "section")]
+        verbose_name = "État de synchronisation"
+        verbose_name_plural = "États de synchronisation"
+
+
+class BlueprintActivity(models.Model):
+    """Activité industrielle d'un type de blueprint (données statiques, SDE).
+
+    Une ligne par (type de blueprint, activité): temps de base d'un run, produit et
+    matériaux de base en colonnes parallèles, prêts pour le calcul ME/TE.
+    """
+
+    class Activity(models.IntegerChoices):
+        MANUFACTURING = 1, "Fabrication"
+        RESEARCH_TIME = 3, "Recherche TE"
+        RESEARCH_MATERIAL = 4, "Recherche ME"
+        COPYING = 5, "Copie"
+        INVENTION = 8, "Invention"
+        REACTION = 11, "Réaction"
+
+    # IDs EVE bruts: produits et matériaux ne sont pas forcément dans EveType
+    blueprint_type_id = models.PositiveIntegerField(
+        db_index=True, help_text="ID EVE du type de blueprint"
+    )
+    activity = models.PositiveSmallIntegerField(choices=Activity.choices)
+    time = models.PositiveIntegerField(help_text="Durée de base d'un run (secondes)")
+    product_type_id = models.PositiveIntegerField(
+        null=True, blank=True, help_text="ID EVE du type produit (si applicable)"
+    )
+    product_quantity = models.PositiveIntegerField(
+        default=0, help_text="Quantité produite par run"
+    )
+    material_type_ids = models.JSONField(
+        default=list, help_text="IDs EVE des matériaux (même ordre que les quantités)"
+    )
+    material_quantities = models.JSONField(
+        default=list, help_text="Quantités de base par run, sans ME"
+    )
+
+    def __str__(self):
+        return f"{self.blueprint_type_id} - {self.get_activity_display()}"
+
+    class Meta:
+        unique_together = [("blueprint_type_id", "activity")]
+        verbose_name = "Activité de blueprint"
+        verbose_name_plural = "Activités de blueprints"
+
+
+class JobCompletionBucket(models.Model):
+    """Nombre de jobs d'un propriétaire se terminant dans une heure ou un jour donné.
+
+    Agrégat tenu à jour par la synchronisation des jobs: la frise des fins de jobs
+    se lit ici sans parcourir `IndustryJob`.
+    """
+
+    class Granularity(models.TextChoices):
+        HOUR = "hour", "Heure"
+        DAY = "day", "Jour"
+
+    owner = models.ForeignKey(
+        BlueprintOwner, on_delete=models.CASCADE, related_name="job_buckets"
+    )
+    activity = models.CharField(max_length=50)
+    granularity = models.CharField(max_length=4, choices=Granularity.choices)
+    start = models.DateTimeField(help_text="Début de l'heure ou du jour (UTC)")
+    count = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.owner} - {self.activity} - {self.start}: {self.count}"
+
+    class Meta:
+        unique_together = [("owner", "activity", "granularity", "start")]
+        indexes = [models.Index(fields=["granularity", "start"])]
+        verbose_name = "Fins de jobs (agrégat)"
+        verbose_name_plural = "Fins de jobs (agrégats)"
+
+
+class LibrarySnapshot(models.Model):
+    """Photo des blueprints d'un propriétaire, stockée en colonnes compressées.
+
+    Une photo complète (`full`) contient toutes les lignes; une photo différentielle
+    (`delta`) ne contient que les lignes ajoutées ou modifiées et les item_id
+    retirés depuis la photo précédente. Cf. `snapshots` pour l'encodage.
+    """
+
+    class Kind(models.TextChoices):
+        FULL = "full", "Complète"
+        DELTA = "delta", "Différentielle"
+
+    owner = models.ForeignKey(
+        BlueprintOwner, on_delete=models.CASCADE, related_name="snapshots"
+    )
+    taken_at = models.DateTimeField()
+    kind = models.CharField(max_length=5, choices=Kind.choices)
+    total = models.PositiveIntegerField(
+        help_text="Nombre de blueprints du propriétaire à cette date"
+    )
+    row_count = models.PositiveIntegerField(help_text="Lignes encodées dans `rows`")
+    rows = models.BinaryField(help_text="Colonnes item_id/type/ME/TE/runs compressées")
+    removed_count = models.PositiveIntegerField(default=0)
+    removed = models.BinaryField(
+        default=b"", help_text="item_id retirés depuis la photo précédente"
+    )
+
+    def __str__(self):
+        return f"{self.owner} - {self.taken_at:%Y-%m-%d} ({self.kind})"
+
+    class Meta:
+        indexes = [models.Index(fields=["owner", "taken_at"])]
+        verbose_name = "Photo de bibliothèque"
+        verbose_name_plural = "Photos de bibliothèque"
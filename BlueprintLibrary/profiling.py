@@ -0,0 +1,190 @@
+"""Profilage opt-in des vues de la bibliothèque (requêtes SQL, cache, latence)."""
+
+# Standard Library
+import functools
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+
+# Django
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.db import connection
+from django.utils import timezone
+
+from .app_settings import (
+    BLUEPRINTS_PROFILING_BUFFER_SIZE,
+    BLUEPRINTS_PROFILING_ENABLED,
+    BLUEPRINTS_PROFILING_NPLUSONE_THRESHOLD,
+    BLUEPRINTS_PROFILING_SLOW_MS,
+)
+
+# Profil de la requête HTTP en cours (None hors vue instrumentée)
+_current_profile = ContextVar("blueprints_profile", default=None)
+
+_lock = threading.Lock()
+# Échantillons des requêtes lentes ou suspectes (tampon circulaire)
+slow_samples = deque(maxlen=BLUEPRINTS_PROFILING_BUFFER_SIZE)
+# Agrégats par vue depuis le démarrage du processus
+view_totals = {}
+
+
+class RequestProfile:
+    """Mesures collectées pendant le traitement d'une requête HTTP."""
+
+    __slots__ = (
+        "view_name",
+        "path",
+        "queries",
+        "db_time",
+        "cache_hits",
+        "cache_misses",
+        "statements",
+        "latency",
+    )
+
+    def __init__(self, view_name, path):
+        self.view_name = view_name
+        self.path = path
+        self.queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.statements = Counter()
+        self.latency = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Signature attendue par connection.execute_wrapper()
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            # Le SQL est paramétré: les répétitions d'un même gabarit signalent un N+1
+            self.statements[sql] += 1
+
+    def repeated_statements(self):
+        """Requêtes SQL répétées au-delà du seuil N+1, avec leur nombre d'exécutions."""
+        return [
+            (sql, count)
+            for sql, count in self.statements.most_common()
+            if count > BLUEPRINTS_PROFILING_NPLUSONE_THRESHOLD
+        ]
+
+
+def note_cache(hit):
+    """Signale un accès cache (succès ou échec) au profil de la requête en cours."""
+    profile = _current_profile.get()
+    if profile is None:
+        return
+    if hit:
+        profile.cache_hits += 1
+    else:
+        profile.cache_misses += 1
+
+
+def note_fragment(fragment_name, vary_on):
+    """Signale si un fragment `{% cache %}` du gabarit est déjà en cache.
+
+    La lecture n'est faite que pour une requête profilée: hors profilage, rien n'est lu.
+    """
+    if _current_profile.get() is None:
+        return
+    # Même cache que la balise {% cache %}: "template_fragments" s'il est configuré
+    try:
+        fragment_cache = caches["template_fragments"]
+    except InvalidCacheBackendError:
+        fragment_cache = caches["default"]
+    key = make_template_fragment_key(fragment_name, vary_on)
+    note_cache(fragment_cache.get(key) is not None)
+
+
+def _store(profile):
+    suspects = profile.repeated_statements()
+    with _lock:
+        totals = view_totals.setdefault(
+            profile.view_name,
+            {
+                "requests": 0,
+                "latency": 0.0,
+                "queries": 0,
+                "db_time": 0.0,
+                "cache_hits": 0,
+                "cache_misses": 0,
+                "n_plus_one": 0,
+            },
+        )
+        totals["requests"] += 1
+        totals["latency"] += profile.latency
+        totals["queries"] += profile.queries
+        totals["db_time"] += profile.db_time
+        totals["cache_hits"] += profile.cache_hits
+        totals["cache_misses"] += profile.cache_misses
+        totals["n_plus_one"] += bool(suspects)
+        if suspects or profile.latency * 1000 >= BLUEPRINTS_PROFILING_SLOW_MS:
+            slow_samples.append(
+                {
+                    "at": timezone.now(),
+                    "view": profile.view_name,
+                    "path": profile.path,
+                    "latency_ms": round(profile.latency * 1000, 1),
+                    "queries": profile.queries,
+                    "db_time_ms": round(profile.db_time * 1000, 1),
+                    "cache_hits": profile.cache_hits,
+                    "cache_misses": profile.cache_misses,
+                    "n_plus_one": suspects,
+                }
+            )
+
+
+def profiled(view_func):
+    """Instrumente une vue si le profilage est activé, sinon la retourne telle quelle.
+
+    Sans BLUEPRINTS_PROFILING_ENABLED, aucune enveloppe n'est ajoutée: le coût est nul.
+    """
+    if not BLUEPRINTS_PROFILING_ENABLED:
+        return view_func
+
+    # as_view() expose la classe de la vue dans view_class
+    view_name = getattr(view_func, "view_class", view_func).__name__
+
+    @functools.wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        profile = RequestProfile(view_name, request.path)
+        token = _current_profile.set(profile)
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(profile):
+                response = view_func(request, *args, **kwargs)
+                # Les réponses différées (TemplateResponse) exécutent leurs requêtes au rendu
+                if hasattr(response, "render") and not response.is_rendered:
+                    response.render()
+            return response
+        finally:
+            profile.latency = time.perf_counter() - started
+            _current_profile.reset(token)
+            _store(profile)
+
+    return wrapper
+
+
+def snapshot():
+    """Copie des agrégats par vue et des échantillons, pour affichage."""
+    with _lock:
+        totals = {
+            name: {
+                **values,
+                "avg_latency_ms": round(
+                    values["latency"] * 1000 / values["requests"], 1
+                ),
+                "avg_queries": round(values["queries"] / values["requests"], 1),
+                "avg_db_time_ms": round(
+                    values["db_time"] * 1000 / values["requests"], 1
+                ),
+            }
+            for name, values in view_totals.items()
+        }
+        samples = list(reversed(slow_samples))
+    return totals, samples
@@ -0,0 +1,92 @@
+"""Classement des blueprints de la bibliothèque pour un travail à lancer."""
+
+# Django
+from django.db.models import (
+    Case,
+    Exists,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    OuterRef,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast, Coalesce, Least
+
+from .industry import BUILD_ACTIVITIES
+from .models import BlueprintActivity, IndustryJob
+
+# Poids du score: ME et TE par point, runs disponibles, éloignement, occupation
+ME_WEIGHT = 10
+TE_WEIGHT = 2
+RUNS_WEIGHT = 50
+DISTANCE_WEIGHT = 30
+# Un blueprint occupé par un job (cf. IndustryJob.BUSY_STATUSES) passe derrière tous les autres
+BUSY_PENALTY = 1000
+
+# Classes d'éloignement: à l'emplacement demandé, ailleurs
+DISTANCE_HERE = 0
+DISTANCE_ELSEWHERE = 1
+
+
+def candidate_type_ids(type_id):
+    """Types de blueprint pertinents pour `type_id` (produit ou blueprint)."""
+    type_ids = set(
+        BlueprintActivity.objects.filter(
+            product_type_id=type_id, activity__in=BUILD_ACTIVITIES
+        ).values_list("blueprint_type_id", flat=True)
+    )
+    type_ids.add(type_id)
+    return type_ids
+
+
+def score_expression(needed_runs=1, near=()):
+    """Score d'un blueprint, calculé par la base (annoter `busy` au préalable).
+
+    Les runs d'une copie comptent jusqu'à `needed_runs`; un original (-1) a
+    toujours le maximum.
+    """
+    runs_score = Case(
+        When(runs__lt=0, then=Value(float(RUNS_WEIGHT))),
+        default=Cast(Least("runs", Value(needed_runs)), FloatField())
+        * Value(RUNS_WEIGHT / needed_runs),
+    )
+    near = list(near)
+    if near:
+        distance = Case(
+            When(location__in=near, then=Value(DISTANCE_HERE)),
+            default=Value(DISTANCE_ELSEWHERE),
+        )
+    else:
+        distance = Value(DISTANCE_ELSEWHERE)
+    busy = Case(When(busy=True, then=Value(1)), default=Value(0))
+    return ExpressionWrapper(
+        F("material_efficiency") * ME_WEIGHT
+        + F("time_efficiency") * TE_WEIGHT
+        + runs_score
+        - distance * DISTANCE_WEIGHT
+        - busy * BUSY_PENALTY,
+        output_field=FloatField(),
+    )
+
+
+def rank_blueprints(queryset, top=10, needed_runs=1, near=()):
+    """Les `top` meilleurs blueprints de `queryset`: liste de (pk, score, occupé).
+
+    Score et sélection sont faits par la base en une requête (ORDER BY ... LIMIT):
+    seules les `top` lignes retenues remontent, quel que soit le nombre de candidats.
+    """
+    return list(
+        queryset.annotate(
+            # Station ou structure (conteneurs remontés), sinon l'emplacement brut
+            location=Coalesce("root_location_id", "location_id"),
+            busy=Exists(
+                IndustryJob.objects.filter(
+                    blueprint=OuterRef("pk"), status__in=IndustryJob.BUSY_STATUSES
+                )
+            ),
+        )
+        .annotate(score=score_expression(needed_runs, near))
+        .order_by("-score", "pk")
+        .values_list("pk", "score", "busy")[:top]
+    )
@@ -0,0 +1,185 @@
+"""Enregistrements compacts des données en transit entre ESI et la base."""
+
+# Django
+from django.utils.dateparse import parse_datetime
+
+
+class Record:
+    """Enregistrement à `__slots__`: pas de dictionnaire d'attributs par ligne.
+
+    Les sous-classes déclarent `__slots__` (dans l'ordre des colonnes), `KEY` (le
+    champ identifiant) et `ESI_FIELDS` (clé ESI et valeur par défaut de chaque slot).
+    """
+
+    __slots__ = ()
+    KEY = None
+    ESI_FIELDS = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values, strict=True):
+            setattr(self, name, value)
+
+    @classmethod
+    def from_esi(cls, item):
+        """Construit l'enregistrement depuis un dictionnaire ESI."""
+        return cls(*(item.get(key, default) for key, default in cls.ESI_FIELDS))
+
+    @classmethod
+    def db_fields(cls):
+        """Colonnes du modèle à lire (values_list) pour reconstruire l'enregistrement."""
+        return cls.__slots__
+
+    @property
+    def key(self):
+        return getattr(self, self.KEY)
+
+    def values(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.values() == other.values()
+
+    def __hash__(self):
+        return hash(self.values())
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class BlueprintRecord(Record):
+    """Blueprint tel que reçu d'ESI ou lu en base (cf. modèle `Blueprint`)."""
+
+    __slots__ = (
+        "item_id",
+        "eve_type_id",
+        "quantity",
+        "time_efficiency",
+        "material_efficiency",
+        "runs",
+        "location_id",
+        "location_flag",
+    )
+    KEY = "item_id"
+    ESI_FIELDS = (
+        ("item_id", None),
+        ("type_id", None),
+        ("quantity", 0),
+        ("time_efficiency", 0),
+        ("material_efficiency", 0),
+        ("runs", -1),
+        ("location_id", None),
+        ("location_flag", None),
+    )
+
+
+class JobRecord(Record):
+    """Job d'industrie tel que reçu d'ESI ou lu en base (cf. modèle `IndustryJob`).
+
+    `blueprint_item_id` est l'item_id du blueprint (pas sa clé en base).
+    """
+
+    __slots__ = (
+        "job_id",
+        "blueprint_item_id",
+        "activity",
+        "status",
+        "start_date",
+        "end_date",
+    )
+    KEY = "job_id"
+    ESI_FIELDS = (
+        ("job_id", None),
+        ("blueprint_id", None),
+        ("activity_id", ""),
+        ("status", "active"),
+        ("start_date", None),
+        ("end_date", None),
+    )
+
+    @classmethod
+    def from_esi(cls, item):
+        record = super().from_esi(item)
+        # ESI ne fournit que l'identifiant de l'activité
+        record.activity = str(record.activity)
+        # Dates ISO 8601 converties pour être comparables à celles de la base
+        if record.start_date:
+            record.start_date = parse_datetime(record.start_date)
+        if record.end_date:
+            record.end_date = parse_datetime(record.end_date)
+        return record
+
+    @classmethod
+    def db_fields(cls):
+        return (
+            "job_id",
+            "blueprint__item_id",
+            "activity",
+            "status",
+            "start_date",
+            "end_date",
+        )
+
+
+class AssetRecord(Record):
+    """Asset ESI réduit à sa position (cf. location_tree)."""
+
+    __slots__ = ("item_id", "location_id", "location_flag", "location_type")
+    KEY = "item_id"
+    ESI_FIELDS = (
+        ("item_id", None),
+        ("location_id", None),
+        ("location_flag", ""),
+        ("location_type", ""),
+    )
+
+
+class Diff:
+    """Différence entre les enregistrements en base et ceux reçus d'ESI.
+
+    - `created`: enregistrements absents de la base
+    - `changed`: paires (pk, enregistrement) dont au moins un champ a changé
+    - `removed`: pk des lignes en base absentes de la réponse ESI
+    - `seen`: clés reçues (une ligne répétée entre deux pages n'est traitée qu'une fois)
+    """
+
+    __slots__ = ("created", "changed", "removed", "seen")
+
+    def __init__(self):
+        self.created = []
+        self.changed = []
+        self.removed = []
+        self.seen = set()
+
+    def __bool__(self):
+        return bool(self.created or self.changed or self.removed)
+
+
+def diff_records(existing, incoming):
+    """Compare `incoming` (itérable d'enregistrements) à `existing`.
+
+    `existing` associe la clé de chaque enregistrement en base à (pk, enregistrement);
+    il est vidé au fur et à mesure pour ne garder à la fin que les lignes supprimées.
+    """
+    diff = Diff()
+    for record in incoming:
+        if record.key in diff.seen:
+            continue
+        diff.seen.add(record.key)
+        current = existing.pop(record.key, None)
+        if current is None:
+            diff.created.append(record)
+        elif current[1] != record:
+            diff.changed.append((current[0], record))
+    diff.removed = [pk for pk, _ in existing.values()]
+    return diff
+
+
+def load_existing(queryset, record_class):
+    """Lit les lignes de `queryset` sous forme {clé: (pk, enregistrement)}."""
+    return {
+        row[1]: (row[0], record_class(*row[1:]))
+        for row in queryset.values_list("pk", *record_class.db_fields()).iterator(
+            chunk_size=2000
+        )
+    }
@@ -0,0 +1,88 @@
+"""Cache des réponses JSON coûteuses (DataTables), protégé contre les ruées.
+
+Chaque entrée garde la version des données qui l'a produite: une entrée d'une
+version antérieure est périmée mais reste servie aux requêtes concurrentes pendant
+qu'une seule d'entre elles (verrou `cache.add`) reconstruit la réponse.
+"""
+
+# Standard Library
+import hashlib
+import time
+
+# Django
+from django.core.cache import cache
+
+from .app_settings import BLUEPRINTS_RESPONSE_CACHE_TIMEOUT
+from .profiling import note_cache
+
+# Durée maximale (secondes) d'une reconstruction avant que le verrou n'expire
+LOCK_TIMEOUT = 30
+# Attente maximale (secondes) d'une reconstruction en cours, sans entrée à servir
+WAIT_TIMEOUT = 5
+WAIT_INTERVAL = 0.05
+
+# Issue de chaque lecture, comptée pour les métriques
+RESULTS = ("hit", "stale", "miss", "wait")
+
+
+def _stats_key(result):
+    return f"blueprints:response:stats:{result}"
+
+
+def _count(result):
+    # Entrée servie (à jour, périmée ou attendue) = succès pour le profil de la requête
+    note_cache(result != "miss")
+    key = _stats_key(result)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def counts():
+    """Nombre de lectures par issue (hit, stale, miss, wait) depuis le démarrage."""
+    values = cache.get_many([_stats_key(result) for result in RESULTS])
+    return {result: values.get(_stats_key(result), 0) for result in RESULTS}
+
+
+def make_key(prefix, *parts):
+    digest = hashlib.md5(
+        "\x1f".join(str(part) for part in parts).encode(), usedforsecurity=False
+    ).hexdigest()
+    return f"blueprints:response:{prefix}:{digest}"
+
+
+def get_or_build(key, version, build):
+    """Valeur en cache pour `key` si elle a été produite à `version`, sinon `build()`.
+
+    Un seul appelant reconstruit une entrée absente ou périmée; les autres
+    reçoivent l'entrée périmée si elle existe, ou attendent la nouvelle.
+    """
+    entry = cache.get(key)
+    if entry is not None and entry[0] == version:
+        _count("hit")
+        return entry[1]
+    lock_key = f"{key}:lock:{version}"
+    acquired = cache.add(lock_key, 1, LOCK_TIMEOUT)
+    if not acquired:
+        if entry is not None:
+            _count("stale")
+            return entry[1]
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(WAIT_INTERVAL)
+            entry = cache.get(key)
+            if entry is not None and entry[0] == version:
+                _count("wait")
+                return entry[1]
+        # Reconstruction trop longue (ou abandonnée): on ne bloque pas davantage
+    _count("miss")
+    try:
+        value = build()
+        cache.set(key, (version, value), BLUEPRINTS_RESPONSE_CACHE_TIMEOUT)
+    finally:
+        # Après une attente vaine, le verrou appartient toujours à l'autre appelant
+        if acquired:
+            cache.delete(lock_key)
+    return value
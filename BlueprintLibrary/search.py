@@ -0,0 +1,193 @@
+"""Recherche tolérante aux fautes sur les noms des types de blueprint.
+
+Un index en mémoire (trigrammes) couvre les types distincts de la bibliothèque,
+quelques milliers de noms: une recherche devient un petit ensemble d'`eve_type_id`
+sur lequel la bibliothèque est filtrée, sans `LIKE` sur la jointure des types.
+"raven blueprnt" ou "Ishtar BP" trouvent "Raven Blueprint" et "Ishtar Blueprint".
+
+L'index est propre à chaque processus et mis à jour par différence dès que la
+version des blueprints ou des types change (nouveaux types, types renommés après
+résolution).
+"""
+
+# Standard Library
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+
+# Alliance Auth (External Libs)
+from eveuniverse.models import EveType
+
+from .models import Blueprint
+from .versions import BLUEPRINTS_KEY, TYPES_KEY, get_version
+
+# Nombre maximal de types renvoyés par une recherche
+MAX_RESULTS = 200
+# Candidats (trigrammes communs) départagés par distance d'édition
+MAX_CANDIDATES = 500
+# Mots désignant un blueprint, ignorés dans la requête (tous les noms les portent)
+BLUEPRINT_WORDS = {"blueprint", "blueprints", "bp", "bpo", "bpc"}
+
+
+def normalize(text):
+    """Mots du texte en minuscules, sans accents ni ponctuation."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(
+        char if char.isalnum() else " "
+        for char in text
+        if not unicodedata.combining(char)
+    )
+    return text.split()
+
+
+def trigrams(word):
+    padded = f"  {word} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def max_typos(word):
+    """Fautes tolérées pour un mot de la requête, selon sa longueur."""
+    if len(word) <= 2:
+        return 0
+    return 1 if len(word) <= 5 else 2
+
+
+def edit_distance(a, b, limit):
+    """Distance d'édition entre `a` et `b` (une inversion de deux lettres compte
+    pour une faute), ou `limit + 1` si elle dépasse `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before = None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            distance = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            )
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                distance = min(distance, before[j - 2] + 1)
+            current.append(distance)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+def word_distance(word, candidate):
+    """Distance d'un mot de la requête à un mot du nom (préfixe accepté)."""
+    limit = max_typos(word)
+    if candidate.startswith(word):
+        return 0
+    return min(
+        edit_distance(word, candidate, limit),
+        # Mot tapé partiellement, avec une faute
+        edit_distance(word, candidate[: len(word)], limit),
+    )
+
+
+def _is_blueprint_word(word):
+    return word in BLUEPRINT_WORDS or (
+        len(word) >= 6 and edit_distance(word, "blueprint", 2) <= 2
+    )
+
+
+class TypeNameIndex:
+    """Index trigrammes {type_id: mots du nom} des types de la bibliothèque."""
+
+    def __init__(self):
+        self._words = {}
+        self._postings = defaultdict(set)
+        self._version = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._words)
+
+    def _add(self, type_id, name):
+        words = [word for word in normalize(name) if word not in BLUEPRINT_WORDS]
+        self._words[type_id] = words
+        for word in words:
+            for trigram in trigrams(word):
+                self._postings[trigram].add(type_id)
+
+    def _remove(self, type_id):
+        for word in self._words.pop(type_id, ()):
+            for trigram in trigrams(word):
+                self._postings[trigram].discard(type_id)
+
+    def update(self, names):
+        """Aligne l'index sur `names` ({type_id: nom}): seuls les types ajoutés,
+        retirés ou renommés sont (ré)indexés."""
+        with self._lock:
+            for type_id in self._words.keys() - names.keys():
+                self._remove(type_id)
+            for type_id, name in names.items():
+                words = [
+                    word for word in normalize(name) if word not in BLUEPRINT_WORDS
+                ]
+                if self._words.get(type_id) != words:
+                    self._remove(type_id)
+                    self._add(type_id, name)
+
+    def refresh(self):
+        """Recharge les noms si les données ont changé depuis le dernier appel."""
+        # Seuls les blueprints (types présents) et les noms des types comptent:
+        # deux compteurs du cache, lus sans requête à chaque frappe. Une
+        # synchronisation des jobs ou des emplacements ne recharge pas l'index; un
+        # propriétaire retiré y laisse au plus des types qui ne filtrent plus rien
+        version = (get_version(BLUEPRINTS_KEY), get_version(TYPES_KEY))
+        if version == self._version:
+            return
+        self.update(
+            dict(
+                EveType.objects.filter(
+                    id__in=Blueprint.objects.values("eve_type_id")
+                ).values_list("id", "name")
+            )
+        )
+        self._version = version
+
+    def search(self, query, limit=MAX_RESULTS):
+        """IDs des types correspondant à `query`, les plus proches d'abord.
+
+        Retourne None si la requête ne contient aucun mot utile (ex: "bpc").
+        """
+        words = [word for word in normalize(query) if not _is_blueprint_word(word)]
+        if not words:
+            return None
+        with self._lock:
+            shared = Counter()
+            for word in words:
+                for trigram in trigrams(word):
+                    shared.update(self._postings.get(trigram, ()))
+            candidates = [
+                (type_id, self._words[type_id])
+                for type_id, _ in shared.most_common(MAX_CANDIDATES)
+            ]
+        ranked = []
+        for type_id, name_words in candidates:
+            total = 0
+            for word in words:
+                distance = min(
+                    (word_distance(word, candidate) for candidate in name_words),
+                    default=max_typos(word) + 1,
+                )
+                if distance > max_typos(word):
+                    break
+                total += distance
+            else:
+                ranked.append((total, len(name_words), type_id))
+        ranked.sort()
+        return [type_id for _, _, type_id in ranked[:limit]]
+
+
+index = TypeNameIndex()
+
+
+def search_type_ids(query):
+    """Types de la bibliothèque correspondant à `query` (cf. TypeNameIndex.search)."""
+    index.refresh()
+    return index.search(query)
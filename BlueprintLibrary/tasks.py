@@ -1,168 +1,546 @@
+# Standard Library
+import datetime as dt
+import time
+from functools import partial
+
 # Third Party
 import requests
-from celery import shared_task
+from celery import chain, shared_task
+
+# Django
+from django.db import transaction
+from django.db.models import Min, Q
+from django.utils import timezone
 
 # Alliance Auth
 from allianceauth.eveonline.models import EveCharacter
+from allianceauth.services.hooks import get_extension_logger
+from allianceauth.services.tasks import QueueOnce
 
 # Alliance Auth (External Libs)
 from eveuniverse.models import EveEntity, EveType
 
-from .models import Blueprint, BlueprintLocation, BlueprintOwner, IndustryJob
+from . import tokens
+from .app_settings import (
+    BLUEPRINTS_ESI_BATCH_ROWS,
+    BLUEPRINTS_ESI_OWNER_BATCH,
+    BLUEPRINTS_JOBS_MAX_REFRESH,
+    BLUEPRINTS_JOBS_MIN_REFRESH,
+    BLUEPRINTS_REFRESH_PRIORITY,
+    BLUEPRINTS_SYNC_LOCK_TIMEOUT,
+)
+from .esi import EsiError, esi_url, fetch_pages, prefetch_all
+from .facets import rebuild_owner_facets, rebuild_type_facets
+from .industry import library_type_ids, load_activities
+from .lanes import BACKGROUND, BULK, INTERACTIVE, task_options
+from .location_tree import apply_tree, owner_roots
+from .locks import OwnerLocked, current_run_id, owner_lock
+from .metrics import SyncStats
+from .models import (
+    Blueprint,
+    BlueprintLocation,
+    BlueprintOwner,
+    BlueprintRequest,
+    FacetCount,
+    IndustryJob,
+    IndustryJobHistory,
+    OwnerSyncStatus,
+)
+from .records import (
+    AssetRecord,
+    BlueprintRecord,
+    JobRecord,
+    diff_records,
+    load_existing,
+)
+from .snapshots import take_snapshot
+from .timeline import rebuild_owner_buckets
+from .type_registry import placeholder_types
+from .type_registry import registry as type_registry
+from .versions import bump_location_owners, bump_owners, bump_types
 
-ESI_BASE_URL = "https://esi.evetech.net/latest"
+logger = get_extension_logger(__name__)
 
+# Taille des lots pour les écritures groupées
+BULK_BATCH_SIZE = 1000
+# Nombre de types EVE résolus par tâche lors du rattrapage des types provisoires
+TYPE_RESOLVE_BATCH_SIZE = 100
+# Tâches planifiées sur tous les propriétaires: une seule copie en file ou en cours
+# (celery_once), une copie en trop n'est pas mise en file
+ONCE_OPTIONS = {"graceful": True, "keys": [], "timeout": BLUEPRINTS_SYNC_LOCK_TIMEOUT}
 
-@shared_task
-def update_all_blueprints():
-    """Met à jour la liste de tous les blueprints pour l'ensemble des propriétaires."""
-    for owner in BlueprintOwner.objects.all():
-        try:
-            # Récupération du token ESI via le personnage associé
-            eve_char = owner.character
-            token = (
-                eve_char.fetch_token()
-            )  # Méthode hypothétique pour obtenir le token ESI du perso
-        except Exception:
-            continue  # personnage sans token valide, on passe
 
-        # Choix de l’endpoint selon perso ou corp
-        if owner.is_corporation:
-            corp_id = owner.corporation_id
-            url = f"{ESI_BASE_URL}/corporations/{corp_id}/blueprints/"
-            headers = {"Authorization": f"Bearer {token.access_token}"}
+class SyncSkipped(Exception):
+    """Synchronisation d'un propriétaire abandonnée (token absent, scope manquant...)."""
+
+
+def _owner_headers(owner):
+    """Retourne les en-têtes d'authentification ESI du propriétaire."""
+    try:
+        token = tokens.access_token(owner)
+    except tokens.TokenUnavailable as exc:
+        raise SyncSkipped(f"Token indisponible: {exc}") from exc
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _owners_with_tokens(owners):
+    """Précharge les jetons de tous les propriétaires avant un cycle de synchronisation."""
+    owners = list(owners.select_related("character"))
+    tokens.prefetch(owners)
+    return owners
+
+
+def _run_owner_sync(owner, section, func):
+    """Exécute la synchronisation `func` d'un propriétaire et enregistre son état."""
+    _run_owner_sections(
+        owner, (section,), lambda owner, stats: func(owner, stats[section])
+    )
+
+
+def _run_owner_sections(owner, sections, func, stats=None):
+    """Exécute `func(owner, {section: SyncStats})` et enregistre l'état de chaque section.
+
+    Les sections traitées ensemble partagent le même résultat (OK, ignoré, erreur).
+    Le propriétaire est verrouillé pendant l'appel: si une autre exécution le
+    synchronise déjà, rien n'est fait et le chevauchement est compté.
+    `stats` permet de reprendre des statistiques déjà commencées (téléchargement
+    groupé). Une section seule enregistre la durée de l'appel à `func`; des
+    sections traitées ensemble enregistrent chacune la durée de ses phases.
+    """
+    run_id = current_run_id()
+    try:
+        with owner_lock(owner.pk, run_id):
+            _run_locked_sections(owner, sections, func, stats, run_id)
+    except OwnerLocked as exc:
+        # Rien n'est enregistré: l'état de l'exécution en cours fera foi
+        logger.info(
+            "Synchronisation %s de %s ignorée: exécution %s en cours",
+            "+".join(sections),
+            owner,
+            exc.run_id,
+        )
+        OwnerSyncStatus.note_overlap(owner, sections)
+
+
+def _run_locked_sections(owner, sections, func, stats, run_id):
+    """Corps de `_run_owner_sections`, verrou du propriétaire tenu."""
+    stats = stats or {section: SyncStats() for section in sections}
+    label = "+".join(sections)
+    OwnerSyncStatus.start(owner, sections, run_id)
+    started = time.monotonic()
+    try:
+        func(owner, stats)
+    except SyncSkipped as exc:
+        logger.info("Synchronisation %s de %s ignorée: %s", label, owner, exc)
+        status, message = OwnerSyncStatus.Status.SKIPPED, str(exc)
+    except EsiError as exc:
+        logger.warning("Synchronisation %s de %s: %s", label, owner, exc)
+        status, message = OwnerSyncStatus.Status.ERROR, str(exc)
+    except Exception as exc:
+        # Une erreur sur un propriétaire ne doit pas bloquer les suivants
+        logger.exception("Échec de la synchronisation %s de %s", label, owner)
+        status, message = OwnerSyncStatus.Status.ERROR, repr(exc)
+    else:
+        status, message = OwnerSyncStatus.Status.OK, ""
+    elapsed = time.monotonic() - started
+    for section, section_stats in stats.items():
+        # Sections traitées ensemble: chacune enregistre son propre temps (ses
+        # phases), la somme des sections reste ainsi la durée de la passe
+        if len(stats) == 1:
+            duration = elapsed
         else:
-            char_id = owner.character.character_id
-            url = f"{ESI_BASE_URL}/characters/{char_id}/blueprints/"
-            headers = {"Authorization": f"Bearer {token.access_token}"}
-
-        # Appel API (on suppose un seul appel, pagination à gérer en pratique)
-        response = requests.get(url, headers=headers, timeout=30)
-        if response.status_code != 200:
-            continue  # en cas d'erreur API, on saute ce propriétaire
-        data = response.json()
-        # data est une liste de blueprints (dictionnaires)
-        seen_item_ids = []
-        for bp in data:
-            seen_item_ids.append(bp["item_id"])
-            # Cherche le type EVE (EveType) correspondant
-            type_id = bp["type_id"]
-            eve_type, _ = EveType.objects.get_or_create(
-                id=type_id, defaults={"name": f"Type {type_id}"}
-            )
-            # Localisation : station ou structure
-            loc_id = bp.get("location_id")
-            loc_flag = bp.get("location_flag")
-            # Création ou mise à jour du blueprint
-            blueprint_obj, created = Blueprint.objects.update_or_create(
-                owner=owner,
-                item_id=bp["item_id"],
-                defaults={
-                    "eve_type": eve_type,
-                    "quantity": bp.get("quantity", 0),
-                    "time_efficiency": bp.get("time_efficiency", 0),
-                    "material_efficiency": bp.get("material_efficiency", 0),
-                    "runs": bp.get("runs", -1),
-                    "location_id": loc_id,
-                    "location_flag": loc_flag,
-                },
-            )
-            # Marque les structures pour résolution de nom ultérieure si non connue
-            if loc_id and loc_flag and loc_id not in (None, 0):
-                # Si l'emplacement semble être une structure joueur (ex: flag contient "CorpSAG" ou autre,
-                # et loc_id pas dans EveEntity), on l'enregistrera pour résolution
-                if not EveEntity.objects.filter(id=loc_id).exists():
-                    BlueprintLocation.objects.get_or_create(
-                        id=loc_id, defaults={"name": "", "category": "Structure"}
-                    )
-        # Supprime les blueprints qui n'existent plus pour ce owner (non reçus dans data)
-        Blueprint.objects.filter(owner=owner).exclude(
-            item_id__in=seen_item_ids
+            duration = sum(section_stats.durations.values())
+        OwnerSyncStatus.record(
+            owner,
+            section,
+            status,
+            duration=duration,
+            message=message,
+            stats=section_stats,
+            run_id=run_id,
+        )
+
+
+def _fetch_owner_blueprints(owner, headers, stats):
+    # Choix de l’endpoint selon perso ou corp
+    if owner.is_corporation:
+        corp_id = owner.corporation_id
+        url = esi_url(f"/corporations/{corp_id}/blueprints/")
+    else:
+        char_id = owner.character.character_id
+        url = esi_url(f"/characters/{char_id}/blueprints/")
+    # Appel API (toutes les pages, téléchargées au fil de l'eau), EsiError en cas d'erreur
+    return fetch_pages(url, headers, stats, BlueprintRecord)
+
+
+def sync_owner_blueprints(owner, stats):
+    """Met à jour les blueprints d'un propriétaire."""
+    records = _fetch_owner_blueprints(owner, _owner_headers(owner), stats)
+    with stats.phase("apply"):
+        _, locations = _apply_owner_blueprints(owner, records, stats)
+    # Seuls les emplacements découverts par cette synchronisation sont à résoudre
+    if locations:
+        resolve_location_ids.delay(sorted(locations))
+
+
+def _discover_locations(location_ids):
+    """Enregistre pour résolution de nom ultérieure les emplacements inconnus.
+
+    Un emplacement absent d'EveEntity et de BlueprintLocation est supposé être une
+    structure joueur. Une requête par table quel que soit le nombre de blueprints;
+    retourne les emplacements ajoutés.
+    """
+    location_ids = set(location_ids)
+    if not location_ids:
+        return set()
+    known = set(
+        EveEntity.objects.filter(id__in=location_ids).values_list("id", flat=True)
+    )
+    known.update(
+        BlueprintLocation.objects.filter(id__in=location_ids - known).values_list(
+            "id", flat=True
+        )
+    )
+    missing = location_ids - known
+    BlueprintLocation.objects.bulk_create(
+        [
+            BlueprintLocation(id=location_id, name="", category="Structure")
+            for location_id in missing
+        ],
+        batch_size=BULK_BATCH_SIZE,
+        ignore_conflicts=True,  # emplacement ajouté entre-temps par un autre worker
+    )
+    return missing
+
+
+def _incoming_blueprints(records, locations):
+    """Relève dans `locations` l'emplacement de chaque blueprint reçu."""
+    for record in records:
+        if record.location_id and record.location_flag:
+            locations.add(record.location_id)
+        yield record
+
+
+def _apply_owner_blueprints(owner, records, stats):
+    """Écrit en base les blueprints reçus d'ESI pour un propriétaire.
+
+    Seules les lignes nouvelles ou modifiées donnent lieu à une instance de modèle.
+    Retourne {item_id: pk} des blueprints du propriétaire après écriture et les
+    emplacements découverts (à résoudre).
+    """
+    existing = load_existing(Blueprint.objects.filter(owner=owner), BlueprintRecord)
+    item_pks = {item_id: pk for item_id, (pk, _) in existing.items()}
+    seen_locations = set()
+    diff = diff_records(existing, _incoming_blueprints(records, seen_locations))
+    if records.not_modified:
+        return item_pks, set()  # inchangé depuis la dernière synchronisation (ETag)
+    # Conteneurs déjà connus: remontés jusqu'à leur station (cf. location_tree)
+    roots = owner_roots(owner)
+    locations = _discover_locations(
+        {roots.get(location_id, location_id) for location_id in seen_locations}
+    )
+    # Types EVE des lignes écrites: une seule requête pour ceux encore inconnus
+    type_registry.ensure(
+        {record.eve_type_id for record in diff.created}
+        | {record.eve_type_id for _, record in diff.changed}
+    )
+    with transaction.atomic():
+        created = Blueprint.objects.bulk_create(
+            [
+                Blueprint(
+                    owner=owner,
+                    root_location_id=roots.get(record.location_id, record.location_id),
+                    **dict(zip(record.__slots__, record.values())),
+                )
+                for record in diff.created
+            ],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        Blueprint.objects.bulk_update(
+            [
+                Blueprint(
+                    pk=pk,
+                    root_location_id=roots.get(record.location_id, record.location_id),
+                    **dict(zip(record.__slots__, record.values())),
+                )
+                for pk, record in diff.changed
+            ],
+            fields=[name for name in BlueprintRecord.__slots__ if name != "item_id"]
+            + ["root_location_id"],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        # Supprime les blueprints qui n'existent plus pour ce owner (non reçus d'ESI)
+        deleted = _delete_pks(Blueprint, diff.removed)
+        if diff:
+            rebuild_owner_facets(owner)
+        # ETag gardés seulement si l'écriture est validée
+        records.commit_etags()
+    if diff:
+        bump_owners([owner.pk], "blueprints")
+    stats.rows_written += len(diff.created) + len(diff.changed)
+    stats.rows_deleted += deleted
+
+    item_pks = {item_id: pk for item_id, pk in item_pks.items() if item_id in diff.seen}
+    if created and created[0].pk is None:
+        # Clés non renvoyées par bulk_create (ex: MySQL): une requête pour les relire
+        created = Blueprint.objects.filter(
+            owner=owner, item_id__in=[record.item_id for record in diff.created]
+        ).only("pk", "item_id")
+    item_pks.update((blueprint.item_id, blueprint.pk) for blueprint in created)
+    return item_pks, locations
+
+
+def _delete_pks(model, pks):
+    """Supprime les lignes `pks` par lots, retourne le nombre de lignes supprimées."""
+    deleted = 0
+    for start in range(0, len(pks), BULK_BATCH_SIZE):
+        count, _ = model.objects.filter(
+            pk__in=pks[start : start + BULK_BATCH_SIZE]
         ).delete()
-    # Fin de la tâche: on pourrait logguer l'achèvement ou le nombre de BPs mis à jour.
+        deleted += count
+    return deleted
 
 
-@shared_task
-def update_all_industry_jobs():
-    """Met à jour la liste de tous les jobs d'industrie pour chaque propriétaire."""
-    for owner in BlueprintOwner.objects.all():
-        try:
-            eve_char = owner.character
-            token = eve_char.fetch_token()
-        except Exception:
-            continue
-        if owner.is_corporation:
-            corp_id = owner.corporation_id
-            url = f"{ESI_BASE_URL}/corporations/{corp_id}/industry/jobs/?include_completed=false"
-            headers = {"Authorization": f"Bearer {token.access_token}"}
-        else:
-            char_id = owner.character.character_id
-            url = f"{ESI_BASE_URL}/characters/{char_id}/industry/jobs/?include_completed=false"
-            headers = {"Authorization": f"Bearer {token.access_token}"}
-        response = requests.get(url, headers=headers, timeout=30)
-        if response.status_code != 200:
-            continue
-        jobs_data = response.json()
-        current_job_ids = []
-        for job in jobs_data:
-            current_job_ids.append(job["job_id"])
-            # Determine blueprint instance si possible
-            bp_item_id = job.get("blueprint_id")
-            bp_instance = None
-            if bp_item_id:
-                try:
-                    bp_instance = Blueprint.objects.get(owner=owner, item_id=bp_item_id)
-                except Blueprint.DoesNotExist:
-                    bp_instance = None
-            IndustryJob.objects.update_or_create(
-                job_id=job["job_id"],
-                defaults={
-                    "owner": owner,
-                    "activity": job.get(
-                        "activity_name", str(job.get("activity_id", ""))
+def _archive_jobs(pks):
+    """Déplace les jobs `pks` vers l'historique, retourne le nombre de jobs archivés."""
+    now = timezone.now()
+    archived = 0
+    for start in range(0, len(pks), BULK_BATCH_SIZE):
+        batch = pks[start : start + BULK_BATCH_SIZE]
+        rows = IndustryJob.objects.filter(pk__in=batch).values_list(
+            "owner_id",
+            "job_id",
+            "activity",
+            "blueprint__eve_type_id",
+            "start_date",
+            "end_date",
+        )
+        IndustryJobHistory.objects.bulk_create(
+            [
+                IndustryJobHistory(
+                    owner_id=owner_id,
+                    job_id=job_id,
+                    activity=activity,
+                    # Disparu avant sa fin: annulé
+                    status=(
+                        IndustryJobHistory.Status.DELIVERED
+                        if end_date and end_date <= now
+                        else IndustryJobHistory.Status.CANCELLED
                     ),
-                    "status": job.get("status", "active"),
-                    "blueprint": bp_instance,
-                    "start_date": job.get("start_date"),
-                    "end_date": job.get("end_date"),
-                },
+                    blueprint_type_id=blueprint_type_id,
+                    start_date=start_date,
+                    end_date=end_date,
+                    archived_at=now,
+                )
+                for owner_id, job_id, activity, blueprint_type_id, start_date, end_date in rows
+            ],
+            ignore_conflicts=True,
+        )
+        archived += IndustryJob.objects.filter(pk__in=batch).delete()[0]
+    return archived
+
+
+def _fetch_owner_industry_jobs(owner, headers, stats):
+    if owner.is_corporation:
+        corp_id = owner.corporation_id
+        url = esi_url(f"/corporations/{corp_id}/industry/jobs/")
+    else:
+        char_id = owner.character.character_id
+        url = esi_url(f"/characters/{char_id}/industry/jobs/")
+    return fetch_pages(
+        url, headers, stats, JobRecord, params={"include_completed": "false"}
+    )
+
+
+def sync_owner_industry_jobs(owner, stats):
+    """Met à jour les jobs d'industrie d'un propriétaire."""
+    records = _fetch_owner_industry_jobs(owner, _owner_headers(owner), stats)
+    with stats.phase("apply"):
+        _apply_owner_industry_jobs(owner, records, stats)
+    _schedule_jobs_refresh(owner)
+
+
+def _schedule_jobs_refresh(owner):
+    """Planifie la prochaine synchronisation des jobs à la fin de job la plus proche."""
+    now = timezone.now()
+    next_end = IndustryJob.objects.filter(
+        owner=owner, status="active", end_date__gt=now
+    ).aggregate(next_end=Min("end_date"))["next_end"]
+    latest = now + dt.timedelta(seconds=BLUEPRINTS_JOBS_MAX_REFRESH)
+    earliest = now + dt.timedelta(seconds=BLUEPRINTS_JOBS_MIN_REFRESH)
+    owner.jobs_refresh_at = max(min(next_end or latest, latest), earliest)
+    owner.save(update_fields=["jobs_refresh_at"])
+
+
+def _incoming_jobs(records, blueprint_pks):
+    """Oublie les blueprints inconnus du propriétaire, comme le fait la base (NULL)."""
+    for record in records:
+        if record.blueprint_item_id not in blueprint_pks:
+            record.blueprint_item_id = None
+        yield record
+
+
+def _job_model(owner, blueprint_pks, record, pk=None):
+    return IndustryJob(
+        pk=pk,
+        owner=owner,
+        job_id=record.job_id,
+        activity=record.activity,
+        status=record.status,
+        # Blueprint lié si connu du propriétaire
+        blueprint_id=blueprint_pks.get(record.blueprint_item_id),
+        start_date=record.start_date,
+        end_date=record.end_date,
+    )
+
+
+def _apply_owner_industry_jobs(owner, records, stats, blueprint_pks=None):
+    """Écrit en base les jobs d'industrie reçus d'ESI pour un propriétaire.
+
+    `blueprint_pks` ({item_id: pk} des blueprints du propriétaire) est relu en
+    base s'il n'est pas fourni par la synchronisation des blueprints.
+    """
+    if blueprint_pks is None:
+        blueprint_pks = dict(
+            Blueprint.objects.filter(owner=owner).values_list("item_id", "pk")
+        )
+    existing = load_existing(IndustryJob.objects.filter(owner=owner), JobRecord)
+    diff = diff_records(existing, _incoming_jobs(records, blueprint_pks))
+    if records.not_modified:
+        return  # inchangé depuis la dernière synchronisation (ETag)
+    # job_id est unique globalement: un job "nouveau" peut exister chez un autre owner
+    moved = {}
+    previous_owners = set()
+    for job_id, pk, owner_id in IndustryJob.objects.filter(
+        job_id__in=[record.job_id for record in diff.created]
+    ).values_list("job_id", "pk", "owner_id"):
+        moved[job_id] = pk
+        previous_owners.add(owner_id)
+    changed = [
+        _job_model(owner, blueprint_pks, record, pk) for pk, record in diff.changed
+    ]
+    changed += [
+        _job_model(owner, blueprint_pks, record, moved[record.job_id])
+        for record in diff.created
+        if record.job_id in moved
+    ]
+    with transaction.atomic():
+        IndustryJob.objects.bulk_create(
+            [
+                _job_model(owner, blueprint_pks, record)
+                for record in diff.created
+                if record.job_id not in moved
+            ],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        IndustryJob.objects.bulk_update(
+            changed,
+            fields=[
+                "owner",
+                "activity",
+                "status",
+                "blueprint",
+                "start_date",
+                "end_date",
+            ],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        # Archiver les jobs qui ne sont plus actifs (plus présents)
+        deleted = _archive_jobs(diff.removed)
+        if diff:
+            rebuild_owner_buckets(owner)
+            rebuild_owner_facets(owner, [FacetCount.Facet.BUSY])
+        # Les jobs repris à un autre propriétaire quittent aussi sa frise
+        for previous_owner in BlueprintOwner.objects.filter(pk__in=previous_owners):
+            rebuild_owner_buckets(previous_owner)
+        # ETag gardés seulement si l'écriture est validée
+        records.commit_etags()
+    bump_owners(previous_owners | ({owner.pk} if diff else set()), "jobs")
+    stats.rows_written += len(diff.created) + len(diff.changed)
+    stats.rows_deleted += deleted
+
+
+# Sections synchronisées ensemble par `refresh_owner_data`
+PIPELINE_SECTIONS = (
+    OwnerSyncStatus.Section.BLUEPRINTS,
+    OwnerSyncStatus.Section.INDUSTRY_JOBS,
+)
+
+
+def _open_owner_rows(owner, stats):
+    """Endpoints ESI (blueprints, jobs) d'un propriétaire, pas encore téléchargés."""
+    headers = _owner_headers(owner)
+    return (
+        _fetch_owner_blueprints(
+            owner, headers, stats[OwnerSyncStatus.Section.BLUEPRINTS]
+        ),
+        _fetch_owner_industry_jobs(
+            owner, headers, stats[OwnerSyncStatus.Section.INDUSTRY_JOBS]
+        ),
+    )
+
+
+def refresh_owner_data(owner, stats, rows=None):
+    """Synchronise blueprints et jobs d'un propriétaire en une passe.
+
+    Les deux endpoints sont téléchargés en parallèle (sauf s'ils l'ont déjà été:
+    `rows`, cf. `_refresh_owner_batch`), puis écrits dans une même transaction:
+    les jobs sont reliés aux blueprints via la table {item_id: pk} issue de leur
+    écriture, sans relire la base. Seuls les emplacements découverts pendant
+    cette passe sont ensuite envoyés à la résolution.
+    """
+    blueprint_stats = stats[OwnerSyncStatus.Section.BLUEPRINTS]
+    job_stats = stats[OwnerSyncStatus.Section.INDUSTRY_JOBS]
+    blueprints, jobs = rows or prefetch_all(_open_owner_rows(owner, stats))
+    with transaction.atomic():
+        with blueprint_stats.phase("apply"):
+            item_pks, locations = _apply_owner_blueprints(
+                owner, blueprints, blueprint_stats
             )
-        # Supprimer les jobs qui ne sont plus actifs (plus présents)
-        IndustryJob.objects.filter(owner=owner).exclude(
-            job_id__in=current_job_ids
-        ).delete()
+        with job_stats.phase("apply"):
+            _apply_owner_industry_jobs(owner, jobs, job_stats, item_pks)
+    _schedule_jobs_refresh(owner)
+    if locations:
+        resolve_location_ids.delay(sorted(locations))
 
 
-@shared_task
-def update_all_locations():
-    """Résout les noms des emplacements (structures) pour tous les IDs non résolus."""
-    # On récupère tous les BlueprintLocation sans nom connu
-    to_resolve = BlueprintLocation.objects.filter(name__exact="")
+def resolve_locations(to_resolve, stats=None):
+    """Résout les noms des emplacements (structures) du queryset `to_resolve`."""
+    stats = stats or SyncStats()
     if not to_resolve:
         return
+    written = []
     ids = [loc.id for loc in to_resolve]
     # L'ESI /universe/names peut résoudre certains IDs en nom (stations, systèmes, etc.), mais pour les structures privées,
     # il faut /universe/structures/{id} avec jeton. Ici, on tente l'approche générale:
     try:
-        response = requests.post(
-            f"{ESI_BASE_URL}/universe/names/", json=ids, timeout=30
-        )
+        with stats.phase("fetch"):
+            response = requests.post(esi_url("/universe/names/"), json=ids, timeout=30)
+        stats.http_status = response.status_code
+        stats.pages += 1
         if response.status_code == 200:
-            results = response.json()
+            with stats.phase("parse"):
+                results = response.json()
         else:
             results = []
     except Exception:
         results = []
+    stats.rows_received += len(results)
     # results devrait contenir des dict avec {"id": ..., "name": ..., "category": ...}
-    for entry in results:
-        loc_id = entry.get("id")
-        name = entry.get("name", "")
-        category = entry.get("category", "")
-        BlueprintLocation.objects.filter(id=loc_id).update(name=name, category=category)
+    with stats.phase("apply"):
+        for entry in results:
+            loc_id = entry.get("id")
+            name = entry.get("name", "")
+            category = entry.get("category", "")
+            if BlueprintLocation.objects.filter(id=loc_id).update(
+                name=name, category=category
+            ):
+                written.append(loc_id)
+    stats.rows_written += len(written)
     # Pour les IDs non résolus par universe/names (typiquement les structures Upwell privées),
     # il faudrait appeler /universe/structures/{id} individuellement avec un token possédant le scope.
     # On parcourt encore ceux sans nom:
-    unresolved = BlueprintLocation.objects.filter(name__exact="")
+    unresolved = BlueprintLocation.objects.filter(id__in=ids, name__exact="")
     if unresolved.exists():
         # On utilise un token (ex: le premier directeur dispo) pour résoudre chaque structure
         # (Simplification: on prend le premier personnage ayant scope structure)
@@ -173,13 +551,254 @@ def update_all_locations():
             token = None
         if token:
             for loc in unresolved:
-                struct_url = f"{ESI_BASE_URL}/universe/structures/{loc.id}/"
-                res = requests.get(
-                    struct_url,
-                    headers={"Authorization": f"Bearer {token.access_token}"},
-                )
+                struct_url = esi_url(f"/universe/structures/{loc.id}/")
+                with stats.phase("fetch"):
+                    res = requests.get(
+                        struct_url,
+                        headers={"Authorization": f"Bearer {token.access_token}"},
+                    )
+                stats.http_status = res.status_code
+                stats.pages += 1
                 if res.status_code == 200:
-                    struct_data = res.json()
-                    loc.name = struct_data.get("name", f"Structure {loc.id}")
-                    loc.category = "Structure"
-                    loc.save()
+                    with stats.phase("parse"):
+                        struct_data = res.json()
+                    stats.rows_received += 1
+                    with stats.phase("apply"):
+                        loc.name = struct_data.get("name", f"Structure {loc.id}")
+                        loc.category = "Structure"
+                        loc.save()
+                    stats.rows_written += 1
+                    written.append(loc.id)
+    if written:
+        bump_location_owners(written)
+
+
+def sync_owner_locations(owner, stats):
+    """Résout les emplacements non nommés référencés par les blueprints d'un propriétaire."""
+    blueprints = Blueprint.objects.filter(owner=owner)
+    resolve_locations(
+        BlueprintLocation.objects.filter(
+            Q(id__in=blueprints.values("location_id"))
+            | Q(id__in=blueprints.values("root_location_id")),
+            name__exact="",
+        ),
+        stats,
+    )
+
+
+def _fetch_owner_assets(owner, headers, stats):
+    if owner.is_corporation:
+        url = esi_url(f"/corporations/{owner.corporation_id}/assets/")
+    else:
+        url = esi_url(f"/characters/{owner.character.character_id}/assets/")
+    return fetch_pages(url, headers, stats, AssetRecord)
+
+
+def sync_owner_location_tree(owner, stats):
+    """Remonte les conteneurs et bureaux des blueprints d'un propriétaire jusqu'à
+    leur station ou structure (assets ESI, scope facultatif)."""
+    try:
+        headers = {"Authorization": f"Bearer {tokens.asset_access_token(owner)}"}
+    except tokens.TokenUnavailable as exc:
+        raise SyncSkipped(f"Token indisponible: {exc}") from exc
+    assets = _fetch_owner_assets(owner, headers, stats)
+    with stats.phase("apply"):
+        roots = apply_tree(owner, assets, stats)
+        discovered = _discover_locations(roots)
+    if discovered:
+        resolve_location_ids.delay(sorted(discovered))
+
+
+@shared_task(base=QueueOnce, once=ONCE_OPTIONS, **task_options(BULK))
+def update_all_blueprints():
+    """Met à jour la liste de tous les blueprints pour l'ensemble des propriétaires."""
+    type_registry.load()
+    for owner in _owners_with_tokens(BlueprintOwner.objects.all()):
+        _run_owner_sync(
+            owner, OwnerSyncStatus.Section.BLUEPRINTS, sync_owner_blueprints
+        )
+    # Les types découverts pendant l'exécution sont résolus en une seule fois
+    type_registry.resolve_pending()
+
+
+@shared_task(base=QueueOnce, once=ONCE_OPTIONS, **task_options(BULK))
+def update_all_industry_jobs():
+    """Met à jour les jobs d'industrie des propriétaires dont la synchronisation est due.
+
+    À planifier fréquemment (ex: toutes les 5 minutes): chaque propriétaire n'est
+    synchronisé qu'à sa prochaine fin de job prévue (cf. `_schedule_jobs_refresh`).
+    """
+    due = Q(jobs_refresh_at__isnull=True) | Q(jobs_refresh_at__lte=timezone.now())
+    for owner in _owners_with_tokens(BlueprintOwner.objects.filter(due)):
+        _run_owner_sync(
+            owner, OwnerSyncStatus.Section.INDUSTRY_JOBS, sync_owner_industry_jobs
+        )
+
+
+@shared_task(base=QueueOnce, once=ONCE_OPTIONS, **task_options(BACKGROUND))
+def update_all_locations():
+    """Résout les noms des emplacements (structures) pour tous les IDs non résolus."""
+    # On récupère tous les BlueprintLocation sans nom connu
+    resolve_locations(BlueprintLocation.objects.filter(name__exact=""))
+
+
+@shared_task(base=QueueOnce, once=ONCE_OPTIONS, **task_options(BULK))
+def update_all_location_trees():
+    """Met à jour la hiérarchie des conteneurs de tous les propriétaires."""
+    for owner in BlueprintOwner.objects.select_related("character"):
+        _run_owner_sync(
+            owner, OwnerSyncStatus.Section.LOCATION_TREE, sync_owner_location_tree
+        )
+
+
+@shared_task(**task_options(INTERACTIVE))
+def update_owner_blueprints(owner_pk):
+    """Met à jour les blueprints d'un seul propriétaire."""
+    owner = BlueprintOwner.objects.get(pk=owner_pk)
+    type_registry.load()
+    _run_owner_sync(owner, OwnerSyncStatus.Section.BLUEPRINTS, sync_owner_blueprints)
+    type_registry.resolve_pending()
+
+
+@shared_task(**task_options(INTERACTIVE))
+def update_owner_industry_jobs(owner_pk):
+    """Met à jour les jobs d'industrie d'un seul propriétaire."""
+    owner = BlueprintOwner.objects.get(pk=owner_pk)
+    _run_owner_sync(
+        owner, OwnerSyncStatus.Section.INDUSTRY_JOBS, sync_owner_industry_jobs
+    )
+
+
+@shared_task(**task_options(INTERACTIVE))
+def update_owner_locations(owner_pk):
+    """Résout les emplacements inconnus des blueprints d'un seul propriétaire."""
+    owner = BlueprintOwner.objects.get(pk=owner_pk)
+    _run_owner_sync(owner, OwnerSyncStatus.Section.LOCATIONS, sync_owner_locations)
+
+
+@shared_task(base=QueueOnce, once=ONCE_OPTIONS, **task_options(BULK))
+def refresh_all_owners():
+    """Synchronise blueprints et jobs de tous les propriétaires (une passe chacun)."""
+    type_registry.load()
+    owners = _owners_with_tokens(BlueprintOwner.objects.all())
+    for batch in _owner_batches(owners):
+        _refresh_owner_batch(batch)
+    type_registry.resolve_pending()
+
+
+def _owner_batches(owners):
+    """Lots de propriétaires téléchargés ensemble: au plus BLUEPRINTS_ESI_OWNER_BATCH
+    propriétaires, et BLUEPRINTS_ESI_BATCH_ROWS blueprints d'après leurs compteurs."""
+    sizes = dict(
+        FacetCount.objects.filter(
+            facet=FacetCount.Facet.OWNER, owner__in=owners
+        ).values_list("owner_id", "count")
+    )
+    batch, rows = [], 0
+    for owner in owners:
+        size = sizes.get(owner.pk, 0)
+        if batch and (
+            len(batch) >= BLUEPRINTS_ESI_OWNER_BATCH
+            or rows + size > BLUEPRINTS_ESI_BATCH_ROWS
+        ):
+            yield batch
+            batch, rows = [], 0
+        batch.append(owner)
+        rows += size
+    if batch:
+        yield batch
+
+
+def _refresh_owner_batch(owners):
+    """Télécharge ensemble les pages ESI de plusieurs propriétaires, puis les écrit
+    un par un (cf. BLUEPRINTS_ESI_BACKEND)."""
+    prepared = {}
+    for owner in owners:
+        stats = {section: SyncStats() for section in PIPELINE_SECTIONS}
+        try:
+            prepared[owner.pk] = (stats, _open_owner_rows(owner, stats))
+        except SyncSkipped:
+            continue  # enregistré comme ignoré par `_run_owner_sections` ci-dessous
+    prefetch_all(rows for _, owner_rows in prepared.values() for rows in owner_rows)
+    for owner in owners:
+        if owner.pk not in prepared:
+            _run_owner_sections(owner, PIPELINE_SECTIONS, refresh_owner_data)
+            continue
+        stats, rows = prepared[owner.pk]
+        _run_owner_sections(
+            owner,
+            PIPELINE_SECTIONS,
+            partial(refresh_owner_data, rows=rows),
+            stats=stats,
+        )
+
+
+@shared_task(**task_options(INTERACTIVE))
+def refresh_owner(owner_pk):
+    """Synchronise blueprints et jobs d'un seul propriétaire (une passe)."""
+    owner = BlueprintOwner.objects.select_related("character").get(pk=owner_pk)
+    type_registry.load()
+    _run_owner_sections(owner, PIPELINE_SECTIONS, refresh_owner_data)
+    type_registry.resolve_pending()
+
+
+@shared_task(**task_options(BACKGROUND))
+def resolve_location_ids(location_ids):
+    """Résout les noms des emplacements `location_ids` encore inconnus."""
+    resolve_locations(
+        BlueprintLocation.objects.filter(id__in=location_ids, name__exact="")
+    )
+
+
+@shared_task(**task_options(BACKGROUND))
+def resolve_eve_types(type_ids):
+    """Charge (ou recharge) les types EVE `type_ids` via les loaders d'eveuniverse."""
+    for type_id in type_ids:
+        try:
+            EveType.objects.update_or_create_esi(id=type_id)
+        except Exception:
+            logger.exception("Impossible de résoudre le type EVE %s", type_id)
+    # Groupe des types désormais connu
+    rebuild_type_facets(type_ids)
+    bump_types()
+
+
+@shared_task(**task_options(BULK))
+def backfill_placeholder_types():
+    """Résout les types provisoires ("Type 1234") encore référencés par l'application."""
+    type_ids = list(
+        placeholder_types()
+        .filter(
+            Q(id__in=Blueprint.objects.values("eve_type_id"))
+            | Q(id__in=BlueprintRequest.objects.values("blueprint_type_id"))
+        )
+        .values_list("id", flat=True)
+    )
+    for start in range(0, len(type_ids), TYPE_RESOLVE_BATCH_SIZE):
+        resolve_eve_types.delay(type_ids[start : start + TYPE_RESOLVE_BATCH_SIZE])
+
+
+@shared_task(**task_options(BULK))
+def update_industry_data():
+    """Recharge depuis le SDE les données industrielles des types de la bibliothèque."""
+    load_activities(library_type_ids())
+
+
+@shared_task(**task_options(BULK))
+def snapshot_all_owners():
+    """Prend la photo quotidienne de la bibliothèque de chaque propriétaire."""
+    for owner in BlueprintOwner.objects.all():
+        take_snapshot(owner)
+
+
+def queue_owner_refresh(owner_pk, priority=BLUEPRINTS_REFRESH_PRIORITY):
+    """Planifie le rafraîchissement complet (blueprints, jobs, emplacements) d'un propriétaire.
+
+    Blueprints et jobs sont synchronisés en une passe (`refresh_owner`), puis les
+    emplacements encore inconnus du propriétaire sont résolus.
+    """
+    options = {**task_options(INTERACTIVE), "priority": priority}
+    return chain(
+        refresh_owner.si(owner_pk).set(**options),
+        update_owner_locations.si(owner_pk).set(**options),
+    ).apply_async()
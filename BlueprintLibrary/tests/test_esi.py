@@ -0,0 +1,155 @@
+"""
+Tests du décodage ESI au fil de l'eau
+"""
+
+# Standard Library
+import json
+from unittest import mock
+
+# Django
+from django.core.cache import cache
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase
+
+from .. import esi
+from ..esi import fetch_pages, iter_json_array
+from ..metrics import SyncStats
+
+URL = "https://esi.test/rows/"
+
+
+def _chunks(body, size):
+    return [body[start : start + size] for start in range(0, len(body), size)]
+
+
+class TestIterJsonArray(SimpleTestCase):
+    """
+    TestIterJsonArray
+    """
+
+    def test_should_decode_array_split_in_small_chunks(self):
+        """
+        Les éléments coupés entre deux morceaux (y compris au milieu d'un
+        caractère UTF-8) sont reconstitués
+        :return:
+        :rtype:
+        """
+
+        data = [
+            {"item_id": n, "location_flag": "Hangar é", "nested": [n, {"x": None}]}
+            for n in range(50)
+        ]
+        body = json.dumps(data, ensure_ascii=False).encode()
+
+        for size in (1, 3, 7, 64, len(body)):
+            self.assertEqual(list(iter_json_array(_chunks(body, size))), data)
+
+    def test_should_not_cut_numbers_at_chunk_boundary(self):
+        """
+        Un nombre en fin de morceau n'est produit qu'une fois complet
+        :return:
+        :rtype:
+        """
+
+        self.assertEqual(list(iter_json_array([b"[12", b"34, 5", b"6]"])), [1234, 56])
+
+    def test_should_decode_empty_array(self):
+        """
+        Tableau vide
+        :return:
+        :rtype:
+        """
+
+        self.assertEqual(list(iter_json_array([b" [ ", b"] "])), [])
+
+    def test_should_reject_truncated_or_invalid_body(self):
+        """
+        Corps tronqué ou qui n'est pas un tableau
+        :return:
+        :rtype:
+        """
+
+        for body in (b"[1, 2", b"{}", b"[1] x"):
+            with self.subTest(body=body), self.assertRaises(ValueError):
+                list(iter_json_array([body]))
+
+
+class _Row:
+    @staticmethod
+    def from_esi(item):
+        return item
+
+
+class _Response:
+    """Réponse ESI minimale (corps diffusé d'un seul morceau)."""
+
+    def __init__(self, status_code, headers, body=b""):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+
+    def iter_content(self, chunk_size):
+        yield self.body
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class TestEtagCommit(TestCase):
+    """
+    TestEtagCommit
+    """
+
+    PAGES = {1: [1], 2: [2]}
+
+    def setUp(self):
+        cache.clear()
+        self.requests = []
+
+    def _get_page(self, url, headers, stats, params=None, etag=None, stream=False):
+        page = params["page"]
+        self.requests.append((page, etag))
+        headers = {"ETag": f'"{page}"', "X-Pages": str(len(self.PAGES))}
+        if etag == headers["ETag"]:
+            return _Response(304, headers)
+        return _Response(200, headers, json.dumps(self.PAGES[page]).encode())
+
+    def _sync(self, fail=False):
+        """Synchronisation: lignes lues puis "écrites" dans une transaction."""
+        self.requests = []
+        rows = fetch_pages(URL, {}, SyncStats(), _Row)
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            result = list(rows)
+            rows.commit_etags()
+            if fail:
+                raise ValueError("écriture en échec")
+        return rows, result
+
+    def test_should_redownload_after_failed_apply(self):
+        """
+        Une écriture en échec ne garde pas les ETag: la synchronisation suivante
+        retélécharge les pages au lieu de recevoir des 304
+        :return:
+        :rtype:
+        """
+
+        with mock.patch.object(esi, "get_page", self._get_page):
+            with self.assertRaises(ValueError):
+                self._sync(fail=True)
+            rows, result = self._sync()
+
+            self.assertEqual(result, [1, 2])
+            self.assertFalse(rows.not_modified)
+            self.assertEqual(self.requests, [(1, None), (2, None)])
+
+            rows, result = self._sync()
+
+            self.assertEqual(result, [])
+            self.assertTrue(rows.not_modified)
+            self.assertEqual(self.requests, [(1, '"1"'), (2, '"2"')])
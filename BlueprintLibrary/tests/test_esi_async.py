@@ -0,0 +1,165 @@
+"""
+Tests du téléchargement asynchrone des pages ESI
+"""
+
+# Standard Library
+import json
+from unittest import skipUnless
+
+# Django
+from django.core.cache import cache
+from django.test import TestCase
+
+from .. import esi_async
+from ..esi import EsiError, EsiRows
+from ..metrics import SyncStats
+
+
+class _Row:
+    @staticmethod
+    def from_esi(item):
+        return item
+
+
+def _transport(pages, requests, status=200):
+    """Faux ESI: `pages` = {page: lignes}, ETag = numéro de page."""
+
+    def handler(request):
+        page = int(request.url.params["page"])
+        requests.append((page, request.headers.get("If-None-Match")))
+        if status != 200:
+            return esi_async.httpx.Response(status)
+        etag = f'"{page}"'
+        headers = {"ETag": etag, "X-Pages": str(len(pages))}
+        if request.headers.get("If-None-Match") == etag:
+            return esi_async.httpx.Response(304, headers=headers)
+        return esi_async.httpx.Response(
+            200, headers=headers, content=json.dumps(pages[page]).encode()
+        )
+
+    return esi_async.httpx.MockTransport(handler)
+
+
+@skipUnless(esi_async.is_available(), "httpx n'est pas installé")
+class TestPrefetchAll(TestCase):
+    """
+    TestPrefetchAll
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def _rows(self, url="https://esi.test/rows/"):
+        return EsiRows(url, {}, SyncStats(), _Row)
+
+    def _synced(self, pages):
+        """Premier passage écrit en base: ETag enregistrés."""
+        rows = self._rows()
+        esi_async.prefetch_all([rows], _transport(pages, []))
+        with self.captureOnCommitCallbacks(execute=True):
+            list(rows)
+            rows.commit_etags()
+
+    def test_should_download_all_pages_in_order(self):
+        """
+        Toutes les pages sont téléchargées et produites dans l'ordre
+        :return:
+        :rtype:
+        """
+
+        requests = []
+        rows = self._rows()
+        esi_async.prefetch_all(
+            [rows], _transport({1: [1, 2], 2: [3], 3: [4, 5]}, requests)
+        )
+
+        self.assertEqual(list(rows), [1, 2, 3, 4, 5])
+        self.assertFalse(rows.not_modified)
+        self.assertEqual(rows.stats.pages, 3)
+        self.assertEqual(rows.stats.rows_received, 5)
+
+    def test_should_be_not_modified_when_every_page_answers_304(self):
+        """
+        Deuxième passage sans changement: aucune ligne, not_modified
+        :return:
+        :rtype:
+        """
+
+        pages = {1: [1], 2: [2]}
+        self._synced(pages)
+        requests = []
+        rows = self._rows()
+        esi_async.prefetch_all([rows], _transport(pages, requests))
+
+        self.assertEqual(list(rows), [])
+        self.assertTrue(rows.not_modified)
+        self.assertEqual(sorted(requests), [(1, '"1"'), (2, '"2"')])
+
+    def test_should_refetch_unchanged_pages_when_another_page_changed(self):
+        """
+        Une page inchangée (304) est redemandée sans ETag si une autre a changé
+        :return:
+        :rtype:
+        """
+
+        self._synced({1: [1], 2: [2]})
+        cache.delete("blueprints:esi:etag:https://esi.test/rows/:2")
+        requests = []
+        rows = self._rows()
+        esi_async.prefetch_all([rows], _transport({1: [1], 2: [3]}, requests))
+
+        self.assertEqual(list(rows), [1, 3])
+        self.assertIn((1, None), requests)
+
+    def test_should_raise_error_on_iteration_only(self):
+        """
+        Une erreur ESI est levée à l'itération de l'endpoint concerné
+        :return:
+        :rtype:
+        """
+
+        rows = self._rows()
+        esi_async.prefetch_all([rows], _transport({1: []}, [], status=403))
+
+        with self.assertRaises(EsiError):
+            list(rows)
+
+    def test_should_not_keep_etags_without_commit(self):
+        """
+        Sans écriture validée, le passage suivant retélécharge toutes les pages
+        :return:
+        :rtype:
+        """
+
+        pages = {1: [1], 2: [2]}
+        esi_async.prefetch_all([self._rows()], _transport(pages, []))
+        requests = []
+        rows = self._rows()
+        esi_async.prefetch_all([rows], _transport(pages, requests))
+
+        self.assertEqual(list(rows), [1, 2])
+        self.assertEqual(sorted(requests), [(1, None), (2, None)])
+
+    def test_should_fail_only_the_endpoint_with_malformed_page(self):
+        """
+        Une page mal formée fait échouer son endpoint seul, à l'itération
+        :return:
+        :rtype:
+        """
+
+        def handler(request):
+            if request.url.path == "/bad/":
+                return esi_async.httpx.Response(
+                    200, headers={"X-Pages": "1"}, content=b'{"not": "a list"}'
+                )
+            return esi_async.httpx.Response(
+                200, headers={"X-Pages": "1"}, content=b"[1]"
+            )
+
+        bad = self._rows("https://esi.test/bad/")
+        good = self._rows("https://esi.test/good/")
+        esi_async.prefetch_all([bad, good], esi_async.httpx.MockTransport(handler))
+
+        self.assertEqual(list(good), [1])
+        with self.assertRaises(ValueError):
+            list(bad)
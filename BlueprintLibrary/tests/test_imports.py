@@ -0,0 +1,63 @@
+"""
+Tests du chargement paresseux de l'application
+"""
+
+# Django
+from django.test import SimpleTestCase
+
+from ..benchmarks.import_time import PACKAGE, imported_modules, parse_importtime
+
+
+class TestLazyImports(SimpleTestCase):
+    """
+    TestLazyImports
+    """
+
+    def test_should_not_import_tasks_or_views_on_startup(self):
+        """
+        django.setup() (modèles, admin) ne charge ni les tâches ni les vues
+        :return:
+        :rtype:
+        """
+
+        modules = imported_modules(f"{PACKAGE}.tasks")
+
+        self.assertIn(f"{PACKAGE}.tasks", modules)
+        self.assertNotIn(f"{PACKAGE}.views", modules)
+        self.assertNotIn("datatables.views", modules)
+
+    def test_should_not_import_urls_with_hooks(self):
+        """
+        Les hooks d'Auth n'importent les URLs (et les vues) qu'à leur appel
+        :return:
+        :rtype:
+        """
+
+        modules = imported_modules(f"{PACKAGE}.auth_hooks")
+
+        self.assertNotIn(f"{PACKAGE}.urls", modules)
+        self.assertNotIn(f"{PACKAGE}.views", modules)
+
+
+class TestParseImportTime(SimpleTestCase):
+    """
+    TestParseImportTime
+    """
+
+    def test_should_read_cumulative_time_per_module(self):
+        """
+        Temps propre et cumulé par module, en-tête ignoré
+        :return:
+        :rtype:
+        """
+
+        output = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   json.decoder\n"
+            "import time:       300 |        420 | json\n"
+        )
+
+        modules, total = parse_importtime(output)
+
+        self.assertEqual(modules, {"json.decoder": (120, 120), "json": (300, 420)})
+        self.assertEqual(total, 420)
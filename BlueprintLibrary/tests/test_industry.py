@@ -0,0 +1,49 @@
+"""
+Tests du calcul des matériaux et durées de fabrication (ME/TE)
+"""
+
+# Django
+from django.test import SimpleTestCase
+
+from ..industry import _Profile, material_quantities
+from ..models import BlueprintActivity
+
+
+def _activity():
+    return BlueprintActivity(
+        blueprint_type_id=1000,
+        activity=BlueprintActivity.Activity.MANUFACTURING,
+        time=3600,
+        product_type_id=2000,
+        product_quantity=1,
+        material_type_ids=[34, 35, 36],
+        material_quantities=[1000, 1, 3],
+    )
+
+
+class TestIndustry(SimpleTestCase):
+    """
+    TestIndustry
+    """
+
+    def test_should_never_go_below_one_unit_per_run(self):
+        """
+        L'ME ne fait jamais descendre un matériau sous une unité par run
+        :return:
+        :rtype:
+        """
+
+        self.assertListEqual(material_quantities([0.9, 2.7], 10), [10, 27])
+
+    def test_should_apply_me_and_te_for_runs(self):
+        """
+        Matériaux et durée pour 10 runs avec ME 10 / TE 20
+        :return:
+        :rtype:
+        """
+
+        build = _Profile(_activity(), 10, 20).build(10)
+
+        self.assertEqual(build.time, 28800)
+        self.assertEqual(build.product_quantity, 10)
+        self.assertListEqual(build.materials, [(34, 9000), (35, 10), (36, 27)])
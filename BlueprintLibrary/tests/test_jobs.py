@@ -0,0 +1,47 @@
+"""
+Tests du statut des jobs d'industrie déduit de leur date de fin
+"""
+
+# Standard Library
+import datetime as dt
+
+# Django
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from ..models import IndustryJob
+
+
+class TestCurrentStatus(SimpleTestCase):
+    """
+    TestCurrentStatus
+    """
+
+    def test_should_be_ready_once_end_date_has_passed(self):
+        """
+        Un job actif dont la fin est passée est prêt, sans attendre ESI
+        :return:
+        :rtype:
+        """
+
+        job = IndustryJob(
+            status="active", end_date=timezone.now() - dt.timedelta(minutes=1)
+        )
+
+        self.assertEqual(job.current_status, "ready")
+
+    def test_should_keep_esi_status_otherwise(self):
+        """
+        Un job en cours ou en pause garde le statut reçu d'ESI
+        :return:
+        :rtype:
+        """
+
+        future = timezone.now() + dt.timedelta(hours=1)
+
+        self.assertEqual(
+            IndustryJob(status="active", end_date=future).current_status, "active"
+        )
+        self.assertEqual(
+            IndustryJob(status="paused", end_date=future).current_status, "paused"
+        )
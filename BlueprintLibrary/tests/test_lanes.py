@@ -0,0 +1,79 @@
+"""
+Tests des voies Celery (files et priorités)
+"""
+
+# Standard Library
+from unittest import mock
+
+# Django
+from django.test import SimpleTestCase
+
+from .. import lanes
+
+
+def _lanes(bulk=None, interactive=None, background=None):
+    return {
+        lanes.BULK: {"queue": bulk, "priority": 6, "concurrency": 2},
+        lanes.INTERACTIVE: {"queue": interactive, "priority": 1, "concurrency": 4},
+        lanes.BACKGROUND: {"queue": background, "priority": 8, "concurrency": 1},
+    }
+
+
+class TestTaskOptions(SimpleTestCase):
+    """
+    TestTaskOptions
+    """
+
+    def test_should_keep_default_queue_without_setting(self):
+        """
+        Sans file dédiée, seule la priorité est donnée
+        :return:
+        :rtype:
+        """
+
+        with mock.patch.dict(lanes.LANES, _lanes()):
+            self.assertEqual(lanes.task_options(lanes.BULK), {"priority": 6})
+
+    def test_should_route_to_dedicated_queue(self):
+        """
+        Une file dédiée est ajoutée aux options de la tâche
+        :return:
+        :rtype:
+        """
+
+        with mock.patch.dict(lanes.LANES, _lanes(interactive="blueprints_fast")):
+            self.assertEqual(
+                lanes.task_options(lanes.INTERACTIVE),
+                {"priority": 1, "queue": "blueprints_fast"},
+            )
+
+
+class TestWorkerCommands(SimpleTestCase):
+    """
+    TestWorkerCommands
+    """
+
+    def test_should_sum_concurrency_of_shared_queue(self):
+        """
+        Une commande par file dédiée; une file partagée cumule les concurrences
+        :return:
+        :rtype:
+        """
+
+        with mock.patch.dict(
+            lanes.LANES, _lanes(bulk="blueprints", background="blueprints")
+        ):
+            self.assertEqual(
+                lanes.worker_commands(),
+                ["celery -A myauth worker -Q blueprints -c 3 -n blueprints@%h"],
+            )
+
+    def test_should_suggest_nothing_without_dedicated_queue(self):
+        """
+        Sans file dédiée, aucune commande
+        :return:
+        :rtype:
+        """
+
+        with mock.patch.dict(lanes.LANES, _lanes()):
+            self.assertEqual(lanes.worker_commands(), [])
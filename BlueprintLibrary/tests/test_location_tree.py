@@ -0,0 +1,148 @@
+"""
+Tests de la hiérarchie des emplacements (conteneurs)
+"""
+
+# Django
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase
+
+# Alliance Auth
+from allianceauth.eveonline.models import EveCharacter
+
+from ..location_tree import _write_links, build_links, root_of
+from ..metrics import SyncStats
+from ..models import BlueprintOwner, LocationParent
+from ..records import AssetRecord
+
+STATION = 60003760
+OFFICE = 1001
+CONTAINER = 1002
+NESTED = 1003
+
+
+def _assets():
+    return [
+        AssetRecord(OFFICE, STATION, "OfficeFolder", "station"),
+        AssetRecord(CONTAINER, OFFICE, "CorpSAG1", "item"),
+        AssetRecord(NESTED, CONTAINER, "Unlocked", "item"),
+        AssetRecord(2001, NESTED, "Unlocked", "item"),  # un blueprint
+        AssetRecord(3001, STATION, "Hangar", "station"),  # sans rapport
+    ]
+
+
+class TestBuildLinks(SimpleTestCase):
+    """
+    TestBuildLinks
+    """
+
+    def test_should_keep_only_links_leading_to_blueprint_locations(self):
+        """
+        Seuls les conteneurs sur le chemin des emplacements demandés sont gardés
+        :return:
+        :rtype:
+        """
+
+        links = build_links(_assets(), {NESTED, STATION})
+
+        self.assertEqual(
+            links,
+            {
+                NESTED: (CONTAINER, "Unlocked"),
+                CONTAINER: (OFFICE, "CorpSAG1"),
+                OFFICE: (STATION, "OfficeFolder"),
+            },
+        )
+
+    def test_should_stop_on_cycle(self):
+        """
+        Des données incohérentes (cycle) ne bouclent pas indéfiniment
+        :return:
+        :rtype:
+        """
+
+        assets = [
+            AssetRecord(1, 2, "Unlocked", "item"),
+            AssetRecord(2, 1, "Unlocked", "item"),
+        ]
+
+        self.assertEqual(set(build_links(assets, {1})), {1, 2})
+        self.assertIn(root_of({1: 2, 2: 1}, 1), {1, 2})
+
+
+class TestRootOf(SimpleTestCase):
+    """
+    TestRootOf
+    """
+
+    def test_should_climb_to_station(self):
+        """
+        Un conteneur imbriqué remonte jusqu'à la station; une station est sa propre racine
+        :return:
+        :rtype:
+        """
+
+        parents = {NESTED: CONTAINER, CONTAINER: OFFICE, OFFICE: STATION}
+
+        self.assertEqual(root_of(parents, NESTED), STATION)
+        self.assertEqual(root_of(parents, STATION), STATION)
+
+
+class TestWriteLinks(TestCase):
+    """
+    TestWriteLinks
+    """
+
+    def setUp(self):
+        character = EveCharacter.objects.create(
+            character_id=90000001,
+            character_name="Test Director",
+            corporation_id=98000001,
+            corporation_name="Test Corp",
+            corporation_ticker="TC",
+        )
+        self.owner = BlueprintOwner.objects.create(
+            character=character, corporation_id=98000001, is_corporation=True
+        )
+        self.other = BlueprintOwner.objects.create(
+            character=character, corporation_id=98000002, is_corporation=True
+        )
+
+    def _links(self, owner):
+        return {
+            link.item_id: (link.owner_id, link.parent_id, link.location_flag)
+            for link in LocationParent.objects.all()
+            if link.owner_id == owner.pk
+        }
+
+    def test_should_replace_moved_and_transferred_links(self):
+        """
+        Liens modifiés remplacés, liens disparus supprimés, conteneur repris par un
+        autre propriétaire sans conflit de clé
+        :return:
+        :rtype:
+        """
+
+        with transaction.atomic():
+            _write_links(self.other, {CONTAINER: (OFFICE, "CorpSAG1")}, SyncStats())
+            _write_links(
+                self.owner,
+                {NESTED: (CONTAINER, "Unlocked"), OFFICE: (STATION, "OfficeFolder")},
+                SyncStats(),
+            )
+            stats = SyncStats()
+            changes = _write_links(
+                self.owner,
+                {NESTED: (OFFICE, "Unlocked"), CONTAINER: (OFFICE, "CorpSAG2")},
+                stats,
+            )
+
+        self.assertEqual(changes, 3)
+        self.assertEqual(stats.rows_deleted, 1)
+        self.assertEqual(
+            self._links(self.owner),
+            {
+                NESTED: (self.owner.pk, OFFICE, "Unlocked"),
+                CONTAINER: (self.owner.pk, OFFICE, "CorpSAG2"),
+            },
+        )
+        self.assertEqual(self._links(self.other), {})
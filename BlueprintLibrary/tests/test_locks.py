@@ -0,0 +1,95 @@
+"""
+Tests des verrous de synchronisation par propriétaire
+"""
+
+# Standard Library
+from unittest import mock
+
+# Django
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from .. import locks
+from ..locks import OwnerLocked, current_run_id, holder, owner_lock
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TestOwnerLock(SimpleTestCase):
+    """
+    TestOwnerLock
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_should_refuse_second_run_while_held(self):
+        """
+        Une seconde exécution est refusée tant que la première tient le verrou
+        :return:
+        :rtype:
+        """
+
+        with owner_lock(1, "run-a"):
+            self.assertEqual(holder(1), "run-a")
+            with self.assertRaises(OwnerLocked) as context:
+                with owner_lock(1, "run-b"):
+                    pass
+            self.assertEqual(context.exception.run_id, "run-a")
+            # Un autre propriétaire n'est pas concerné
+            with owner_lock(2, "run-b"):
+                pass
+
+        self.assertIsNone(holder(1))
+
+    def test_should_release_on_error(self):
+        """
+        Le verrou est rendu même si la synchronisation échoue
+        :return:
+        :rtype:
+        """
+
+        with self.assertRaises(ValueError):
+            with owner_lock(1, "run-a"):
+                raise ValueError
+
+        self.assertIsNone(holder(1))
+
+    def test_should_not_release_lock_taken_over(self):
+        """
+        Un verrou expiré puis repris par une autre exécution n'est pas rendu
+        :return:
+        :rtype:
+        """
+
+        with owner_lock(1, "run-a"):
+            cache.set("blueprints:sync-lock:1", "run-b")
+
+        self.assertEqual(holder(1), "run-b")
+
+    def test_should_let_lock_expire_near_timeout(self):
+        """
+        Près de son expiration, le verrou n'est pas rendu: il a pu passer à une
+        autre exécution entre la lecture et la suppression
+        :return:
+        :rtype:
+        """
+
+        with mock.patch.object(locks, "time") as fake_time:
+            fake_time.monotonic.side_effect = [0, 60]
+            with owner_lock(1, "run-a", timeout=60):
+                pass
+
+        self.assertEqual(holder(1), "run-a")
+
+    def test_should_generate_run_id_outside_celery(self):
+        """
+        Hors d'une tâche Celery, chaque exécution reçoit un identifiant distinct
+        :return:
+        :rtype:
+        """
+
+        self.assertNotEqual(current_run_id(), current_run_id())
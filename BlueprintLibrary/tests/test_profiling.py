@@ -0,0 +1,57 @@
+"""
+Tests du profilage des vues
+"""
+
+# Django
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.test import SimpleTestCase, override_settings
+
+from .. import response_cache
+from ..profiling import RequestProfile, _current_profile, note_fragment
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TestCacheCounts(SimpleTestCase):
+    """
+    TestCacheCounts
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.profile = RequestProfile("TestView", "/test/")
+        token = _current_profile.set(self.profile)
+        self.addCleanup(_current_profile.reset, token)
+
+    def test_should_count_response_cache_reads(self):
+        """
+        Une reconstruction est un échec, une entrée servie un succès
+        :return:
+        :rtype:
+        """
+
+        key = response_cache.make_key("test", "scope")
+
+        response_cache.get_or_build(key, "v1", lambda: "value")
+        response_cache.get_or_build(key, "v1", lambda: "value")
+
+        self.assertEqual(self.profile.cache_hits, 1)
+        self.assertEqual(self.profile.cache_misses, 1)
+
+    def test_should_count_fragment_reads(self):
+        """
+        Un fragment absent est un échec, un fragment en cache un succès
+        :return:
+        :rtype:
+        """
+
+        note_fragment("blueprint_card", [1, "v1"])
+        cache.set(make_template_fragment_key("blueprint_card", [1, "v1"]), "html")
+        note_fragment("blueprint_card", [1, "v1"])
+
+        self.assertEqual(self.profile.cache_hits, 1)
+        self.assertEqual(self.profile.cache_misses, 1)
@@ -0,0 +1,146 @@
+"""
+Tests du score de classement des blueprints
+"""
+
+# Django
+from django.test import TestCase
+
+# Alliance Auth
+from allianceauth.eveonline.models import EveCharacter
+
+# Alliance Auth (External Libs)
+from eveuniverse.models import EveType
+
+from ..models import Blueprint, BlueprintOwner, IndustryJob
+from ..ranking import rank_blueprints
+
+STATION = 60003760
+OTHER_STATION = 60008494
+
+
+class TestRankBlueprints(TestCase):
+    """
+    TestRankBlueprints
+    """
+
+    def setUp(self):
+        character = EveCharacter.objects.create(
+            character_id=90000001,
+            character_name="Test Director",
+            corporation_id=98000001,
+            corporation_name="Test Corp",
+            corporation_ticker="TC",
+        )
+        self.owner = BlueprintOwner.objects.create(
+            character=character, corporation_id=98000001, is_corporation=True
+        )
+        self.eve_type = EveType.objects.create(id=688, name="Raven Blueprint")
+        self.item_id = 0
+
+    def _blueprint(self, me, te, runs, location_id=STATION):
+        self.item_id += 1
+        return Blueprint.objects.create(
+            owner=self.owner,
+            item_id=self.item_id,
+            eve_type=self.eve_type,
+            quantity=-1 if runs < 0 else -2,
+            time_efficiency=te,
+            material_efficiency=me,
+            runs=runs,
+            location_id=location_id,
+            location_flag="CorpSAG1",
+        )
+
+    def test_should_prefer_higher_me_then_te(self):
+        """
+        À runs et emplacement égaux, l'ME prime sur le TE
+        :return:
+        :rtype:
+        """
+
+        best = self._blueprint(10, 0, -1)
+        self._blueprint(9, 20, -1)
+
+        ranked = rank_blueprints(Blueprint.objects.all())
+
+        self.assertEqual(ranked[0][0], best.pk)
+
+    def test_should_count_copy_runs_up_to_needed(self):
+        """
+        Une copie avec assez de runs vaut un original, pas au-delà
+        :return:
+        :rtype:
+        """
+
+        original = self._blueprint(10, 20, -1)
+        copy = self._blueprint(10, 20, 50)
+        short = self._blueprint(10, 20, 5)
+
+        scores = {
+            pk: score
+            for pk, score, _ in rank_blueprints(Blueprint.objects.all(), needed_runs=10)
+        }
+
+        self.assertEqual(scores[original.pk], scores[copy.pk])
+        self.assertGreater(scores[copy.pk], scores[short.pk])
+
+    def test_should_rank_busy_blueprints_last(self):
+        """
+        Un blueprint occupé passe derrière un blueprint libre moins bon et éloigné
+        :return:
+        :rtype:
+        """
+
+        busy = self._blueprint(10, 20, -1)
+        free = self._blueprint(0, 0, 1, location_id=OTHER_STATION)
+        IndustryJob.objects.create(
+            owner=self.owner,
+            job_id=1,
+            activity="manufacturing",
+            status="active",
+            blueprint=busy,
+        )
+
+        ranked = rank_blueprints(
+            Blueprint.objects.all(), needed_runs=10, near=[STATION]
+        )
+
+        self.assertEqual(
+            [(pk, is_busy) for pk, _, is_busy in ranked],
+            [(free.pk, False), (busy.pk, True)],
+        )
+
+    def test_should_keep_only_top_blueprints(self):
+        """
+        Seuls les `top` meilleurs blueprints sont renvoyés
+        :return:
+        :rtype:
+        """
+
+        for me in range(5):
+            self._blueprint(me, 0, -1)
+
+        ranked = rank_blueprints(Blueprint.objects.all(), top=2)
+
+        self.assertEqual(len(ranked), 2)
+        self.assertGreater(ranked[0][1], ranked[1][1])
+
+    def test_should_count_ready_job_as_busy(self):
+        """
+        Un job terminé mais pas encore livré occupe toujours son blueprint
+        :return:
+        :rtype:
+        """
+
+        held = self._blueprint(10, 20, -1)
+        IndustryJob.objects.create(
+            owner=self.owner,
+            job_id=1,
+            activity="manufacturing",
+            status="ready",
+            blueprint=held,
+        )
+
+        ranked = rank_blueprints(Blueprint.objects.all())
+
+        self.assertEqual(ranked, [(held.pk, ranked[0][1], True)])
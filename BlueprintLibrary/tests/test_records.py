@@ -0,0 +1,77 @@
+"""
+Tests des enregistrements compacts et de leur comparaison
+"""
+
+# Standard Library
+import datetime as dt
+
+# Django
+from django.test import SimpleTestCase
+
+from ..records import BlueprintRecord, JobRecord, diff_records
+
+
+def _blueprint(item_id, material_efficiency=10):
+    return BlueprintRecord(
+        item_id, 1234, -1, 20, material_efficiency, -1, 60003760, "Hangar"
+    )
+
+
+class TestRecords(SimpleTestCase):
+    """
+    TestRecords
+    """
+
+    def test_should_not_have_instance_dict(self):
+        """
+        Les enregistrements n'ont pas de __dict__ (uniquement des slots)
+        :return:
+        :rtype:
+        """
+
+        self.assertFalse(hasattr(_blueprint(1), "__dict__"))
+
+    def test_should_build_job_from_esi(self):
+        """
+        Conversion d'un job ESI: activité en texte, dates en datetime
+        :return:
+        :rtype:
+        """
+
+        record = JobRecord.from_esi(
+            {
+                "job_id": 42,
+                "blueprint_id": 7,
+                "activity_id": 5,
+                "start_date": "2026-01-01T10:00:00Z",
+                "end_date": "2026-01-02T10:00:00Z",
+            }
+        )
+
+        self.assertEqual(record.key, 42)
+        self.assertEqual(record.activity, "5")
+        self.assertEqual(record.status, "active")
+        self.assertEqual(
+            record.end_date, dt.datetime(2026, 1, 2, 10, tzinfo=dt.timezone.utc)
+        )
+
+    def test_should_diff_records(self):
+        """
+        Nouveaux, modifiés, inchangés, supprimés et doublons entre pages
+        :return:
+        :rtype:
+        """
+
+        existing = {
+            1: (101, _blueprint(1)),
+            2: (102, _blueprint(2)),
+            3: (103, _blueprint(3)),
+        }
+        incoming = [_blueprint(1), _blueprint(2, 5), _blueprint(4), _blueprint(4)]
+
+        diff = diff_records(existing, incoming)
+
+        self.assertEqual(diff.created, [_blueprint(4)])
+        self.assertEqual(diff.changed, [(102, _blueprint(2, 5))])
+        self.assertEqual(diff.removed, [103])
+        self.assertEqual(diff.seen, {1, 2, 4})
@@ -0,0 +1,80 @@
+"""
+Tests du cache des réponses protégé contre les ruées
+"""
+
+# Standard Library
+from unittest import mock
+
+# Django
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from .. import response_cache
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TestGetOrBuild(SimpleTestCase):
+    """
+    TestGetOrBuild
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.key = response_cache.make_key("test", "scope", [("start", "0")])
+
+    def test_should_build_once_per_version(self):
+        """
+        La réponse n'est reconstruite que si la version des données change
+        :return:
+        :rtype:
+        """
+
+        builds = []
+
+        def build():
+            builds.append(1)
+            return {"data": len(builds)}
+
+        first = response_cache.get_or_build(self.key, "v1", build)
+        second = response_cache.get_or_build(self.key, "v1", build)
+        third = response_cache.get_or_build(self.key, "v2", build)
+
+        self.assertEqual(first, {"data": 1})
+        self.assertEqual(second, {"data": 1})
+        self.assertEqual(third, {"data": 2})
+        self.assertEqual(response_cache.counts()["hit"], 1)
+
+    def test_should_serve_stale_entry_while_rebuilding(self):
+        """
+        Pendant qu'une autre requête reconstruit, l'entrée périmée est servie
+        :return:
+        :rtype:
+        """
+
+        response_cache.get_or_build(self.key, "v1", lambda: "old")
+        cache.add(f"{self.key}:lock:v2", 1)
+
+        value = response_cache.get_or_build(self.key, "v2", lambda: "new")
+
+        self.assertEqual(value, "old")
+        self.assertEqual(response_cache.counts()["stale"], 1)
+
+    def test_should_keep_lock_held_by_another_caller(self):
+        """
+        Après une attente vaine, le verrou de l'autre appelant n'est pas rendu
+        :return:
+        :rtype:
+        """
+
+        lock_key = f"{self.key}:lock:v1"
+        cache.add(lock_key, 1)
+
+        with mock.patch.object(response_cache, "WAIT_TIMEOUT", 0):
+            value = response_cache.get_or_build(self.key, "v1", lambda: "value")
+
+        self.assertEqual(value, "value")
+        self.assertEqual(cache.get(lock_key), 1)
@@ -0,0 +1,96 @@
+"""
+Tests de la recherche tolérante aux fautes sur les noms de blueprints
+"""
+
+# Django
+from django.test import SimpleTestCase
+
+from ..search import TypeNameIndex, edit_distance, normalize
+
+NAMES = {
+    1: "Raven Blueprint",
+    2: "Ishtar Blueprint",
+    3: "Raven Navy Issue Blueprint",
+    4: "Rifter Blueprint",
+    5: "Ishkur Blueprint",
+}
+
+
+class TestEditDistance(SimpleTestCase):
+    """
+    TestEditDistance
+    """
+
+    def test_should_count_swapped_letters_as_one_typo(self):
+        """
+        Une inversion de deux lettres compte pour une seule faute
+        :return:
+        :rtype:
+        """
+
+        self.assertEqual(edit_distance("rvaen", "raven", 2), 1)
+        self.assertEqual(edit_distance("kitten", "sitting", 5), 3)
+
+    def test_should_stop_beyond_limit(self):
+        """
+        Au-delà de la limite, la distance vaut limite + 1
+        :return:
+        :rtype:
+        """
+
+        self.assertEqual(edit_distance("raven", "rifter", 1), 2)
+
+    def test_should_normalize_accents_and_punctuation(self):
+        """
+        Minuscules, sans accents ni ponctuation
+        :return:
+        :rtype:
+        """
+
+        self.assertEqual(
+            normalize("Mjölnir Fury-Cruise"), ["mjolnir", "fury", "cruise"]
+        )
+
+
+class TestTypeNameIndex(SimpleTestCase):
+    """
+    TestTypeNameIndex
+    """
+
+    def setUp(self):
+        self.index = TypeNameIndex()
+        self.index.update(NAMES)
+
+    def test_should_find_names_despite_typos_and_bp_words(self):
+        """
+        "raven blueprnt" et "Ishtar BP" trouvent leurs types, le plus proche d'abord
+        :return:
+        :rtype:
+        """
+
+        self.assertEqual(self.index.search("raven blueprnt"), [1, 3])
+        self.assertEqual(self.index.search("Ishtar BP")[0], 2)
+        self.assertEqual(self.index.search("rvaen"), [1, 3])
+        self.assertEqual(self.index.search("xyz"), [])
+
+    def test_should_return_none_without_useful_word(self):
+        """
+        Une requête faite uniquement de mots "blueprint" ne filtre pas
+        :return:
+        :rtype:
+        """
+
+        self.assertIsNone(self.index.search("bpc"))
+
+    def test_should_update_incrementally(self):
+        """
+        Types retirés, ajoutés ou renommés pris en compte
+        :return:
+        :rtype:
+        """
+
+        self.index.update({1: "Raven Blueprint", 6: "Heron Blueprint"})
+
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual(self.index.search("heron"), [6])
+        self.assertEqual(self.index.search("ishtar"), [])
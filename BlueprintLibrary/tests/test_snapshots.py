@@ -0,0 +1,47 @@
+"""
+Tests de l'encodage en colonnes compressées des photos de bibliothèque
+"""
+
+# Django
+from django.test import SimpleTestCase
+
+from ..snapshots import decode_ids, decode_rows, encode_ids, encode_rows
+
+
+class TestSnapshotEncoding(SimpleTestCase):
+    """
+    TestSnapshotEncoding
+    """
+
+    def test_should_round_trip_rows(self):
+        """
+        Les lignes décodées sont identiques aux lignes encodées
+        :return:
+        :rtype:
+        """
+
+        rows = [
+            (1_000_000_000_001, 1234, 10, 20, -1),
+            (1_000_000_000_500, 1234, 0, 0, 5),
+            (1_040_000_000_000, 987, 8, 16, 300),
+        ]
+
+        self.assertListEqual(decode_rows(encode_rows(rows), len(rows)), rows)
+
+    def test_should_round_trip_sorted_ids(self):
+        """
+        Les item_id retirés sont restitués triés
+        :return:
+        :rtype:
+        """
+
+        self.assertListEqual(decode_ids(encode_ids({30, 10, 20}), 3), [10, 20, 30])
+
+    def test_should_handle_empty_snapshot(self):
+        """
+        Une photo vide n'a rien à décoder
+        :return:
+        :rtype:
+        """
+
+        self.assertListEqual(decode_rows(encode_rows([]), 0), [])
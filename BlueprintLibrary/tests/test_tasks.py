@@ -0,0 +1,66 @@
+"""
+Tests des tâches de synchronisation
+"""
+
+# Standard Library
+from unittest import mock
+
+# Django
+from django.test import TestCase
+
+# Alliance Auth
+from allianceauth.eveonline.models import EveCharacter
+
+from .. import tasks
+from ..models import BlueprintOwner, FacetCount
+
+
+class TestOwnerBatches(TestCase):
+    """
+    TestOwnerBatches
+    """
+
+    def setUp(self):
+        character = EveCharacter.objects.create(
+            character_id=90000001,
+            character_name="Test Director",
+            corporation_id=98000001,
+            corporation_name="Test Corp",
+            corporation_ticker="TC",
+        )
+        self.owners = []
+        for corporation_id, blueprints in (
+            (98000001, 60),
+            (98000002, 30),
+            (98000003, 20),
+            (98000004, 150),
+            (98000005, 0),
+        ):
+            owner = BlueprintOwner.objects.create(
+                character=character, corporation_id=corporation_id, is_corporation=True
+            )
+            if blueprints:
+                FacetCount.objects.create(
+                    owner=owner,
+                    facet=FacetCount.Facet.OWNER,
+                    value=owner.pk,
+                    count=blueprints,
+                )
+            self.owners.append(owner)
+
+    def test_should_close_batch_on_owner_count_or_rows(self):
+        """
+        Un lot est fermé au nombre de propriétaires ou de blueprints maximal; un
+        propriétaire trop gros forme un lot à lui seul
+        :return:
+        :rtype:
+        """
+
+        with (
+            mock.patch.object(tasks, "BLUEPRINTS_ESI_OWNER_BATCH", 3),
+            mock.patch.object(tasks, "BLUEPRINTS_ESI_BATCH_ROWS", 100),
+        ):
+            batches = list(tasks._owner_batches(self.owners))
+
+        first, second, third, big, empty = self.owners
+        self.assertEqual(batches, [[first, second], [third], [big], [empty]])
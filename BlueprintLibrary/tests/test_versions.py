@@ -0,0 +1,114 @@
+"""
+Tests des versions des données synchronisées
+"""
+
+# Django
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+# Alliance Auth
+from allianceauth.eveonline.models import EveCharacter
+
+# Alliance Auth (External Libs)
+from eveuniverse.models import EveType
+
+from ..models import Blueprint, BlueprintOwner
+from ..versions import (
+    BLUEPRINTS_KEY,
+    bump_location_owners,
+    bump_owners,
+    get_version,
+    owner_version,
+)
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+STATION = 60003760
+CONTAINER = 1002
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TestBumpLocationOwners(TestCase):
+    """
+    TestBumpLocationOwners
+    """
+
+    def setUp(self):
+        cache.clear()
+        character = EveCharacter.objects.create(
+            character_id=90000001,
+            character_name="Test Director",
+            corporation_id=98000001,
+            corporation_name="Test Corp",
+            corporation_ticker="TC",
+        )
+        self.owner = BlueprintOwner.objects.create(
+            character=character, corporation_id=98000001, is_corporation=True
+        )
+        self.other = BlueprintOwner.objects.create(
+            character=character, corporation_id=98000002, is_corporation=True
+        )
+        eve_type = EveType.objects.create(id=688, name="Raven Blueprint")
+        Blueprint.objects.create(
+            owner=self.owner,
+            item_id=1,
+            eve_type=eve_type,
+            quantity=-1,
+            time_efficiency=0,
+            material_efficiency=0,
+            runs=-1,
+            location_id=CONTAINER,
+            location_flag="CorpSAG1",
+            root_location_id=STATION,
+        )
+
+    def test_should_bump_owners_of_blueprints_in_containers(self):
+        """
+        Nommer une station met à jour les propriétaires dont les blueprints sont
+        rangés dans un conteneur de cette station
+        :return:
+        :rtype:
+        """
+
+        bump_location_owners([STATION])
+
+        self.owner.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual(self.owner.locations_version, 1)
+        self.assertEqual(self.other.locations_version, 0)
+
+    def test_should_publish_version_once_committed(self):
+        """
+        La nouvelle version n'est visible dans le cache qu'après la validation de
+        la transaction qui écrit les données
+        :return:
+        :rtype:
+        """
+
+        before = owner_version(self.owner.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_owners([self.owner.pk], "blueprints")
+            self.assertEqual(owner_version(self.owner.pk), before)
+
+        self.assertNotEqual(owner_version(self.owner.pk), before)
+
+    def test_should_bump_library_counter_for_blueprints_only(self):
+        """
+        Le compteur global des blueprints (index de recherche) ne change qu'avec
+        la section blueprints, une fois la transaction validée
+        :return:
+        :rtype:
+        """
+
+        before = get_version(BLUEPRINTS_KEY)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_owners([self.owner.pk], "jobs")
+        self.assertEqual(get_version(BLUEPRINTS_KEY), before)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_owners([self.owner.pk], "blueprints")
+        self.assertNotEqual(get_version(BLUEPRINTS_KEY), before)
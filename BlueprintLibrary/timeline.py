@@ -0,0 +1,52 @@
+"""Frise des fins de jobs d'industrie, agrégée par heure ou par jour."""
+
+# Django
+from django.db.models import Count
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from .models import IndustryJob, JobCompletionBucket
+
+_TRUNCATE = {
+    JobCompletionBucket.Granularity.HOUR: TruncHour,
+    JobCompletionBucket.Granularity.DAY: TruncDay,
+}
+
+
+def rebuild_owner_buckets(owner):
+    """Recalcule les agrégats d'un propriétaire (après synchronisation de ses jobs).
+
+    À appeler dans la transaction qui écrit les jobs, pour que la frise ne montre
+    jamais un état intermédiaire.
+    """
+    jobs = IndustryJob.objects.filter(owner=owner, end_date__isnull=False)
+    buckets = []
+    for granularity, truncate in _TRUNCATE.items():
+        rows = (
+            jobs.annotate(start=truncate("end_date"))
+            .values("activity", "start")
+            .annotate(count=Count("pk"))
+            .order_by()
+        )
+        buckets += [
+            JobCompletionBucket(owner=owner, granularity=granularity, **row)
+            for row in rows
+        ]
+    JobCompletionBucket.objects.filter(owner=owner).delete()
+    JobCompletionBucket.objects.bulk_create(buckets)
+
+
+def timeline(granularity, owner_ids=None, activity=None, since=None):
+    """Agrégats à partir de `since` (par défaut l'heure ou le jour en cours)."""
+    if since is None:
+        since = timezone.now().replace(minute=0, second=0, microsecond=0)
+        if granularity == JobCompletionBucket.Granularity.DAY:
+            since = since.replace(hour=0)
+    buckets = JobCompletionBucket.objects.filter(
+        granularity=granularity, start__gte=since
+    )
+    if owner_ids is not None:
+        buckets = buckets.filter(owner_id__in=owner_ids)
+    if activity:
+        buckets = buckets.filter(activity=activity)
+    return buckets.order_by("start", "owner_id", "activity")
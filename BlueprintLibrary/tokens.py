@@ -0,0 +1,179 @@
+"""Jetons ESI des propriétaires: préchargés par lot et partagés entre les tâches.
+
+Les jetons d'accès valides sont gardés dans le cache Django jusqu'à peu avant leur
+expiration: les synchronisations des blueprints, des jobs et des emplacements d'un
+même cycle réutilisent le même jeton. Un propriétaire sans jeton utilisable est
+mémorisé (cache négatif) et n'est plus retenté avant l'expiration de l'entrée.
+"""
+
+# Standard Library
+import datetime as dt
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# Django
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+
+# Alliance Auth
+from allianceauth.services.hooks import get_extension_logger
+from esi.models import Token
+
+from .app_settings import (
+    BLUEPRINTS_TOKEN_MISSING_TIMEOUT,
+    BLUEPRINTS_TOKEN_REFRESH_MARGIN,
+    BLUEPRINTS_TOKEN_REFRESH_WORKERS,
+)
+
+logger = get_extension_logger(__name__)
+
+CORPORATION_SCOPES = (
+    "esi-corporations.read_blueprints.v1",
+    "esi-industry.read_corporation_jobs.v1",
+)
+CHARACTER_SCOPES = (
+    "esi-characters.read_blueprints.v1",
+    "esi-industry.read_character_jobs.v1",
+)
+# Facultatifs: hiérarchie des conteneurs (cf. location_tree)
+CORPORATION_ASSET_SCOPES = ("esi-assets.read_corporation_assets.v1",)
+CHARACTER_ASSET_SCOPES = ("esi-assets.read_assets.v1",)
+
+
+class TokenUnavailable(Exception):
+    """Aucun jeton ESI utilisable pour ce propriétaire."""
+
+
+def owner_scopes(owner):
+    return CORPORATION_SCOPES if owner.is_corporation else CHARACTER_SCOPES
+
+
+def _token_key(owner_pk):
+    return f"blueprints:token:{owner_pk}"
+
+
+def _missing_key(owner_pk):
+    return f"blueprints:token:missing:{owner_pk}"
+
+
+def missing_reasons(owner_pks):
+    """{pk: (raison, date d'expiration)} des propriétaires du cache négatif."""
+    entries = cache.get_many([_missing_key(pk) for pk in owner_pks])
+    return {
+        pk: entries[_missing_key(pk)] for pk in owner_pks if _missing_key(pk) in entries
+    }
+
+
+def _mark_missing(owner, reason):
+    until = timezone.now() + dt.timedelta(seconds=BLUEPRINTS_TOKEN_MISSING_TIMEOUT)
+    cache.set(_missing_key(owner.pk), (reason, until), BLUEPRINTS_TOKEN_MISSING_TIMEOUT)
+    logger.info("Jeton indisponible pour %s: %s", owner, reason)
+
+
+def forget_missing(owner_pk):
+    """Retire un propriétaire du cache négatif (ex: après ajout d'un jeton)."""
+    cache.delete(_missing_key(owner_pk))
+
+
+def _refresh(token):
+    """Rafraîchit `token` (thread dédié); retourne None ou le motif d'échec."""
+    try:
+        token.refresh()
+    except Exception as exc:
+        return repr(exc)
+    finally:
+        connections.close_all()  # connexions ouvertes par ce thread
+    return None
+
+
+def prefetch(owners):
+    """Obtient en une fois des jetons valides pour `owners` et les met en cache.
+
+    Une requête par jeu de scopes; les jetons proches de l'expiration sont
+    rafraîchis en parallèle. Les propriétaires déjà en cache (positif ou négatif)
+    sont ignorés.
+    """
+    owners = list(owners)
+    known = cache.get_many(
+        [_token_key(owner.pk) for owner in owners]
+        + [_missing_key(owner.pk) for owner in owners]
+    )
+    by_scopes = defaultdict(list)
+    for owner in owners:
+        if _token_key(owner.pk) not in known and _missing_key(owner.pk) not in known:
+            by_scopes[owner_scopes(owner)].append(owner)
+
+    now = timezone.now()
+    margin = dt.timedelta(seconds=BLUEPRINTS_TOKEN_REFRESH_MARGIN)
+    selected = {}
+    for scopes, group in by_scopes.items():
+        tokens = {}
+        # Le jeton le plus récent de chaque personnage
+        for token in (
+            Token.objects.filter(
+                character_id__in={owner.character.character_id for owner in group}
+            )
+            .require_scopes(scopes)
+            .order_by("created")
+        ):
+            tokens[token.character_id] = token
+        for owner in group:
+            token = tokens.get(owner.character.character_id)
+            if token is None:
+                _mark_missing(owner, "Aucun jeton avec les scopes requis")
+            else:
+                selected[owner] = token
+
+    expiring = {
+        owner: token
+        for owner, token in selected.items()
+        if token.expires <= now + margin
+    }
+    if expiring:
+        with ThreadPoolExecutor(BLUEPRINTS_TOKEN_REFRESH_WORKERS) as pool:
+            failures = dict(zip(expiring, pool.map(_refresh, expiring.values())))
+        for owner, failure in failures.items():
+            if failure is not None:
+                del selected[owner]
+                _mark_missing(owner, f"Rafraîchissement impossible: {failure}")
+
+    for owner, token in selected.items():
+        timeout = (token.expires - timezone.now() - margin).total_seconds()
+        if timeout > 0:
+            cache.set(_token_key(owner.pk), token.access_token, timeout)
+
+
+def access_token(owner):
+    """Jeton d'accès valide du propriétaire (cache, sinon préchargement immédiat).
+
+    Lève `TokenUnavailable` si le propriétaire est dans le cache négatif.
+    """
+    for _ in range(2):
+        token = cache.get(_token_key(owner.pk))
+        if token is not None:
+            return token
+        missing = cache.get(_missing_key(owner.pk))
+        if missing is not None:
+            raise TokenUnavailable(missing[0])
+        prefetch([owner])
+    raise TokenUnavailable("Jeton expiré avant usage")
+
+
+def asset_access_token(owner):
+    """Jeton d'accès aux assets du propriétaire (scope facultatif, sans cache).
+
+    Lève `TokenUnavailable` si aucun jeton du personnage ne porte ce scope.
+    """
+    scopes = (
+        CORPORATION_ASSET_SCOPES if owner.is_corporation else CHARACTER_ASSET_SCOPES
+    )
+    token = (
+        Token.objects.filter(character_id=owner.character.character_id)
+        .require_scopes(scopes)
+        .order_by("-created")
+        .first()
+    )
+    if token is None:
+        raise TokenUnavailable("Aucun jeton avec les scopes des assets")
+    return token.valid_access_token()
@@ -0,0 +1,72 @@
+"""Registre des types EVE connus, pour éviter une recherche par blueprint."""
+
+# Alliance Auth
+from allianceauth.services.hooks import get_extension_logger
+
+# Alliance Auth (External Libs)
+from eveuniverse.models import EveType
+
+logger = get_extension_logger(__name__)
+
+# Catégorie EVE des blueprints
+BLUEPRINT_CATEGORY_ID = 9
+
+
+def placeholder_types():
+    """Types créés en attente de résolution (sans groupe EVE, nom provisoire)."""
+    return EveType.objects.filter(eve_group__isnull=True)
+
+
+class TypeRegistry:
+    """IDs des types de blueprint présents en base, partagés par tout le processus.
+
+    Chargé une fois au début d'une tâche (`load`), puis consulté sans requête.
+    Les types inconnus sont créés en une fois avec un nom provisoire (pour les
+    clés étrangères) et mémorisés dans `pending`, pour être résolus en bloc via
+    les loaders d'eveuniverse à la fin de l'exécution (`resolve_pending`).
+    """
+
+    def __init__(self):
+        self.known = set()
+        self.pending = set()
+        self.loaded = False
+
+    def load(self):
+        """(Re)charge les types connus et oublie les résolutions en attente."""
+        self.known = set(
+            EveType.objects.filter(
+                eve_group__eve_category_id=BLUEPRINT_CATEGORY_ID
+            ).values_list("id", flat=True)
+        )
+        self.known.update(placeholder_types().values_list("id", flat=True))
+        self.pending = set()
+        self.loaded = True
+
+    def ensure(self, type_ids):
+        """Garantit l'existence des types `type_ids` (une requête pour les inconnus)."""
+        if not self.loaded:
+            self.load()
+        unknown = set(type_ids) - self.known
+        if not unknown:
+            return
+        # ignore_conflicts: le type peut exister hors de la catégorie blueprint
+        EveType.objects.bulk_create(
+            [EveType(id=type_id, name=f"Type {type_id}") for type_id in unknown],
+            ignore_conflicts=True,
+        )
+        self.known.update(unknown)
+        self.pending.update(unknown)
+
+    def resolve_pending(self):
+        """Planifie la résolution en bloc des types créés pendant l'exécution."""
+        if not self.pending:
+            return
+        # Import local: tasks importe ce module
+        from .tasks import resolve_eve_types
+
+        logger.info("Résolution de %d nouveaux types EVE", len(self.pending))
+        resolve_eve_types.delay(sorted(self.pending))
+        self.pending = set()
+
+
+registry = TypeRegistry()
@@ -2,16 +2,29 @@
 from django.urls import path
 
 from . import views
+from .profiling import profiled
 
 app_name = "blueprints"
 
 urlpatterns = [
     # Vue principale listant les blueprints
-    path("", views.LibraryView.as_view(), name="library"),
+    path("", profiled(views.LibraryView.as_view()), name="library"),
     # Endpoint pour les données AJAX de la datatable
-    path("data/", views.BlueprintDataView.as_view(), name="data"),
+    path("data/", profiled(views.BlueprintDataView.as_view()), name="data"),
+    # Compteurs des filtres de la bibliothèque (JSON)
+    path("facets/", profiled(views.FacetCountsView.as_view()), name="facets"),
     # Détails d'un blueprint (pk = identifiant du blueprint en base)
-    path("blueprint/<int:pk>/", views.BlueprintDetailView.as_view(), name="detail"),
+    path(
+        "blueprint/<int:pk>/",
+        profiled(views.BlueprintDetailView.as_view()),
+        name="detail",
+    ),
+    # Meilleurs blueprints pour un produit ou un type de blueprint (JSON)
+    path("rank/", profiled(views.BlueprintRankingView.as_view()), name="rank"),
+    # Fins de jobs d'industrie par heure ou par jour (JSON, pour tableau de bord)
+    path("jobs/timeline/", profiled(views.JobTimelineView.as_view()), name="timeline"),
+    # Historique: différence de la bibliothèque d'un propriétaire entre deux dates
+    path("history/diff/", views.SnapshotDiffView.as_view(), name="snapshot_diff"),
     # Création d'une demande (formulaire)
     path("requests/new/", views.CreateRequestView.as_view(), name="create_request"),
     # Mes demandes
@@ -24,4 +37,8 @@ urlpatterns = [
         views.ProcessRequestView.as_view(),
         name="process_request",
     ),
+    # Métriques de synchronisation (format Prometheus)
+    path("metrics/", views.SyncMetricsView.as_view(), name="metrics"),
+    # Profilage des vues (staff, si BLUEPRINTS_PROFILING_ENABLED)
+    path("profiling/", views.ProfilingView.as_view(), name="profiling"),
 ]
@@ -0,0 +1,197 @@
+"""Versions des données synchronisées, utilisées dans les clés de cache et ETag.
+
+Chaque `BlueprintOwner` porte un compteur par section (blueprints, jobs,
+emplacements), incrémenté uniquement quand une synchronisation écrit réellement
+quelque chose: une clé de cache qui inclut la version devient obsolète d'elle-même,
+sans TTL à deviner. La version de chaque propriétaire est recopiée dans le cache
+pour être lue sans requête par les pages de détail.
+"""
+
+# Standard Library
+import time
+
+# Django
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum
+
+from .models import Blueprint, BlueprintOwner
+
+SECTIONS = ("blueprints", "jobs", "locations")
+
+# Noms des types EVE, partagés entre propriétaires (hors synchronisation)
+TYPES_KEY = "blueprints:version:types"
+# Blueprints de tous les propriétaires: lu sans requête là où le périmètre
+# n'importe pas (index de recherche des types)
+BLUEPRINTS_KEY = "blueprints:version:blueprints"
+
+
+def _owner_key(owner_id):
+    return f"blueprints:version:owner:{owner_id}"
+
+
+def _blueprint_owner_key(blueprint_pk):
+    return f"blueprints:owner_of:{blueprint_pk}"
+
+
+def _format(*counters):
+    return ".".join(str(counter) for counter in counters)
+
+
+def _mirror(owner_ids):
+    """Recopie dans le cache la version des propriétaires `owner_ids` (une requête)."""
+    versions = {
+        _owner_key(pk): _format(*counters)
+        for pk, *counters in BlueprintOwner.objects.filter(
+            pk__in=owner_ids
+        ).values_list("pk", *(f"{section}_version" for section in SECTIONS))
+    }
+    cache.set_many(versions, None)
+    return versions
+
+
+def bump_owners(owner_ids, section):
+    """Incrémente le compteur `section` des propriétaires `owner_ids`.
+
+    À appeler après toute écriture des données de ces propriétaires.
+    """
+    owner_ids = list(owner_ids)
+    if not owner_ids:
+        return
+    field = f"{section}_version"
+    BlueprintOwner.objects.filter(pk__in=owner_ids).update(**{field: F(field) + 1})
+    # Publiée une fois la transaction validée: une requête concurrente ne doit pas
+    # mettre en cache les anciennes lignes sous la nouvelle version
+    transaction.on_commit(lambda: _publish(owner_ids, section))
+
+
+def _publish(owner_ids, section):
+    _mirror(owner_ids)
+    if section == "blueprints":
+        _bump(BLUEPRINTS_KEY)
+
+
+def bump_location_owners(location_ids):
+    """Incrémente la version des propriétaires ayant des blueprints à `location_ids`,
+    directement ou dans un conteneur dont c'est la racine (cf. location_tree)."""
+    bump_owners(
+        Blueprint.objects.filter(
+            Q(location_id__in=location_ids) | Q(root_location_id__in=location_ids)
+        )
+        .values_list("owner_id", flat=True)
+        .distinct(),
+        "locations",
+    )
+
+
+def owner_version(owner_id):
+    """Version "blueprints.jobs.emplacements" d'un propriétaire (cache, sinon base)."""
+    key = _owner_key(owner_id)
+    version = cache.get(key)
+    if version is None:
+        version = _mirror([owner_id]).get(key, "")
+    return version
+
+
+def get_version(key):
+    """Version courante d'un compteur tenu uniquement dans le cache.
+
+    Une version absente (jamais créée ou évincée du cache) repart d'une valeur
+    jamais utilisée (l'heure en ns), pour ne pas resservir d'anciens fragments.
+    """
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+
+def bump_types():
+    """À appeler après la résolution de types EVE (noms provisoires remplacés)."""
+    _bump(TYPES_KEY)
+
+
+def visible_owners_q(user, prefix=""):
+    """Filtre des propriétaires visibles par `user` (None: toute l'alliance).
+
+    `prefix` désigne la relation vers le propriétaire (ex: "owner__" depuis
+    `Blueprint`). Les personnages de l'utilisateur sont lus en sous-requête.
+    """
+    if user.has_perm("blueprints.view_alliance_blueprints"):
+        return None
+    characters = user.profile.characters.all()
+    return Q(
+        **{
+            f"{prefix}is_corporation": True,
+            f"{prefix}corporation_id__in": characters.values("corporation_id"),
+        }
+    ) | Q(
+        **{
+            f"{prefix}is_corporation": False,
+            f"{prefix}character__character_id__in": characters.values("character_id"),
+        }
+    )
+
+
+def scope_key(user):
+    """Identifiant du périmètre visible par `user` (ses corporations et personnages)."""
+    if user.has_perm("blueprints.view_alliance_blueprints"):
+        return "all"
+    return ",".join(
+        f"{corporation_id}/{character_id}"
+        for corporation_id, character_id in sorted(
+            user.profile.characters.values_list("corporation_id", "character_id")
+        )
+    )
+
+
+def scope_version(user=None, sections=SECTIONS):
+    """Version combinée des propriétaires visibles par `user` (tous si None), en une
+    requête.
+
+    Change dès qu'un de ces propriétaires est synchronisé avec des écritures dans
+    l'une des `sections`, ou qu'un propriétaire apparaît ou disparaît du périmètre.
+    """
+    owners = BlueprintOwner.objects.all()
+    visible = visible_owners_q(user) if user is not None else None
+    if visible is not None:
+        owners = owners.filter(visible)
+    total = F(f"{sections[0]}_version")
+    for section in sections[1:]:
+        total = total + F(f"{section}_version")
+    row = owners.aggregate(
+        count=Count("pk"),
+        last=Max("pk"),
+        total=Sum(total),
+    )
+    return _format(row["count"], row["last"] or 0, row["total"] or 0)
+
+
+def blueprint_owner_id(blueprint_pk):
+    """Propriétaire d'un blueprint (ne change jamais), lu en base une seule fois.
+
+    Retourne None si le blueprint n'existe pas.
+    """
+    key = _blueprint_owner_key(blueprint_pk)
+    owner_id = cache.get(key)
+    if owner_id is None:
+        owner_id = (
+            Blueprint.objects.filter(pk=blueprint_pk)
+            .values_list("owner_id", flat=True)
+            .first()
+        )
+        if owner_id is not None:
+            cache.set(key, owner_id, None)
+    return owner_id
+
+
+def permissions_key(user, *perms):
+    """Partie de clé décrivant lesquelles des permissions `perms` `user` possède."""
+    return "".join("1" if user.has_perm(perm) else "0" for perm in perms)
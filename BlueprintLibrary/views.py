@@ -1,17 +1,70 @@
+# Standard Library
+import datetime as dt
+import hmac
+import json
+
 # Third Party
 from datatables.views import DatatablesView  # classe utilitaire pour DataTables
 
 # Django
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required, permission_required
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
 from django.db.models import Q
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse_lazy
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from django.utils.decorators import method_decorator
+from django.utils.functional import SimpleLazyObject
 from django.views import View
-from django.views.generic import DetailView, FormView, ListView, TemplateView
+from django.views.decorators.http import condition
+from django.views.generic import FormView, ListView, TemplateView
+
+# Alliance Auth (External Libs)
+from eveuniverse.models import EveType
 
+from . import facets, response_cache
+from .app_settings import (
+    BLUEPRINTS_FRAGMENT_CACHE_TIMEOUT,
+    BLUEPRINTS_JOBS_MIN_REFRESH,
+    BLUEPRINTS_METRICS_TOKEN,
+)
 from .forms import BlueprintRequestForm
-from .models import Blueprint, BlueprintRequest, IndustryJob
+from .industry import DATA_VERSION_KEY as INDUSTRY_DATA_VERSION_KEY
+from .industry import calculator
+from .metrics import render_prometheus
+from .models import (
+    Blueprint,
+    BlueprintOwner,
+    BlueprintRequest,
+    IndustryJob,
+    JobCompletionBucket,
+)
+from .profiling import note_fragment
+from .profiling import snapshot as profiling_snapshot
+from .ranking import candidate_type_ids, rank_blueprints
+from .search import search_type_ids
+from .snapshots import COLUMNS as SNAPSHOT_COLUMNS
+from .snapshots import diff_between
+from .timeline import timeline
+from .versions import (
+    TYPES_KEY,
+    blueprint_owner_id,
+    get_version,
+    owner_version,
+    permissions_key,
+    scope_key,
+    scope_version,
+    visible_owners_q,
+)
+
+# Borne du nombre de runs accepté par le calcul de fabrication
+MAX_BUILD_RUNS = 10_000
+# Nombre maximum de blueprints renvoyés par le classement
+MAX_RANKING_TOP = 100
 
 
 @method_decorator(login_required, name="dispatch")
@@ -26,34 +79,27 @@ class LibraryView(TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Filtrer les blueprints affichés selon permissions:
         user = self.request.user
-        if user.has_perm("blueprints.view_alliance_blueprints"):
-            # Affiche tous les blueprints (toute l'alliance)
-            bps = Blueprint.objects.select_related("eve_type", "owner").all()
-        else:
-            # Sinon, limite aux blueprints de la corp de l'utilisateur (ou de ses persos)
-            corp_ids = set()
-            char_ids = set()
-            # Récupère les corp IDs de tous les persos de l'utilisateur
-            for (
-                char
-            ) in user.profile.characters.all():  # user.profile.characters via AA core
-                corp_ids.add(char.corporation_id)
-                char_ids.add(char.character_id)
-            # Filtre: blueprints dont owner est perso de l'utilisateur ou corp de l'utilisateur
-            bps = Blueprint.objects.select_related("eve_type", "owner").filter(
-                (Q(owner__is_corporation=True) & Q(owner__corporation_id__in=corp_ids))
-                | (
-                    Q(owner__is_corporation=False)
-                    & Q(owner__character__character_id__in=char_ids)
-                )
-            )
-        context["blueprint_count"] = bps.count()
+        # Compte des blueprints visibles (toute l'alliance, ou corps et persos de
+        # l'utilisateur), appelé par le gabarit seulement si le fragment est périmé
+        context["blueprint_count"] = lambda: _visible_blueprints(user).count()
+        # Fragment propre au périmètre (deux périmètres peuvent avoir la même
+        # version), invalidé quand sa version change
+        context["scope_key"] = scope_key(user)
+        context["cache_key"] = scope_version(user)
+        context["cache_timeout"] = BLUEPRINTS_FRAGMENT_CACHE_TIMEOUT
         # La liste détaillée est chargée via DataTables en JS, on n'injecte ici que le compte et autres infos éventuelles.
         return context
 
 
+def _visible_blueprints(user):
+    """Blueprints visibles par `user` (toute l'alliance, ou ses corps et persos)."""
+    visible = visible_owners_q(user, prefix="owner__")
+    if visible is None:
+        return Blueprint.objects.all()
+    return Blueprint.objects.filter(visible)
+
+
 @method_decorator(login_required, name="dispatch")
 @method_decorator(
     permission_required("blueprints.basic_access", raise_exception=True),
@@ -77,33 +123,57 @@ class BlueprintDataView(DatatablesView):
         "runs",
         "material_efficiency",
         "time_efficiency",
-        "location_name",
+        # Racine précalculée: tri en base, sans remonter les conteneurs
+        "root_location_id",
     ]
 
+    # Paramètres sans effet sur le contenu de la réponse
+    UNCACHED_PARAMS = ("draw", "_")
+
+    def get(self, request, *args, **kwargs):
+        """Réponse servie depuis le cache, par périmètre, paramètres et version."""
+        params = sorted(
+            (name, value.strip().lower() if name == "search[value]" else value)
+            for name, value in request.GET.items()
+            if name not in self.UNCACHED_PARAMS
+        )
+        user = request.user
+        key = response_cache.make_key("datatables", scope_key(user), params)
+        version = f"{scope_version(user)}:{get_version(TYPES_KEY)}"
+        payload = response_cache.get_or_build(
+            key,
+            version,
+            lambda: json.loads(
+                super(BlueprintDataView, self).get(request, *args, **kwargs).content
+            ),
+        )
+        # DataTables associe chaque réponse à sa requête par le compteur "draw"
+        try:
+            draw = int(request.GET.get("draw", 0))
+        except ValueError:
+            draw = 0
+        return JsonResponse({**payload, "draw": draw})
+
     def get_initial_queryset(self, request=None):
-        user = self.request.user
         # Filtre de base identique à LibraryView
-        if user.has_perm("blueprints.view_alliance_blueprints"):
-            qs = Blueprint.objects.select_related("eve_type", "owner").all()
-        else:
-            corp_ids = {char.corporation_id for char in user.profile.characters.all()}
-            char_ids = {char.character_id for char in user.profile.characters.all()}
-            qs = Blueprint.objects.select_related("eve_type", "owner").filter(
-                (Q(owner__is_corporation=True) & Q(owner__corporation_id__in=corp_ids))
-                | (
-                    Q(owner__is_corporation=False)
-                    & Q(owner__character__character_id__in=char_ids)
-                )
-            )
-        return qs
+        return _visible_blueprints(self.request.user).select_related(
+            "eve_type", "owner"
+        )
 
     def filter_queryset(self, qs):
+        # Filtres de la bibliothèque (original/copie, ME, TE, propriétaire...)
+        qs = facets.apply_filters(qs, self.request.GET)
         # Applique le filtre de recherche global de DataTables
-        search = self.request.GET.get("search[value]", None)
-        if search:
-            qs = qs.filter(
-                Q(eve_type__name__icontains=search) | Q(location_id__icontains=search)
-            )
+        search = (self.request.GET.get("search[value]") or "").strip()
+        if search.isdigit():
+            # Un nombre désigne un emplacement (ID de station, structure ou conteneur)
+            location_id = int(search)
+            qs = qs.filter(Q(location_id=location_id) | Q(root_location_id=location_id))
+        elif search:
+            # Noms résolus en IDs de types par l'index (tolérant aux fautes)
+            type_ids = search_type_ids(search)
+            if type_ids is not None:
+                qs = qs.filter(eve_type_id__in=type_ids)
         return qs
 
 
@@ -112,26 +182,300 @@ class BlueprintDataView(DatatablesView):
     permission_required("blueprints.basic_access", raise_exception=True),
     name="dispatch",
 )
-class BlueprintDetailView(DetailView):
-    """Vue détaillée pour un blueprint spécifique."""
+class FacetCountsView(View):
+    """Compteurs de chaque valeur de filtre sur le périmètre visible (JSON).
+
+    Lus dans les agrégats tenus par la synchronisation (cf. facets), mis en cache
+    par périmètre jusqu'à la prochaine écriture.
+    """
+
+    def get(self, request, *args, **kwargs):
+        user = request.user
+        payload = response_cache.get_or_build(
+            response_cache.make_key("facets", scope_key(user)),
+            f"{scope_version(user)}:{get_version(TYPES_KEY)}",
+            lambda: _facet_payload(user),
+        )
+        return JsonResponse(payload)
+
+
+def _facet_payload(user):
+    counts = facets.scope_counts(user)
+    names = facets.labels(counts)
+    return {
+        facet: [
+            {
+                "value": value,
+                "label": names[facet].get(value, str(value)),
+                "count": count,
+            }
+            for value, count in values.items()
+        ]
+        for facet, values in counts.items()
+    }
+
+
+def _build_runs(value):
+    """Nombre de runs demandé pour le calcul de fabrication (1 par défaut)."""
+    try:
+        runs = int(value)
+    except (TypeError, ValueError):
+        return 1
+    return min(max(runs, 1), MAX_BUILD_RUNS)
+
+
+@method_decorator(login_required, name="dispatch")
+@method_decorator(
+    permission_required("blueprints.basic_access", raise_exception=True),
+    name="dispatch",
+)
+class BlueprintDetailView(TemplateView):
+    """Vue détaillée pour un blueprint spécifique.
+
+    Le gabarit met ses fragments en cache, avec une clé incluant la version des
+    données du propriétaire: le blueprint, ses jobs et la facture de fabrication
+    ne sont lus en base (objets paresseux) que si un fragment doit être recalculé.
+    """
 
-    model = Blueprint
     template_name = "blueprints/blueprint_detail.html"
-    context_object_name = "blueprint"
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        bp = self.object
-        # Si user a la permission, on ajoute les jobs liés (via item_id du blueprint)
+        pk = kwargs["pk"]
+        owner_id = blueprint_owner_id(pk)
+        if owner_id is None:
+            raise Http404("Blueprint introuvable")
+        bp = SimpleLazyObject(
+            lambda: get_object_or_404(
+                Blueprint.objects.select_related("eve_type"), pk=pk
+            )
+        )
+        context["blueprint"] = bp
         user = self.request.user
+        context["cache_key"] = ":".join(
+            str(part)
+            for part in (
+                owner_id,
+                owner_version(owner_id),
+                get_version(TYPES_KEY),
+                permissions_key(
+                    user,
+                    "blueprints.view_industry_jobs",
+                    "blueprints.request_blueprints",
+                ),
+            )
+        )
+        context["cache_timeout"] = BLUEPRINTS_FRAGMENT_CACHE_TIMEOUT
+        # Fiche principale du gabarit: succès ou échec du cache pour le profilage
+        note_fragment("blueprint_card", [pk, context["cache_key"]])
+        # Les statuts des jobs dépendent de l'heure (cf. IndustryJob.current_status)
+        context["jobs_cache_timeout"] = BLUEPRINTS_JOBS_MIN_REFRESH
+        # Si user a la permission, on ajoute les jobs liés (via item_id du blueprint)
         if user.has_perm("blueprints.view_industry_jobs"):
-            jobs = IndustryJob.objects.filter(blueprint=bp)
-            context["industry_jobs"] = jobs
+            context["industry_jobs"] = SimpleLazyObject(
+                lambda: list(IndustryJob.objects.filter(blueprint_id=pk))
+            )
+        # Facture de matériaux et durée pour N runs (ME/TE du blueprint appliqués)
+        runs = _build_runs(self.request.GET.get("runs"))
+        context["build_runs"] = runs
+        context["industry_version"] = cache.get(INDUSTRY_DATA_VERSION_KEY, 0)
+        context["build"] = SimpleLazyObject(lambda: _build_details(bp, runs))
         # Indiquer si l'utilisateur peut faire une requête sur ce blueprint
         context["can_request"] = user.has_perm("blueprints.request_blueprints")
         return context
 
 
+class _BuildDetails:
+    """Facture de fabrication prête à afficher (noms des types résolus)."""
+
+    def __init__(self, build, names):
+        self.product_quantity = build.product_quantity
+        self.product = names.get(build.product_type_id, build.product_type_id)
+        self.materials = [
+            (names.get(type_id, f"Type {type_id}"), quantity)
+            for type_id, quantity in build.materials
+        ]
+        self.time = dt.timedelta(seconds=build.time)
+
+
+def _build_details(bp, runs):
+    build = calculator.compute(
+        [(bp.eve_type_id, bp.material_efficiency, bp.time_efficiency, runs)]
+    )[0]
+    if build is None:
+        return None
+    names = dict(
+        EveType.objects.filter(
+            id__in=[type_id for type_id, _ in build.materials] + [build.product_type_id]
+        ).values_list("id", "name")
+    )
+    return _BuildDetails(build, names)
+
+
+@method_decorator(login_required, name="dispatch")
+@method_decorator(
+    permission_required("blueprints.basic_access", raise_exception=True),
+    name="dispatch",
+)
+class BlueprintRankingView(View):
+    """Meilleurs blueprints visibles pour fabriquer un produit (ou d'un type donné).
+
+    Paramètres GET: `type_id` (produit ou blueprint), `top`, `runs` (runs
+    nécessaires) et `location` (emplacements préférés, répétable).
+    """
+
+    def get(self, request, *args, **kwargs):
+        try:
+            type_id = int(request.GET["type_id"])
+            top = min(max(int(request.GET.get("top", 10)), 1), MAX_RANKING_TOP)
+            locations = [int(value) for value in request.GET.getlist("location")]
+        except (KeyError, ValueError):
+            return JsonResponse({"error": "Paramètres invalides"}, status=400)
+        candidates = _visible_blueprints(request.user).filter(
+            eve_type_id__in=candidate_type_ids(type_id)
+        )
+        ranked = rank_blueprints(
+            candidates,
+            top=top,
+            needed_runs=_build_runs(request.GET.get("runs")),
+            near=locations,
+        )
+        blueprints = Blueprint.objects.select_related(
+            "eve_type", "owner__character"
+        ).in_bulk([pk for pk, _, _ in ranked])
+        results = []
+        for pk, score, busy in ranked:
+            bp = blueprints.get(pk)
+            if bp is None:
+                continue  # supprimé par une synchronisation entre les deux requêtes
+            results.append(
+                {
+                    "id": bp.pk,
+                    "type_id": bp.eve_type_id,
+                    "type_name": bp.eve_type.name,
+                    "owner": str(bp.owner),
+                    "material_efficiency": bp.material_efficiency,
+                    "time_efficiency": bp.time_efficiency,
+                    "runs": bp.runs,
+                    "is_original": bp.is_original,
+                    "location_id": bp.location_id,
+                    "root_location_id": bp.root_location_id,
+                    "busy": busy,
+                    "score": round(score, 2),
+                }
+            )
+        return JsonResponse({"type_id": type_id, "results": results})
+
+
+def _timeline_etag(request, *args, **kwargs):
+    # La frise couvre tous les propriétaires et commence à l'heure courante
+    return ":".join(
+        (
+            scope_version(),
+            timezone.now().strftime("%Y%m%d%H"),
+            request.GET.urlencode(),
+        )
+    )
+
+
+@method_decorator(login_required, name="dispatch")
+@method_decorator(
+    permission_required("blueprints.view_industry_jobs", raise_exception=True),
+    name="dispatch",
+)
+@method_decorator(condition(etag_func=_timeline_etag), name="get")
+class JobTimelineView(View):
+    """Nombre de jobs se terminant par heure ou par jour, par propriétaire et activité.
+
+    Paramètres GET: `granularity` ("hour" ou "day"), `owner` (répétable) et
+    `activity`. Lu depuis les agrégats `JobCompletionBucket` uniquement.
+    """
+
+    def get(self, request, *args, **kwargs):
+        granularity = request.GET.get(
+            "granularity", JobCompletionBucket.Granularity.DAY
+        )
+        if granularity not in JobCompletionBucket.Granularity.values:
+            return JsonResponse({"error": "Granularité invalide"}, status=400)
+        try:
+            owner_ids = [int(value) for value in request.GET.getlist("owner")] or None
+        except ValueError:
+            return JsonResponse({"error": "Paramètres invalides"}, status=400)
+        buckets = timeline(
+            granularity, owner_ids=owner_ids, activity=request.GET.get("activity")
+        ).values_list("start", "owner_id", "activity", "count")
+        owners = {
+            owner.pk: str(owner)
+            for owner in BlueprintOwner.objects.select_related("character")
+        }
+        return JsonResponse(
+            {
+                "granularity": granularity,
+                "owners": owners,
+                "buckets": [
+                    {
+                        "start": start.isoformat(),
+                        "owner_id": owner_id,
+                        "activity": activity,
+                        "count": count,
+                    }
+                    for start, owner_id, activity, count in buckets
+                ],
+            }
+        )
+
+
+def _parse_moment(value):
+    """Date ISO (fin de journée UTC) ou date-heure ISO; None si invalide."""
+    moment = parse_datetime(value or "")
+    if moment is not None:
+        return moment if timezone.is_aware(moment) else timezone.make_aware(moment)
+    day = parse_date(value or "")
+    if day is None:
+        return None
+    return dt.datetime.combine(day, dt.time.max, tzinfo=dt.timezone.utc)
+
+
+@method_decorator(login_required, name="dispatch")
+@method_decorator(
+    permission_required("blueprints.view_alliance_blueprints", raise_exception=True),
+    name="dispatch",
+)
+class SnapshotDiffView(View):
+    """Différence de la bibliothèque d'un propriétaire entre deux dates (JSON).
+
+    Paramètres GET: `owner` (pk), `from` et `to` (dates ou dates-heures ISO).
+    Renvoie aussi l'évolution du nombre de blueprints entre ces deux dates.
+    """
+
+    def get(self, request, *args, **kwargs):
+        start = _parse_moment(request.GET.get("from"))
+        end = _parse_moment(request.GET.get("to")) or timezone.now()
+        if start is None or start > end:
+            return JsonResponse({"error": "Dates invalides"}, status=400)
+        try:
+            owner = get_object_or_404(BlueprintOwner, pk=int(request.GET["owner"]))
+        except (KeyError, ValueError):
+            return JsonResponse({"error": "Paramètres invalides"}, status=400)
+        added, removed, changed = diff_between(owner, start, end)
+        growth = owner.snapshots.filter(
+            taken_at__gte=start, taken_at__lte=end
+        ).order_by("taken_at")
+        return JsonResponse(
+            {
+                "owner": str(owner),
+                "columns": [name for name, _ in SNAPSHOT_COLUMNS],
+                "added": added,
+                "removed": removed,
+                "changed": changed,
+                "growth": [
+                    [taken_at.isoformat(), total]
+                    for taken_at, total in growth.values_list("taken_at", "total")
+                ],
+            }
+        )
+
+
 @method_decorator(login_required, name="dispatch")
 @method_decorator(
     permission_required("blueprints.request_blueprints", raise_exception=True),
@@ -212,3 +556,30 @@ class ProcessRequestView(View):
         req.save()
         # Redirige vers la liste des demandes ouvertes
         return redirect("blueprints:open_requests")
+
+
+class SyncMetricsView(View):
+    """Expose les métriques de synchronisation au format texte Prometheus."""
+
+    def get(self, request, *args, **kwargs):
+        authorization = request.headers.get("Authorization", "")
+        token_ok = bool(BLUEPRINTS_METRICS_TOKEN) and hmac.compare_digest(
+            authorization, f"Bearer {BLUEPRINTS_METRICS_TOKEN}"
+        )
+        if not token_ok and not request.user.is_staff:
+            raise PermissionDenied
+        return HttpResponse(
+            render_prometheus(), content_type="text/plain; version=0.0.4"
+        )
+
+
+@method_decorator(staff_member_required, name="dispatch")
+class ProfilingView(TemplateView):
+    """Agrégats de profilage par vue et échantillons de requêtes lentes (staff)."""
+
+    template_name = "blueprints/profiling.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["view_totals"], context["slow_samples"] = profiling_snapshot()
+        return context